@@ -8,7 +8,10 @@ import plotly.express as px
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
 sys.path.insert(0, str(PROJECT_ROOT))
 
-from src.pipeline import run as run_pipeline  # noqa: E402
+from src.forecast import overall_scores  # noqa: E402
+from src.cache import file_digest  # noqa: E402
+from src.io import find_artifact, read_table  # noqa: E402
+from src.store import SeriesStore  # noqa: E402
 
 st.set_page_config(page_title="Café Forecasting + Reorder Simulator", layout="wide")
 st.title("Café Demand Forecasting + Inventory Reorder Simulator")
@@ -17,11 +20,12 @@ st.caption("Baseline forecasting + reorder points + simulation-based stockout ri
 DEFAULT_INPUT = PROJECT_ROOT / "data" / "raw" / "cafe_sales.csv"
 OUT_DIR = PROJECT_ROOT / "outputs"
 FIG_DIR = PROJECT_ROOT / "reports" / "figures"
+CACHE_DIR = PROJECT_ROOT / ".cache" / "pipeline"
 
 with st.sidebar:
     st.header("Pipeline")
-    uploaded = st.file_uploader("Upload CSV (optional)", type=["csv"])
-    input_path = st.text_input("Or CSV path", value=str(DEFAULT_INPUT))
+    uploaded = st.file_uploader("Upload CSV / Parquet (optional)", type=["csv", "parquet", "feather"])
+    input_path = st.text_input("Or file path", value=str(DEFAULT_INPUT))
 
     horizon = st.slider("Forecast horizon (days)", 7, 60, 30, 1)
     backtest = st.slider("Backtest window (days)", 7, 60, 28, 1)
@@ -34,78 +38,120 @@ with st.sidebar:
 
     run_btn = st.button("Run / Refresh")
 
-effective_input = Path(input_path)
-if uploaded is not None:
-    tmp = PROJECT_ROOT / "data" / "raw" / "uploaded.csv"
-    tmp.parent.mkdir(parents=True, exist_ok=True)
-    tmp.write_bytes(uploaded.getbuffer())
-    effective_input = tmp
+ARTIFACTS = (
+    "daily_item_demand",
+    "backtest_scores",
+    "forecast_next_30d",
+    "reorder_policy",
+    "simulation_summary",
+)
+
+
+def _indexed(frames: dict) -> dict:
+    """Output tables plus what the widgets look up on every rerun, built once per run."""
+    daily = frames["daily_item_demand"]
+    forecast = frames.get("forecast_next_30d", pd.DataFrame())
+    policy = frames.get("reorder_policy", pd.DataFrame())
+    sim = frames.get("simulation_summary", pd.DataFrame())
+    bt = frames.get("backtest_scores", pd.DataFrame())
+    return {
+        **frames,
+        "items": sorted(daily["item"].astype(str).unique().tolist()),
+        "n_days": int(daily["date"].nunique()),
+        "total_revenue": round(float(daily["revenue"].sum()), 2),
+        "revenue": daily.groupby("item", observed=True)["revenue"].sum().sort_values(ascending=False).reset_index(),
+        "backtest_avg": overall_scores(bt).groupby("model", observed=True)["mae"].mean().sort_values().reset_index() if not bt.empty else None,
+        "daily_store": SeriesStore.from_frame(daily, ["demand_qty"]),
+        "forecast_store": SeriesStore.from_frame(forecast, ["forecast_qty"]) if not forecast.empty else None,
+        "policy_by_item": policy.assign(item=policy["item"].astype(str)).set_index("item") if not policy.empty else None,
+        "sim_by_item": sim.assign(item=sim["item"].astype(str)).set_index("item") if not sim.empty else None,
+    }
+
+
+@st.cache_resource(show_spinner="Running pipeline...", max_entries=4)
+def run_outputs(input_digest: str, input_path: str, horizon: int, backtest: int, lead_time: int, service_level: float, sim_runs: int) -> dict:
+    """Pipeline outputs held in memory, keyed on the input's content hash + the sidebar settings."""
+    from src.pipeline import run as run_pipeline  # only needed (with matplotlib) when the pipeline runs
+
+    res = run_pipeline(
+        input_path=input_path,
+        out_dir=str(OUT_DIR),
+        figures_dir=str(FIG_DIR),
+        horizon_days=horizon,
+        backtest_days=backtest,
+        lead_time_days=lead_time,
+        service_level=service_level,
+        simulation_runs=sim_runs,
+        cache_dir=str(CACHE_DIR),
+        return_frames=True,
+    )
+    return _indexed(res["frames"])
+
+
+@st.cache_resource(show_spinner="Loading outputs...", max_entries=2)
+def load_outputs(stamp: tuple) -> dict:
+    """Artifacts of an earlier run from OUT_DIR; stamp lists (path, mtime) so rewritten files reload."""
+    return _indexed({stem: read_table(path) for stem, path, _ in stamp})
+
 
 if run_btn:
-    with st.spinner("Running pipeline..."):
-        run_pipeline(
-            input_path=str(effective_input),
-            out_dir=str(OUT_DIR),
-            figures_dir=str(FIG_DIR),
-            horizon_days=int(horizon),
-            backtest_days=int(backtest),
-            lead_time_days=int(lead_time),
-            service_level=float(service_level),
-            simulation_runs=int(sim_runs),
-        )
-    st.success("Done! Outputs regenerated.")
-
-daily_path = OUT_DIR / "daily_item_demand.csv"
-fc_path = OUT_DIR / "forecast_next_30d.csv"
-policy_path = OUT_DIR / "reorder_policy.csv"
-sim_path = OUT_DIR / "simulation_summary.csv"
-
-if not daily_path.exists():
-    st.info("Run the pipeline from the sidebar to generate outputs.")
-    st.stop()
-
-daily = pd.read_csv(daily_path)
-daily["date"] = pd.to_datetime(daily["date"])
-items = sorted(daily["item"].unique().tolist())
-
-forecast = pd.read_csv(fc_path) if fc_path.exists() else pd.DataFrame()
-if not forecast.empty:
-    forecast["date"] = pd.to_datetime(forecast["date"])
-
-policy = pd.read_csv(policy_path) if policy_path.exists() else pd.DataFrame()
-sim = pd.read_csv(sim_path) if sim_path.exists() else pd.DataFrame()
+    effective_input = Path(input_path)
+    if uploaded is not None:
+        effective_input = PROJECT_ROOT / "data" / "raw" / f"uploaded{Path(uploaded.name).suffix.lower() or '.csv'}"
+        effective_input.parent.mkdir(parents=True, exist_ok=True)
+        effective_input.write_bytes(uploaded.getbuffer())
+    st.session_state["run_args"] = (
+        file_digest(effective_input),
+        str(effective_input),
+        int(horizon),
+        int(backtest),
+        int(lead_time),
+        float(service_level),
+        int(sim_runs),
+    )
+
+if "run_args" in st.session_state:
+    data = run_outputs(*st.session_state["run_args"])
+    if run_btn:
+        st.success("Done! Outputs regenerated.")
+else:
+    paths = {stem: find_artifact(OUT_DIR, stem) for stem in ARTIFACTS}
+    if paths["daily_item_demand"] is None:
+        st.info("Run the pipeline from the sidebar to generate outputs.")
+        st.stop()
+    data = load_outputs(tuple((stem, str(p), p.stat().st_mtime_ns) for stem, p in paths.items() if p is not None))
+
+items = data["items"]
+policy = data.get("reorder_policy", pd.DataFrame())
+sim = data.get("simulation_summary", pd.DataFrame())
 
 tab_overview, tab_item, tab_inventory, tab_notes = st.tabs(["Overview", "Item Explorer", "Inventory Policy", "Notes"])
 
 with tab_overview:
     c1, c2, c3 = st.columns(3)
-    c1.metric("Days covered", int(daily["date"].nunique()))
-    c2.metric("Items", int(daily["item"].nunique()))
-    c3.metric("Total revenue", round(float(daily["revenue"].sum()), 2))
+    c1.metric("Days covered", data["n_days"])
+    c2.metric("Items", len(items))
+    c3.metric("Total revenue", data["total_revenue"])
 
     st.subheader("Revenue ranking by item")
-    rev = daily.groupby("item")["revenue"].sum().sort_values(ascending=False).reset_index()
-    st.plotly_chart(px.bar(rev, x="item", y="revenue"), width="stretch")
+    st.plotly_chart(px.bar(data["revenue"], x="item", y="revenue"), width="stretch")
 
-    bt_path = OUT_DIR / "backtest_scores.csv"
     st.subheader("Backtest summary")
-    if bt_path.exists():
-        bt = pd.read_csv(bt_path)
-        avg = bt.groupby("model")["mae"].mean().sort_values().reset_index()
-        st.plotly_chart(px.bar(avg, x="model", y="mae"), width="stretch")
+    if data["backtest_avg"] is not None:
+        st.plotly_chart(px.bar(data["backtest_avg"], x="model", y="mae"), width="stretch")
     else:
         st.info("Backtest results not found. Run pipeline.")
 
 with tab_item:
     item = st.selectbox("Select item", items)
-    hist = daily[daily["item"] == item].sort_values("date")
+    hist = data["daily_store"].frame(item)
 
     st.subheader("Historical daily demand")
     st.plotly_chart(px.line(hist, x="date", y="demand_qty", title=f"Daily demand — {item}"), width="stretch")
 
     st.subheader("History + forecast")
-    if not forecast.empty:
-        fc = forecast[forecast["item"] == item].sort_values("date")
+    if data["forecast_store"] is not None:
+        fc = data["forecast_store"].frame(item)
         comb = pd.concat([
             hist[["date", "demand_qty"]].rename(columns={"demand_qty": "qty"}).assign(kind="history"),
             fc[["date", "forecast_qty"]].rename(columns={"forecast_qty": "qty"}).assign(kind="forecast"),
@@ -125,9 +171,10 @@ with tab_inventory:
         st.dataframe(sim.head(30), width="stretch", hide_index=True)
 
         st.subheader("Explain a single item policy")
-        item2 = st.selectbox("Pick item", sorted(policy["item"].unique().tolist()))
-        p = policy[policy["item"] == item2].iloc[0].to_dict()
-        s = sim[sim["item"] == item2].iloc[0].to_dict() if (sim["item"] == item2).any() else {}
+        by_item = data["policy_by_item"]
+        item2 = st.selectbox("Pick item", sorted(by_item.index.unique().tolist()))
+        p = by_item.loc[item2].to_dict()
+        s = data["sim_by_item"].loc[item2].to_dict() if item2 in data["sim_by_item"].index else {}
 
         col1, col2, col3 = st.columns(3)
         col1.metric("Mean daily demand (μ)", round(float(p["mu_daily_demand"]), 2))
@@ -153,9 +200,9 @@ with tab_notes:
 - Forecasts are baseline models: explainable, fast, and often surprisingly strong.
 - Inventory outputs depend on assumptions (lead time, service level, demand variability).
 - Without cost data, this repo focuses on reorder rules and risk estimates, not “optimal” ordering.
+  With holding / stockout / ordering costs, `python -m src.optimize` searches for cost-optimal (s, S) per item.
 
 ### Next upgrades
-- Add cost-based optimization (holding vs stockout vs ordering cost).
 - Add richer time-series models after baselines.
 - Add supplier constraints and item-specific lead times.
         """.strip()
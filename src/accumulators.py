@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+from typing import Sequence
+import math
+
+import numpy as np
+
+# Streaming summaries over simulation runs, one row per item. Both accumulators take
+# (rows, k) batches and merge(), so runs can be processed in fixed-size batches (memory
+# does not grow with the run count) and shards can be combined afterwards.
+
+
+class Moments:
+    """
+    Running count, mean and M2 (sum of squared deviations) per row. A batch is summarized with
+    numpy and folded in with the pairwise update of Chan et al., so a single batch gives exactly
+    x.mean(axis=1), and merging shards matches one pass up to float rounding.
+    """
+
+    def __init__(self, n_rows: int):
+        self.count = np.zeros(n_rows, dtype=np.int64)
+        self.mean = np.zeros(n_rows)
+        self.m2 = np.zeros(n_rows)
+
+    @classmethod
+    def of(cls, x: np.ndarray) -> "Moments":
+        x = np.asarray(x, dtype=float)
+        out = cls(len(x))
+        if x.shape[1]:
+            out.count[:] = x.shape[1]
+            out.mean = x.mean(axis=1)
+            out.m2 = ((x - out.mean[:, None]) ** 2).sum(axis=1)
+        return out
+
+    def add(self, x: np.ndarray, rows=slice(None)) -> None:
+        """Fold in a (rows, k) batch of values for the given rows."""
+        self.merge(Moments.of(x), rows)
+
+    def merge(self, other: "Moments", rows=slice(None)) -> None:
+        na, nb = self.count[rows], other.count
+        n = na + nb
+        w = np.divide(nb, n, out=np.zeros(len(n)), where=n > 0)
+        delta = other.mean - self.mean[rows]
+        self.mean[rows] = np.where(na == 0, other.mean, self.mean[rows] + delta * w)
+        self.m2[rows] = np.where(na == 0, other.m2, self.m2[rows] + other.m2 + delta * delta * na * w)
+        self.count[rows] = n
+
+    def std(self, ddof: int = 1) -> np.ndarray:
+        """Standard deviation per row (NaN with at most ddof values)."""
+        dof = self.count - ddof
+        return np.sqrt(np.divide(self.m2, dof, out=np.full(len(dof), np.nan), where=dof > 0))
+
+
+class QuantileSketch:
+    """
+    Log-bucketed histogram per row with relative accuracy `accuracy` (as in DDSketch): a value
+    x >= min_value is counted in bucket ceil(log_gamma(x)), gamma = (1 + a) / (1 - a), and any
+    quantile is returned within a relative error a of the exact one. Smaller values (and
+    negatives) are counted as zero. Counts are integers, so merged shards give exactly the sketch
+    of the combined values, in any order. Memory follows the range of the values, not their count:
+    about log(max / min_value) / (2 a) buckets per row.
+    """
+
+    def __init__(self, n_rows: int, accuracy: float = 0.01, min_value: float = 1e-3):
+        if not 0.0 < accuracy < 1.0:
+            raise ValueError(f"accuracy must be in (0, 1), got {accuracy}")
+        self.accuracy = float(accuracy)
+        self.min_value = float(min_value)
+        self.gamma = (1.0 + accuracy) / (1.0 - accuracy)
+        self.zeros = np.zeros(n_rows, dtype=np.int64)
+        self.counts = np.zeros((n_rows, 0), dtype=np.int64)
+        self.offset = 0  # bucket key of counts[:, 0]
+
+    @property
+    def n_rows(self) -> int:
+        return len(self.zeros)
+
+    def _cover(self, lo: int, hi: int) -> None:
+        """Widen the bucket range to keys [lo, hi]."""
+        if self.counts.shape[1] == 0:
+            self.counts = np.zeros((self.n_rows, hi - lo + 1), dtype=np.int64)
+            self.offset = lo
+            return
+        start = min(lo, self.offset)
+        stop = max(hi, self.offset + self.counts.shape[1] - 1)
+        if start == self.offset and stop == self.offset + self.counts.shape[1] - 1:
+            return
+        wide = np.zeros((self.n_rows, stop - start + 1), dtype=np.int64)
+        wide[:, self.offset - start:self.offset - start + self.counts.shape[1]] = self.counts
+        self.counts, self.offset = wide, start
+
+    def add(self, x: np.ndarray, rows=slice(None)) -> None:
+        """Count a (rows, k) batch of values for the given rows."""
+        x = np.asarray(x, dtype=float)
+        idx = np.arange(self.n_rows)[rows]
+        small = ~(x >= self.min_value)
+        self.zeros[idx] += small.sum(axis=1)
+        if small.all():
+            return
+        r, c = np.nonzero(~small)
+        keys = np.ceil(np.log(x[r, c]) / math.log(self.gamma)).astype(np.int64)
+        self._cover(int(keys.min()), int(keys.max()))
+        width = self.counts.shape[1]
+        flat = np.bincount(r * width + (keys - self.offset), minlength=len(idx) * width)
+        self.counts[idx] += flat.reshape(len(idx), width)
+
+    def merge(self, other: "QuantileSketch", rows=slice(None)) -> None:
+        if other.gamma != self.gamma or other.min_value != self.min_value:
+            raise ValueError("Only sketches with the same accuracy and min_value can be merged")
+        idx = np.arange(self.n_rows)[rows]
+        self.zeros[idx] += other.zeros
+        if other.counts.shape[1] == 0:
+            return
+        self._cover(other.offset, other.offset + other.counts.shape[1] - 1)
+        lo = other.offset - self.offset
+        self.counts[idx, lo:lo + other.counts.shape[1]] += other.counts
+
+    def quantile(self, q: float) -> np.ndarray:
+        """q-quantile per row (rank q * (count - 1), as numpy's default); NaN for empty rows."""
+        total = self.zeros + self.counts.sum(axis=1)
+        rank = q * np.maximum(total - 1, 0)
+        out = np.full(self.n_rows, np.nan)
+        out[total > 0] = 0.0
+        over = (total > 0) & (rank >= self.zeros)
+        if self.counts.shape[1] and over.any():
+            cum = self.zeros[over, None] + np.cumsum(self.counts[over], axis=1)
+            key = self.offset + (cum > rank[over, None]).argmax(axis=1)
+            # the bucket (gamma^(k-1), gamma^k] is represented by the value with equal relative error to both ends
+            out[over] = 2.0 * np.power(self.gamma, key) / (self.gamma + 1.0)
+        return out
+
+    def quantiles(self, qs: Sequence[float]) -> np.ndarray:
+        """(rows, len(qs))."""
+        return np.stack([self.quantile(q) for q in qs], axis=1) if len(qs) else np.zeros((self.n_rows, 0))
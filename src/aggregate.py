@@ -1,8 +1,16 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, List, Optional, Sequence, Tuple
+import json
+import os
+import numpy as np
 import pandas as pd
 
+from src.grid import DemandGrid
+from src.io import EXTENSIONS, artifact_path, find_artifact, read_table, write_table, write_json
+
 
 @dataclass(frozen=True)
 class AggregateConfig:
@@ -14,21 +22,37 @@ def make_daily_item_series(txn: pd.DataFrame, cfg: AggregateConfig = AggregateCo
     Continuous daily time series per item (zero-filled missing days).
     Columns: date, item, demand_qty, revenue, txn_count
     """
-    daily = txn.groupby(["date", "item"], observed=False).agg(
+    return fill_daily_grid(aggregate_transactions(txn), cfg)
+
+
+def make_daily_grid(txn: pd.DataFrame) -> DemandGrid:
+    """make_daily_item_series as a compact items x days DemandGrid (always zero-filled)."""
+    return DemandGrid.from_frame(aggregate_transactions(txn))
+
+
+def aggregate_transactions(txn: pd.DataFrame, keys: Sequence[str] = ("date", "item")) -> pd.DataFrame:
+    """(date, item) totals of cleaned transactions, without zero-filling (keys may add e.g. a store column)."""
+    return txn.groupby(list(keys), observed=False).agg(
         demand_qty=("quantity", "sum"),
         revenue=("total_spent", "sum"),
         txn_count=("txn_id", "nunique"),
     ).reset_index()
 
-    daily["date"] = pd.to_datetime(daily["date"])
+
+def fill_daily_grid(daily: pd.DataFrame, cfg: AggregateConfig = AggregateConfig()) -> pd.DataFrame:
+    """Zero-fill (date, item) aggregates onto the full date x item grid (when cfg.fill_missing_days)."""
+    daily = daily.assign(date=pd.to_datetime(daily["date"]))
 
     if not cfg.fill_missing_days:
         return daily.sort_values(["item", "date"])
 
     all_dates = pd.date_range(daily["date"].min(), daily["date"].max(), freq="D")
     items = sorted(daily["item"].unique().tolist())
+    return _fill_grid(daily, all_dates, items)
 
-    idx = pd.MultiIndex.from_product([all_dates, items], names=["date", "item"])
+
+def _fill_grid(daily: pd.DataFrame, dates: pd.DatetimeIndex, items: Sequence[str]) -> pd.DataFrame:
+    idx = pd.MultiIndex.from_product([dates, items], names=["date", "item"])
     full = daily.set_index(["date", "item"]).reindex(idx).reset_index()
 
     full["demand_qty"] = full["demand_qty"].fillna(0.0)
@@ -36,3 +60,196 @@ def make_daily_item_series(txn: pd.DataFrame, cfg: AggregateConfig = AggregateCo
     full["txn_count"] = full["txn_count"].fillna(0).astype(int)
 
     return full.sort_values(["item", "date"])
+
+
+# One file per day under the store directory, so a run writes only the days it re-aggregated
+# or added. state.json is written last and lists the committed days and items.
+STATE_DAYS = "days"
+_COLUMNS = ["date", "item", "demand_qty", "revenue", "txn_count"]
+
+
+def load_daily_state(state_dir: str | Path) -> Tuple[Optional[pd.DataFrame], Optional[pd.Timestamp]]:
+    """Persisted daily aggregate store and its high-water mark on transaction date (None, None if absent)."""
+    d = Path(state_dir)
+    meta_path = d / "state.json"
+    if not meta_path.exists():
+        return None, None
+    meta = json.loads(meta_path.read_text(encoding="utf-8"))
+    days = pd.date_range(meta["first_day"], meta["watermark"], freq="D")
+    found = (find_artifact(d / STATE_DAYS, f"{day:%Y-%m-%d}") for day in days)
+    parts = [read_table(p) for p in found if p is not None]
+    daily = pd.concat(parts, ignore_index=True)[_COLUMNS] if parts else pd.DataFrame({
+        "date": pd.Series(dtype="datetime64[ns]"), "item": pd.Series(dtype=object),
+        "demand_qty": pd.Series(dtype=float), "revenue": pd.Series(dtype=float), "txn_count": pd.Series(dtype=int),
+    })
+    daily["item"] = daily["item"].astype(str)
+    if meta["filled"]:
+        daily = _fill_grid(daily, days, meta["items"])
+    return daily.sort_values(["item", "date"]).reset_index(drop=True), pd.Timestamp(meta["watermark"])
+
+
+def save_daily_state(
+    state_dir: str | Path,
+    daily: pd.DataFrame,
+    fmt: str = "csv",
+    since: Optional[pd.Timestamp] = None,
+    cfg: AggregateConfig = AggregateConfig(),
+) -> None:
+    """
+    Write the days of daily from `since` on (every day when None), one file per day, then
+    state.json. Zero-filled rows are not stored; loading fills them back in.
+    """
+    d = Path(state_dir)
+    days_dir = d / STATE_DAYS
+    daily = daily.assign(date=pd.to_datetime(daily["date"]))
+    if since is None:
+        since = daily["date"].min()
+        for p in days_dir.glob("*") if days_dir.exists() else ():
+            p.unlink()
+    part = daily[daily["date"] >= since]
+    if cfg.fill_missing_days:
+        part = part[(part["demand_qty"] != 0) | (part["revenue"] != 0) | (part["txn_count"] != 0)]
+
+    days_dir.mkdir(parents=True, exist_ok=True)
+    by_day = dict(tuple(part.groupby("date")))
+    for day in pd.date_range(since, daily["date"].max(), freq="D"):
+        stem = f"{day:%Y-%m-%d}"
+        for ext in EXTENSIONS.values():
+            (days_dir / f"{stem}{ext}").unlink(missing_ok=True)
+        if day in by_day:
+            # write then rename, so an interrupted run leaves no half-written day
+            tmp = artifact_path(days_dir, f".{stem}.tmp", fmt)
+            write_table(by_day[day][_COLUMNS], tmp)
+            os.replace(tmp, artifact_path(days_dir, stem, fmt))
+
+    write_json({
+        "watermark": pd.Timestamp(daily["date"].max()).isoformat(),
+        "first_day": pd.Timestamp(daily["date"].min()).isoformat(),
+        "filled": bool(cfg.fill_missing_days),
+        "n_items": int(daily["item"].nunique()),
+        "n_rows": int(len(daily)),
+        "items": sorted(daily["item"].astype(str).unique().tolist()),
+    }, d / "state.json")
+
+
+def append_daily(
+    daily: pd.DataFrame,
+    new: pd.DataFrame,
+    since: pd.Timestamp,
+    cfg: AggregateConfig = AggregateConfig(),
+) -> Tuple[pd.DataFrame, List[str]]:
+    """
+    Replace the days from `since` on in an existing daily frame by `new`, the (date, item)
+    aggregates of every transaction dated on or after `since` (the store's last day). That
+    day is re-aggregated, so rows that arrived late for it are counted. `new` must therefore
+    cover all of that day's rows (a cumulative feed); a day that would lose rows or demand
+    raises ValueError. With zero-filling, the grid is extended only by the new days (for every
+    item) and by the new items (for the existing days). Returns the merged frame and the items whose values changed: re-aggregated
+    days that differ from the store, new days with any demand, revenue or transactions, and
+    new items. A zero-filled new day alone does not change an item.
+    """
+    new = new.assign(date=pd.to_datetime(new["date"]), item=new["item"].astype(str))
+    if new.empty:
+        return daily, []
+    since = pd.Timestamp(since)
+    if (new["date"] == since).any():
+        _check_cumulative(daily[daily["date"] == since], new[new["date"] == since], since)
+    else:
+        since += pd.Timedelta(days=1)  # nothing for the last day (e.g. a feed of only later rows): keep the stored one
+    old, tail = daily[daily["date"] < since], daily[daily["date"] >= since]
+    cols = ["date", "item", "demand_qty", "revenue", "txn_count"]
+    old_items = set(daily["item"].unique().tolist())
+    items = sorted(old_items | set(new["item"].unique().tolist()))
+    new_items = [it for it in items if it not in old_items]
+
+    if not cfg.fill_missing_days:
+        merged = tail[cols].merge(new[cols], on=["date", "item"], how="outer", suffixes=("_old", ""))
+        changed = sorted(set(_changed_items(merged)) | set(new_items))
+        return pd.concat([old, new], ignore_index=True).sort_values(["item", "date"]), changed
+
+    old_dates = pd.DatetimeIndex(old["date"].unique()).sort_values()
+
+    new_dates = pd.date_range(since, max(new["date"].max(), daily["date"].max()), freq="D")
+    idx = pd.MultiIndex.from_product([new_dates, items], names=["date", "item"])
+    ext_days = new.set_index(["date", "item"]).reindex(idx).reset_index()
+
+    parts = [old, ext_days]
+    if new_items and len(old_dates):
+        idx = pd.MultiIndex.from_product([old_dates, new_items], names=["date", "item"])
+        parts.append(idx.to_frame(index=False))
+
+    full = pd.concat(parts, ignore_index=True)
+    full["demand_qty"] = full["demand_qty"].fillna(0.0)
+    full["revenue"] = full["revenue"].fillna(0.0)
+    full["txn_count"] = full["txn_count"].fillna(0).astype(int)
+
+    merged = tail[cols].merge(full.loc[full["date"] >= since, cols], on=["date", "item"], how="outer", suffixes=("_old", ""))
+    changed = sorted(set(_changed_items(merged)) | set(new_items))
+    return full.sort_values(["item", "date"]), changed
+
+
+def _check_cumulative(stored: pd.DataFrame, new: pd.DataFrame, day: pd.Timestamp) -> None:
+    """
+    Reject a re-aggregated day with less than the store for some item (no rows, or lower
+    demand). The input then is not the whole cumulative file, e.g. a delta feed of late rows
+    only, and replacing the day would drop the stored totals.
+    """
+    old = stored[stored["txn_count"] > 0].groupby("item")["demand_qty"].sum()
+    now = new.groupby("item")["demand_qty"].sum().reindex(old.index)
+    short = old.index[now.isna() | ((now < old) & ~np.isclose(now.fillna(0), old))]
+    if len(short):
+        raise ValueError(
+            f"Re-aggregated {day:%Y-%m-%d} has less than the store for {len(short)} item(s) "
+            f"(e.g. {', '.join(map(str, short[:5]))}): the input must be the whole cumulative file, not a delta"
+        )
+
+
+def _changed_items(merged: pd.DataFrame) -> List[str]:
+    """
+    Items with a row whose values differ between the `_old` and new columns of an outer merge.
+    A missing row counts as zeros, so a zero-filled day that was not stored before is no change.
+    """
+    diff = pd.Series(False, index=merged.index)
+    for c in ("demand_qty", "revenue", "txn_count"):
+        diff |= ~np.isclose(merged[f"{c}_old"].fillna(0), merged[c].fillna(0))
+    return sorted(merged.loc[diff, "item"].unique().tolist())
+
+
+def refresh_daily_state(
+    state_dir: str | Path,
+    aggregate_since: Callable[[Optional[pd.Timestamp]], pd.DataFrame],
+    cfg: AggregateConfig = AggregateConfig(),
+    fmt: str = "csv",
+) -> Tuple[pd.DataFrame, List[str]]:
+    """
+    Incremental make_daily_item_series for append-only feeds. aggregate_since(watermark)
+    returns the (date, item) aggregates of the transactions dated on or after the persisted
+    high-water mark (all of them when there is no store yet); they are merged into the store,
+    which is saved back. Returns the full daily frame and the items whose values changed (see
+    append_daily; all items on the first run).
+    """
+    daily, watermark = load_daily_state(state_dir)
+    if daily is None:
+        daily = fill_daily_grid(aggregate_since(None), cfg)
+        save_daily_state(state_dir, daily, fmt, cfg=cfg)
+        return daily, sorted(daily["item"].unique().tolist())
+
+    daily, changed = append_daily(daily, aggregate_since(watermark), watermark, cfg)
+    if changed or daily["date"].max() > watermark:
+        save_daily_state(state_dir, daily, fmt, since=watermark, cfg=cfg)
+    return daily, changed
+
+
+def update_daily_state(
+    txn: pd.DataFrame,
+    state_dir: str | Path,
+    cfg: AggregateConfig = AggregateConfig(),
+    fmt: str = "csv",
+) -> Tuple[pd.DataFrame, List[str]]:
+    """refresh_daily_state from cleaned transactions already in memory."""
+    return refresh_daily_state(
+        state_dir,
+        lambda since: aggregate_transactions(txn if since is None else txn[txn["date"] >= since]),
+        cfg,
+        fmt,
+    )
@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from src.synthetic import SyntheticConfig, make_synthetic_sales
+from src.clean import clean_transactions, CleanConfig
+from src.aggregate import make_daily_item_series, AggregateConfig
+from src.forecast import run_forecasting, ForecastConfig
+from src.inventory import compute_rop_policy, simulate_policy, InventoryConfig
+
+TIERS: Dict[str, SyntheticConfig] = {
+    "small": SyntheticConfig(n_items=20, n_days=180, txn_per_day=200),
+    "medium": SyntheticConfig(n_items=200, n_days=365, txn_per_day=2_000),
+    "large": SyntheticConfig(n_items=1_000, n_days=730, txn_per_day=10_000),
+}
+
+
+def _best_of(fn: Callable[[], Any], repeat: int) -> tuple[float, Any]:
+    best, out = float("inf"), None
+    for _ in range(max(1, repeat)):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def bench_tier(cfg: SyntheticConfig, repeat: int = 3, figures: bool = True, simulation_runs: int = 300) -> Dict[str, Any]:
+    """Seconds (best of `repeat`) for each public stage on one synthetic dataset."""
+    raw = make_synthetic_sales(cfg)
+    fcfg = ForecastConfig()
+    icfg = InventoryConfig(simulation_runs=simulation_runs)
+    timings: Dict[str, float] = {}
+
+    timings["clean_transactions"], txn = _best_of(lambda: clean_transactions(raw, CleanConfig()), repeat)
+    timings["make_daily_item_series"], daily = _best_of(lambda: make_daily_item_series(txn, AggregateConfig()), repeat)
+    timings["run_forecasting"], (_, _, fc) = _best_of(lambda: run_forecasting(daily, fcfg), repeat)
+    timings["run_forecasting_batched"], (backtest, _, _) = _best_of(
+        lambda: run_forecasting(daily, ForecastConfig(backtest_mode="batched")), repeat
+    )
+    timings["compute_rop_policy"], policy = _best_of(lambda: compute_rop_policy(daily, fc, icfg), repeat)
+    timings["simulate_policy"], _ = _best_of(lambda: simulate_policy(fc, policy, icfg), repeat)
+
+    if figures:
+        from src.reporting import fig_item_revenue_ranking, fig_backtest_summary, fig_forecast_examples, fig_rop_vs_demand
+
+        with tempfile.TemporaryDirectory() as tmp:
+            d = Path(tmp)
+            timings["fig_item_revenue_ranking"], _ = _best_of(lambda: fig_item_revenue_ranking(daily, d / "a.png"), repeat)
+            timings["fig_backtest_summary"], _ = _best_of(lambda: fig_backtest_summary(backtest, d / "b.png"), repeat)
+            timings["fig_forecast_examples"], _ = _best_of(lambda: fig_forecast_examples(daily, fc, d / "c.png"), repeat)
+            timings["fig_rop_vs_demand"], _ = _best_of(lambda: fig_rop_vs_demand(policy, d / "d.png"), repeat)
+
+    return {
+        "config": {**cfg.__dict__},
+        "rows": {"raw": int(len(raw)), "txn": int(len(txn)), "daily": int(len(daily)), "items": int(daily["item"].nunique())},
+        "seconds": timings,
+    }
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float = 0.25, min_seconds: float = 0.01) -> pd.DataFrame:
+    """
+    One row per (tier, stage) present in both runs. A stage regresses when it is more than
+    `threshold` slower than the baseline and the slowdown exceeds `min_seconds` (noise floor).
+    """
+    rows: List[Dict[str, Any]] = []
+    for tier, res in results["tiers"].items():
+        base = baseline.get("tiers", {}).get(tier)
+        if not base:
+            continue
+        for stage, secs in res["seconds"].items():
+            ref = base["seconds"].get(stage)
+            if ref is None:
+                continue
+            ratio = secs / ref if ref > 0 else float("inf")
+            rows.append({
+                "tier": tier,
+                "stage": stage,
+                "baseline_s": ref,
+                "current_s": secs,
+                "ratio": ratio,
+                "regression": bool(ratio > 1.0 + threshold and secs - ref > min_seconds),
+            })
+    return pd.DataFrame(rows, columns=["tier", "stage", "baseline_s", "current_s", "ratio", "regression"])
+
+
+# Environment fields that must match for timings to be comparable (the full platform string
+# also carries e.g. the kernel build, so it is recorded but not compared).
+MATCH_KEYS = ("python", "numpy", "pandas", "machine", "cpu", "cpu_count")
+
+
+def _cpu_model() -> str:
+    try:
+        for line in Path("/proc/cpuinfo").read_text(encoding="utf-8").splitlines():
+            if line.startswith("model name"):
+                return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor()
+
+
+def environment() -> Dict[str, Any]:
+    """Interpreter, library versions and CPU of this run, stored with the results."""
+    return {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu": _cpu_model(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+    }
+
+
+def environment_mismatch(results: Dict[str, Any], baseline: Dict[str, Any]) -> Dict[str, tuple]:
+    """MATCH_KEYS whose values differ between two result files: key -> (baseline, current)."""
+    cur, base = results.get("environment", {}), baseline.get("environment", {})
+    return {k: (base.get(k), cur.get(k)) for k in MATCH_KEYS if base.get(k) != cur.get(k)}
+
+
+def run_benchmarks(tiers: Sequence[str], repeat: int = 3, figures: bool = True, simulation_runs: int = 300) -> Dict[str, Any]:
+    out: Dict[str, Any] = {
+        "environment": environment(),
+        "repeat": repeat,
+        "tiers": {},
+    }
+    for name in tiers:
+        if name not in TIERS:
+            raise ValueError(f"Unknown tier: {name!r} (expected one of {sorted(TIERS)})")
+        print(f"[bench] {name} ...", flush=True)
+        out["tiers"][name] = bench_tier(TIERS[name], repeat=repeat, figures=figures, simulation_runs=simulation_runs)
+    return out
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark pipeline stages on synthetic café sales")
+    parser.add_argument("--tiers", default="small,medium", help=f"Comma-separated scale tiers ({', '.join(TIERS)})")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per stage (best time is kept)")
+    parser.add_argument("--sim-runs", type=int, default=300, help="Simulation runs per item")
+    parser.add_argument("--no-figures", action="store_true", help="Skip the figure functions")
+    parser.add_argument("--out", default="bench_results.json", help="Where to write the results JSON")
+    parser.add_argument("--baseline", default=None, help="Baseline results JSON to compare against (must exist unless --save-baseline); bench/baseline.json holds the small tier")
+    parser.add_argument("--save-baseline", action="store_true", help="Also write the results to --baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed slowdown vs baseline (0.25 = 25%%)")
+    parser.add_argument("--any-environment", action="store_true", help="Fail on regressions even if the baseline was recorded in a different environment")
+    args = parser.parse_args(argv)
+
+    if args.save_baseline and not args.baseline:
+        parser.error("--save-baseline needs --baseline PATH")
+    if args.baseline and not args.save_baseline and not Path(args.baseline).exists():
+        # a missing baseline must not pass as "no regressions"
+        parser.error(f"baseline not found: {args.baseline} (create it with --save-baseline)")
+
+    tiers = [t.strip() for t in args.tiers.split(",") if t.strip()]
+    results = run_benchmarks(tiers, repeat=args.repeat, figures=not args.no_figures, simulation_runs=args.sim_runs)
+
+    Path(args.out).write_text(json.dumps(results, indent=2), encoding="utf-8")
+    for tier, res in results["tiers"].items():
+        print(f"\n{tier}: {res['rows']}")
+        for stage, secs in res["seconds"].items():
+            print(f"  {stage:<28} {secs * 1e3:10.1f} ms")
+
+    status = 0
+    if args.baseline and not args.save_baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        cmp = compare(results, baseline, threshold=args.threshold)
+        print("\nComparison vs baseline:")
+        print(cmp.to_string(index=False) if not cmp.empty else "  (no overlapping tiers/stages)")
+        mismatch = environment_mismatch(results, baseline)
+        if mismatch:
+            # timings from another machine or library version are not a regression signal
+            print("\nWARNING: baseline environment differs, so timings are not comparable:")
+            for key, (base, cur) in mismatch.items():
+                print(f"  {key}: baseline {base!r}, current {cur!r}")
+        if cmp["regression"].any():
+            print(f"\nREGRESSIONS: {int(cmp['regression'].sum())} stage(s) slower than baseline by > {args.threshold:.0%}")
+            if mismatch and not args.any_environment:
+                print("Not failing: re-save the baseline here with --save-baseline (or pass --any-environment)")
+            else:
+                status = 1
+    if args.save_baseline:
+        Path(args.baseline).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.baseline).write_text(json.dumps(results, indent=2), encoding="utf-8")
+        print(f"\nBaseline saved to {args.baseline}")
+    return status
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Optional, Tuple
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from src.grid import DemandGrid
+from src.store import SeriesStore
+from src.forecast import ForecastConfig, pack_matrix, test_size, model_forecasts
+
+
+@dataclass(frozen=True)
+class BootstrapConfig:
+    block_days: int = 7  # residuals are resampled in blocks of consecutive days (keeps weekly structure)
+    max_paths: int = 1000  # sample paths per item, at most
+    memory_mb: float = 256.0  # budget for the (items, paths, horizon) float32 path array
+    random_seed: int = 42
+
+
+@dataclass
+class DemandPaths:
+    """Empirical demand sample paths per item (rows in sorted item order) and the residual sigma behind them."""
+    items: np.ndarray  # (items,)
+    paths: np.ndarray  # (items, paths, horizon) float32, clipped at zero
+    sigma: np.ndarray  # (items,) RMSE of the backtest residuals (NaN with fewer than 2)
+    n_residuals: np.ndarray  # (items,)
+
+    def for_items(self, items) -> np.ndarray:
+        """Paths with rows in the given item order (e.g. the simulator's sorted policy items)."""
+        pos = pd.Index(self.items).astype(str).get_indexer(pd.Index(items).astype(str))
+        if (pos < 0).any():
+            raise ValueError(f"No demand paths for {int((pos < 0).sum())} items")
+        return self.paths if (pos == np.arange(len(self.items))).all() else self.paths[pos]
+
+
+def _residual_rows(Y: np.ndarray, best: np.ndarray, cfg: ForecastConfig) -> np.ndarray:
+    """Backtest-window errors (actual - clipped forecast) of each row's model, for rows on one date grid."""
+    n = Y.shape[1]
+    if n <= 2:
+        return np.empty((len(Y), 0))
+    test_n = test_size(n, cfg)
+    pred = model_forecasts(Y[:, :-test_n], best, test_n, cfg)
+    return Y[:, -test_n:] - np.clip(pred, 0.0, None)
+
+
+def backtest_residuals(
+    daily: pd.DataFrame | DemandGrid,
+    selection: pd.DataFrame,
+    cfg: ForecastConfig,
+    store: Optional[SeriesStore] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Out-of-sample errors of every item's selected model over its backtest window: (items, R),
+    R (items, m) with rows of shorter series left-padded with NaN. Items on one date grid are
+    computed as a single matrix.
+    """
+    if isinstance(daily, DemandGrid):
+        items, Y = daily.items, daily.matrix("demand_qty")
+    else:
+        store = store if store is not None else SeriesStore.from_frame(daily, ["demand_qty"])
+        items, Y = store.items, pack_matrix(store, "demand_qty")
+    best = selection.set_index(selection["item"].astype(str))["best_model"].reindex(pd.Index(items).astype(str)).fillna("").to_numpy()
+
+    if Y is not None:
+        return items, _residual_rows(Y, best, cfg)
+
+    rows = [_residual_rows(store.values("demand_qty", i)[None, :], best[i:i + 1], cfg)[0] for i in range(len(store))]
+    width = max([len(r) for r in rows] + [0])
+    R = np.full((len(rows), width), np.nan)
+    for i, r in enumerate(rows):
+        R[i, width - len(r):] = r
+    return items, R
+
+
+def path_count(n_items: int, horizon: int, runs: int, cfg: BootstrapConfig = BootstrapConfig()) -> int:
+    """Sample paths per item: runs, capped by max_paths and the float32 memory budget."""
+    per_path = max(1, n_items * horizon * 4)
+    budget = int(cfg.memory_mb * 2 ** 20) // per_path
+    return int(max(1, min(int(runs), int(cfg.max_paths), budget)))
+
+
+def bootstrap_paths(
+    forecast: np.ndarray,
+    residuals: np.ndarray,
+    runs: int,
+    cfg: BootstrapConfig = BootstrapConfig(),
+    fallback_sigma: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    (items, runs, horizon) float32 demand = forecast + circular block bootstrap of each row's
+    residuals (NaN-padded on the left), clipped at zero. All items are drawn in one gather.
+    Items without residuals get N(0, fallback_sigma) noise (zero if not given).
+    """
+    n_items, horizon = forecast.shape
+    valid = ~np.isnan(residuals)
+    m = np.maximum(valid.sum(axis=1), 1)
+    width = residuals.shape[1]
+    filled = np.where(valid, residuals, 0.0).astype(np.float32)
+    rng = np.random.default_rng([int(cfg.random_seed), 2])
+
+    b = max(1, int(cfg.block_days))
+    n_blocks = -(-horizon // b)
+    paths = np.empty((n_items, runs, horizon), dtype=np.float32)
+    # items in blocks, so the int32 gather indices stay within ~16 MB
+    step = max(1, (4 << 20) // max(1, runs * n_blocks * b))
+    for lo in range(0, n_items, step):
+        hi = min(n_items, lo + step)
+        # circular blocks: start anywhere in an item's residuals and wrap around
+        starts = (rng.random((hi - lo, runs, n_blocks)) * m[lo:hi, None, None]).astype(np.int32)
+        pos = (starts[..., None] + np.arange(b, dtype=np.int32)).reshape(hi - lo, runs, n_blocks * b)[:, :, :horizon]
+        pos = pos % m[lo:hi, None, None].astype(np.int32) + (width - m[lo:hi])[:, None, None].astype(np.int32)
+        if width:
+            paths[lo:hi] = np.take_along_axis(filled[lo:hi, None, :], pos, axis=2)
+        else:
+            paths[lo:hi] = 0.0
+
+    empty = np.flatnonzero(~valid.any(axis=1))
+    if fallback_sigma is not None and len(empty):
+        paths[empty] = rng.normal(0.0, fallback_sigma[empty, None, None], size=(len(empty), runs, horizon))
+
+    paths += forecast.astype(np.float32)[:, None, :]
+    np.clip(paths, 0.0, None, out=paths)
+    return paths
+
+
+def demand_paths(
+    daily: pd.DataFrame | DemandGrid,
+    selection: pd.DataFrame,
+    forecast_next: pd.DataFrame,
+    fcfg: ForecastConfig,
+    runs: int,
+    cfg: BootstrapConfig = BootstrapConfig(),
+    sigma_floor: float = 0.25,
+) -> DemandPaths:
+    """
+    Residuals of the selected models plus block-bootstrapped paths around forecast_next, for
+    every item. Warns (RuntimeWarning) when path_count caps the paths below `runs`.
+    """
+    items, R = backtest_residuals(daily, selection, fcfg)
+    fstore = SeriesStore.from_frame(forecast_next, ["forecast_qty"])
+    horizon = int(pd.to_datetime(forecast_next["date"]).nunique()) if len(forecast_next) else 0
+    F = np.zeros((len(items), horizon))
+    for k, it in enumerate(items):
+        v = fstore.get(str(it), "forecast_qty")[:horizon]
+        F[k, :len(v)] = v
+
+    n = (~np.isnan(R)).sum(axis=1)
+    sigma = np.full(len(items), np.nan)
+    if (n >= 2).any():
+        # RMSE, not the std: a biased model's errors are part of the demand uncertainty it leaves
+        sigma[n >= 2] = np.sqrt(np.nanmean(R[n >= 2] ** 2, axis=1))
+    n_paths = path_count(len(items), horizon, runs, cfg)
+    if n_paths < int(runs):
+        warnings.warn(
+            f"Bootstrap demand paths capped at {n_paths} per item (of {int(runs)} simulation runs) by "
+            f"max_paths={cfg.max_paths} / memory_mb={cfg.memory_mb:g}; the simulation replays {n_paths} runs",
+            RuntimeWarning,
+            stacklevel=2,
+        )
+    paths = bootstrap_paths(F, R, n_paths, cfg, np.full(len(items), sigma_floor))
+    return DemandPaths(np.asarray(items, dtype=object), paths, sigma, n)
+
+
+def with_residual_sigma(stats: pd.DataFrame, paths: DemandPaths, sigma_floor: float = 0.25) -> pd.DataFrame:
+    """demand_stats with sigma_daily_demand taken from the backtest residual RMSE where there are any."""
+    sigma = pd.Series(paths.sigma, index=pd.Index(paths.items).astype(str)).reindex(stats["item"].astype(str)).to_numpy()
+    out = stats.copy()
+    out["sigma_daily_demand"] = np.where(np.isnan(sigma), out["sigma_daily_demand"], np.maximum(sigma, sigma_floor))
+    return out
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+from dataclasses import asdict, is_dataclass
+from pathlib import Path
+from typing import Any, Optional
+import hashlib
+import json
+import os
+import pickle
+
+
+# Part of every stage key: bump it when a stage's result changes for the same inputs and
+# configs (e.g. a new output column or a different random stream), so older entries miss.
+CACHE_VERSION = 3
+
+
+def file_digest(path: str | Path, block_size: int = 1 << 20) -> str:
+    """sha256 of a file's contents."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def stage_key(*parts: Any) -> str:
+    """Content hash of stage inputs: strings, numbers, upstream keys and (frozen) config dataclasses, plus CACHE_VERSION."""
+    norm = [CACHE_VERSION] + [{type(p).__name__: asdict(p)} if is_dataclass(p) else p for p in parts]
+    return hashlib.sha256(json.dumps(norm, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class StageCache:
+    """
+    On-disk cache of pipeline stage results, one pickle per key.
+    Reads refresh the entry's mtime; writes evict least-recently-used entries
+    beyond max_entries / max_bytes.
+    """
+
+    def __init__(self, root: str | Path, max_entries: int = 32, max_bytes: Optional[int] = None):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+    def _path(self, stage: str, key: str) -> Path:
+        return self.root / f"{stage}-{key}.pkl"
+
+    def get(self, stage: str, key: str) -> Optional[Any]:
+        """Cached value, or None on a miss. An entry that fails to load (truncated, or pickled by
+        code that no longer matches) is a miss too and is removed."""
+        p = self._path(stage, key)
+        try:
+            with open(p, "rb") as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            p.unlink(missing_ok=True)
+            return None
+        os.utime(p)
+        return value
+
+    def put(self, stage: str, key: str, value: Any) -> None:
+        p = self._path(stage, key)
+        tmp = p.with_suffix(f".tmp{os.getpid()}")
+        with open(tmp, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, p)
+        self.evict()
+
+    def evict(self) -> None:
+        entries = sorted(self.root.glob("*.pkl"), key=lambda p: p.stat().st_mtime, reverse=True)
+        total = 0
+        for i, p in enumerate(entries):
+            total += p.stat().st_size
+            over_count = self.max_entries is not None and i >= self.max_entries
+            over_size = self.max_bytes is not None and total > self.max_bytes and i > 0
+            if over_count or over_size:
+                p.unlink(missing_ok=True)
@@ -4,6 +4,9 @@ from dataclasses import dataclass
 import pandas as pd
 
 
+REQUIRED_COLUMNS = ("Transaction ID", "Item", "Quantity", "Price Per Unit", "Total Spent", "Transaction Date")
+
+
 @dataclass(frozen=True)
 class CleanConfig:
     drop_items: tuple[str, ...] = ("unknown", "error")
@@ -12,8 +15,7 @@ class CleanConfig:
 def clean_transactions(df: pd.DataFrame, cfg: CleanConfig = CleanConfig()) -> pd.DataFrame:
     out = df.copy()
 
-    required = ["Transaction ID", "Item", "Quantity", "Price Per Unit", "Total Spent", "Transaction Date"]
-    missing = [c for c in required if c not in out.columns]
+    missing = [c for c in REQUIRED_COLUMNS if c not in out.columns]
     if missing:
         raise ValueError(f"Missing required columns: {missing}")
 
@@ -1,10 +1,25 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Dict, Tuple, List
+from dataclasses import dataclass, replace
+from typing import Any, Dict, Tuple, List, Optional
+import time
 import numpy as np
 import pandas as pd
 
+from src.grid import DemandGrid, intermittency
+from src.models import (
+    Forecaster,
+    charge,
+    fallback_model,
+    find_forecaster,
+    fit_predict,
+    forecasters,
+    merge_costs,
+    model_costs,
+)
+from src.parallel import ExecutorConfig, chunk_ranges, map_chunks
+from src.store import SeriesStore
+
 
 @dataclass(frozen=True)
 class ForecastConfig:
@@ -12,35 +27,20 @@ class ForecastConfig:
     backtest_days: int = 28
     ma_window: int = 7
     ewma_alpha: float = 0.3
+    ewma_alpha_grid: Tuple[float, ...] = ()  # if set, every alpha is backtested and chosen per item
     seasonal_period: int = 7  # weekly
+    backtest_mode: str = "per_item"  # "per_item" | "batched" (items x days matrix)
+    backtest_folds: int = 1  # >1 = rolling-origin cross-validation
+    backtest_step: int = 7  # days between consecutive origins
+    intermittent_adi: float = 1.32  # items with ADI >= this are also backtested with croston / sba / tsb (inf = off)
+    intermittent_alpha: float = 0.1  # Croston / SBA / TSB smoothing of demand sizes and intervals
+    tsb_beta: float = 0.1  # TSB smoothing of the demand probability
+    cost_penalty: float = 0.0  # selection adds this many MAE units per unit of declared model cost (see Forecaster.cost)
 
 
-def _seasonal_naive(train: pd.Series, horizon: int, period: int = 7) -> np.ndarray:
-    if len(train) < period:
-        return np.repeat(train.iloc[-1] if len(train) else 0.0, horizon)
-    last = train.iloc[-period:].to_numpy()
-    reps = int(np.ceil(horizon / period))
-    return np.tile(last, reps)[:horizon]
-
-
-def _moving_average(train: pd.Series, horizon: int, window: int = 7) -> np.ndarray:
-    w = min(window, max(1, len(train)))
-    level = float(train.iloc[-w:].mean()) if len(train) else 0.0
-    return np.repeat(level, horizon)
-
-
-def _ewma_level(train: pd.Series, alpha: float = 0.3) -> float:
-    if len(train) == 0:
-        return 0.0
-    level = float(train.iloc[0])
-    for x in train.iloc[1:]:
-        level = alpha * float(x) + (1 - alpha) * level
-    return level
-
-
-def _ewma_forecast(train: pd.Series, horizon: int, alpha: float = 0.3) -> np.ndarray:
-    level = _ewma_level(train, alpha)
-    return np.repeat(level, horizon)
+def _intermittent_rows(Y: np.ndarray, cfg: ForecastConfig) -> np.ndarray:
+    """Rows routed to the intermittent models as well (ADI at or above cfg.intermittent_adi)."""
+    return intermittency(Y) >= cfg.intermittent_adi
 
 
 def _metrics(y_true: np.ndarray, y_pred: np.ndarray) -> Dict[str, float]:
@@ -53,71 +53,411 @@ def _metrics(y_true: np.ndarray, y_pred: np.ndarray) -> Dict[str, float]:
     return {"mae": mae, "rmse": rmse, "mape": mape}
 
 
-def backtest_item(series: pd.Series, cfg: ForecastConfig) -> pd.DataFrame:
+def test_size(n: int, cfg: ForecastConfig) -> int:
+    """Days held out for the backtest of an n-day series (also used by src.bootstrap for its residuals)."""
+    return min(cfg.backtest_days, max(1, n // 4)) if n > 10 else min(cfg.backtest_days, max(1, n - 1))
+
+
+def backtest_item(
+    series: pd.Series,
+    cfg: ForecastConfig,
+    intermittent: bool = False,
+    costs: Optional[Dict[str, Dict[str, float]]] = None,
+) -> pd.DataFrame:
+    """
+    Scores of every registered model (plus the intermittent models for intermittent items),
+    best first. Models whose warm-up is longer than the training window are skipped.
+    """
     n = len(series)
+    if cfg.backtest_folds > 1 and n > 2:
+        Y = series.to_numpy(dtype=float)[None, :]
+        return backtest_matrix(Y, np.array([None]), cfg, np.array([intermittent]), costs).drop(columns="item")
     if n <= 2:
-        return pd.DataFrame([{"model": "moving_average_7d", "mae": float("nan"), "rmse": float("nan"), "mape": float("nan")}])
+        return pd.DataFrame([{"model": fallback_model(cfg), "mae": float("nan"), "rmse": float("nan"), "mape": float("nan")}])
 
-    test_n = min(cfg.backtest_days, max(1, n // 4)) if n > 10 else min(cfg.backtest_days, max(1, n - 1))
-    train = series.iloc[:-test_n]
-    test = series.iloc[-test_n:]
+    test_n = test_size(n, cfg)
+    y = series.to_numpy(dtype=float)
+    train, test = y[None, :-test_n], y[-test_n:]
 
     rows = []
+    for fam in forecasters(cfg, intermittent):
+        if train.shape[1] < fam.warmup:
+            continue
+        for model, pred in fit_predict(fam, train, test_n, costs).items():
+            rows.append({"model": model, **_metrics(test, pred[0])})
 
-    pred = _seasonal_naive(train, test_n, cfg.seasonal_period)
-    rows.append({"model": "seasonal_naive_weekly", **_metrics(test.to_numpy(), pred)})
+    return pd.DataFrame(rows).sort_values("mae", kind="stable")
 
-    pred = _moving_average(train, test_n, cfg.ma_window)
-    rows.append({"model": f"moving_average_{cfg.ma_window}d", **_metrics(test.to_numpy(), pred)})
 
-    pred = _ewma_forecast(train, test_n, cfg.ewma_alpha)
-    rows.append({"model": f"ewma_alpha_{cfg.ewma_alpha}", **_metrics(test.to_numpy(), pred)})
+def overall_scores(scores: pd.DataFrame) -> pd.DataFrame:
+    """Aggregated rows of a backtest (drops per-fold rows of a rolling-origin backtest)."""
+    if "fold" not in scores.columns:
+        return scores
+    return scores[scores["fold"].astype(str) == "all"]
 
-    return pd.DataFrame(rows).sort_values("mae")
 
+def _selection_score(scores: pd.DataFrame, cfg: ForecastConfig) -> np.ndarray:
+    """MAE plus cfg.cost_penalty per unit of the model's declared cost."""
+    mae = scores["mae"].to_numpy(dtype=float)
+    if not cfg.cost_penalty:
+        return mae
+    return mae + cfg.cost_penalty * model_costs(cfg, scores["model"].to_numpy())
 
-def choose_model(scores: pd.DataFrame) -> str:
-    scores2 = scores.dropna(subset=["mae"])
+
+def choose_model(scores: pd.DataFrame, cfg: ForecastConfig = ForecastConfig()) -> str:
+    scores2 = overall_scores(scores).dropna(subset=["mae"])
     if scores2.empty:
-        return "moving_average_7d"
-    return str(scores2.sort_values("mae").iloc[0]["model"])
+        return fallback_model(cfg)
+    return str(scores2["model"].iloc[int(np.argmin(_selection_score(scores2, cfg)))])
+
+
+def forecast_item(
+    series: pd.Series,
+    model_name: str,
+    cfg: ForecastConfig,
+    costs: Optional[Dict[str, Dict[str, float]]] = None,
+) -> np.ndarray:
+    fam = find_forecaster(model_name, cfg)
+    if fam is None:
+        model_name = fallback_model(cfg)
+        fam = find_forecaster(model_name, cfg)
+    return fit_predict(fam, series.to_numpy(dtype=float)[None, :], cfg.horizon_days, costs)[model_name][0]
+
+
+def pack_matrix(store: SeriesStore, col: str) -> Optional[np.ndarray]:
+    """(items x days) view of a store whose items all share one date grid, else None."""
+    lengths = np.diff(store.offsets)
+    if len(store) == 0 or (lengths != lengths[0]).any():
+        return None
+    n = int(lengths[0])
+    dates = store.dates.reshape(len(store), n)
+    if not (dates == dates[:1]).all():
+        return None
+    return store.columns[col].reshape(len(store), n)
+
+
+def model_forecasts(
+    Y: np.ndarray,
+    models: np.ndarray,
+    horizon: int,
+    cfg: ForecastConfig,
+    costs: Optional[Dict[str, Dict[str, float]]] = None,
+) -> np.ndarray:
+    """
+    (items x horizon) forecast of every row of Y by its own model (unknown names use the
+    fallback). Each family is fitted once, on the rows that selected one of its models.
+    """
+    models = np.asarray(models, dtype=object)
+    fallback = fallback_model(cfg)
+    families: Dict[Tuple[str, ...], Forecaster] = {}
+    for name in dict.fromkeys(models):
+        fam = find_forecaster(str(name), cfg)
+        if fam is None:
+            models = np.where(models == name, fallback, models)
+            fam = find_forecaster(fallback, cfg)
+        families.setdefault(fam.names, fam)
+
+    out = np.zeros((len(Y), horizon))
+    for names, fam in families.items():
+        rows = np.flatnonzero(np.isin(models, names))
+        for model, pred in fit_predict(fam, Y[rows], horizon, costs).items():
+            hit = models[rows] == model
+            out[rows[hit]] = pred[hit]
+    return out
+
+
+def _batch_metrics(y_true: np.ndarray, y_pred: np.ndarray) -> Dict[str, np.ndarray]:
+    err = y_true - y_pred
+    mae = np.abs(err).mean(axis=1)
+    rmse = np.sqrt((err ** 2).mean(axis=1))
+    mask = y_true > 0
+    ape = np.divide(np.abs(err), y_true, out=np.zeros_like(err), where=mask)
+    cnt = mask.sum(axis=1)
+    mape = np.divide(ape.sum(axis=1) * 100.0, cnt, out=np.full(len(cnt), np.nan), where=cnt > 0)
+    return {"mae": mae, "rmse": rmse, "mape": mape}
 
 
-def forecast_item(series: pd.Series, model_name: str, cfg: ForecastConfig) -> np.ndarray:
-    h = cfg.horizon_days
-    if model_name == "seasonal_naive_weekly":
-        return _seasonal_naive(series, h, cfg.seasonal_period)
-    if model_name.startswith("moving_average_"):
-        return _moving_average(series, h, cfg.ma_window)
-    if model_name.startswith("ewma_alpha_"):
-        return _ewma_forecast(series, h, cfg.ewma_alpha)
-    return _moving_average(series, h, cfg.ma_window)
+def _family_rows(cfg: ForecastConfig, intermittent: np.ndarray) -> List[Tuple[Forecaster, np.ndarray]]:
+    """Registered families with the rows each is scored on (intermittent families: routed rows only)."""
+    every = np.arange(len(intermittent))
+    routed = np.flatnonzero(intermittent)
+    out = []
+    for fam in forecasters(cfg):
+        rows = routed if fam.intermittent else every
+        if len(rows):
+            out.append((fam, rows))
+    return out
+
+
+def backtest_matrix(
+    Y: np.ndarray,
+    items: np.ndarray,
+    cfg: ForecastConfig,
+    intermittent: Optional[np.ndarray] = None,
+    costs: Optional[Dict[str, Dict[str, float]]] = None,
+) -> pd.DataFrame:
+    """
+    Batched equivalent of backtest_item over an (items x days) matrix on a common date grid.
+    Same schema as the per-item path: item, model, mae, rmse, mape. Rows flagged in
+    intermittent (default: by ADI) are also scored on the intermittent models. Fit and
+    predict time per model is added to costs.
+    """
+    n = Y.shape[1]
+    if n <= 2:
+        return pd.DataFrame({"item": items, "model": fallback_model(cfg), "mae": np.nan, "rmse": np.nan, "mape": np.nan})
+    if intermittent is None:
+        intermittent = _intermittent_rows(Y, cfg)
+    if cfg.backtest_folds > 1:
+        return _rolling_origin_matrix(Y, items, cfg, intermittent, costs)
+
+    test_n = test_size(n, cfg)
+    train, test = Y[:, :-test_n], Y[:, -test_n:]
+
+    frames = []
+    for fam, rows in _family_rows(cfg, intermittent):
+        if train.shape[1] < fam.warmup:
+            continue
+        every = len(rows) == len(Y)
+        for model, pred in fit_predict(fam, train if every else train[rows], test_n, costs).items():
+            m = _batch_metrics(test if every else test[rows], pred)
+            frames.append(pd.DataFrame({"item": items[rows], "model": model, **m, "_pos": rows}))
+
+    scores = pd.concat(frames, ignore_index=True)
+    scores = scores.sort_values(["_pos", "mae"], kind="stable").drop(columns="_pos")
+    return scores.reset_index(drop=True)
+
+
+def _rolling_origin_matrix(
+    Y: np.ndarray,
+    items: np.ndarray,
+    cfg: ForecastConfig,
+    intermittent: np.ndarray,
+    costs: Optional[Dict[str, Dict[str, float]]] = None,
+) -> pd.DataFrame:
+    """
+    Rolling-origin backtest: folds end every backtest_step days up to the last day.
+    Incremental families carry their state from one origin to the next (EWMA levels,
+    the last window / season, Croston state), so all folds together cost about one pass
+    over the series; the others are refitted at every origin.
+    Emits per-fold rows (fold = 1..K) plus aggregated rows (fold = "all", mean over folds).
+    """
+    n_items, n = Y.shape
+    test_n = test_size(n, cfg)
+    step = max(1, int(cfg.backtest_step))
+    origins = [n - test_n - k * step for k in range(int(cfg.backtest_folds))][::-1]
+    origins = [o for o in origins if o >= 2]
+
+    families = _family_rows(cfg, intermittent)
+    states: List[Optional[np.ndarray]] = [None] * len(families)
+    fitted = [0] * len(families)
+
+    frames = []
+    for fold, o in enumerate(origins, start=1):
+        test = Y[:, o:o + test_n]
+        for k, (fam, rows) in enumerate(families):
+            if o < fam.warmup:
+                continue
+            every = len(rows) == n_items
+            t0 = time.perf_counter()
+            if fam.incremental and states[k] is not None:
+                states[k] = fam.update(states[k], Y[:, fitted[k]:o] if every else Y[rows, fitted[k]:o])
+            else:
+                states[k] = fam.fit(Y[:, :o] if every else Y[rows, :o])
+            fitted[k] = o
+            t1 = time.perf_counter()
+            preds = fam.predict(states[k], test_n)
+            charge(costs, fam, t1 - t0, time.perf_counter() - t1, len(rows))
+            for model, pred in preds.items():
+                m = _batch_metrics(test if every else test[rows], pred)
+                frames.append(pd.DataFrame({"item": items[rows], "model": model, "fold": fold, **m, "_pos": rows}))
+
+    if not frames:
+        # history too short for any origin (or any family at them): score the single split
+        single = backtest_matrix(Y, items, replace(cfg, backtest_folds=1), intermittent, costs)
+        single.insert(2, "fold", "all")
+        return single
+
+    per_fold = pd.concat(frames, ignore_index=True)
+
+    agg = per_fold.groupby(["_pos", "model"], sort=False)[["mae", "rmse", "mape"]].mean().reset_index()
+    agg["item"] = items[agg["_pos"].to_numpy()]
+    agg["fold"] = "all"
+    agg = agg.sort_values(["_pos", "mae"], kind="stable")
+    per_fold = per_fold.sort_values(["_pos", "fold"], kind="stable")
+
+    out = pd.concat([agg, per_fold], ignore_index=True).sort_values("_pos", kind="stable")
+    return out[["item", "model", "fold", "mae", "rmse", "mape"]].reset_index(drop=True)
+
+
+def _run_forecasting_batched(
+    Y: np.ndarray,
+    items: np.ndarray,
+    last_date: pd.Timestamp,
+    cfg: ForecastConfig,
+    intermittent: Optional[np.ndarray] = None,
+    costs: Optional[Dict[str, Dict[str, float]]] = None,
+) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    if intermittent is None:
+        intermittent = _intermittent_rows(Y, cfg)
+    local: Dict[str, Dict[str, float]] = {}
+    backtest_scores = backtest_matrix(Y, items, cfg, intermittent, local)
+    # scores are already ordered by mae within item, so the first non-NaN row is choose_model's
+    # pick; with a cost penalty they are re-ranked (stable, so ties keep that order)
+    scored = overall_scores(backtest_scores).dropna(subset=["mae"])
+    if cfg.cost_penalty:
+        scored = scored.assign(_score=_selection_score(scored, cfg)).sort_values("_score", kind="stable")
+    first = scored.drop_duplicates("item").set_index("item")["model"]
+    best = first.reindex(items).fillna(fallback_model(cfg)).astype(str).tolist()
+    model_selection = pd.DataFrame({"item": items, "best_model": best})
 
+    h = cfg.horizon_days
+    fc = model_forecasts(Y, np.array(best, dtype=object), h, cfg, local)
+    if costs is not None:
+        merge_costs(costs, local)
+
+    dates = pd.date_range(last_date + pd.Timedelta(days=1), periods=h, freq="D")
+    forecast_next = pd.DataFrame({
+        "date": np.tile(dates.to_numpy(), len(items)),
+        "item": np.repeat(items, h),
+        "forecast_qty": np.clip(fc, 0.0, None).ravel(),
+    })
+    return backtest_scores, model_selection, forecast_next
 
-def run_forecasting(daily: pd.DataFrame, cfg: ForecastConfig) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
-    items = sorted(daily["item"].unique().tolist())
 
+def _batched_range(
+    Y: np.ndarray,
+    items: np.ndarray,
+    last_date: pd.Timestamp,
+    cfg: ForecastConfig,
+    lo: int,
+    hi: int,
+    timings: Optional[List[float]] = None,
+    intermittent: Optional[np.ndarray] = None,
+    costs: Optional[Dict[str, Dict[str, float]]] = None,
+) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """Rows [lo, hi) of the items x days matrix; per-item seconds are amortized over the batch."""
+    t0 = time.perf_counter()
+    out = _run_forecasting_batched(Y[lo:hi], items[lo:hi], last_date, cfg, intermittent[lo:hi] if intermittent is not None else None, costs)
+    if timings is not None and hi > lo:
+        timings.extend([(time.perf_counter() - t0) / (hi - lo)] * (hi - lo))
+    return out
+
+
+def _forecast_range(
+    store: SeriesStore,
+    cfg: ForecastConfig,
+    lo: int,
+    hi: int,
+    timings: Optional[List[float]] = None,
+    intermittent: Optional[np.ndarray] = None,
+    costs: Optional[Dict[str, Dict[str, float]]] = None,
+) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """Forecast items [lo, hi) of the store one by one; per-item seconds are appended to timings."""
     backtest_all: List[pd.DataFrame] = []
     selection_rows = []
     forecast_frames = []
 
-    for item in items:
-        d = daily[daily["item"] == item].sort_values("date")
-        series = pd.Series(d["demand_qty"].to_numpy(), index=pd.to_datetime(d["date"]))
+    for i in range(lo, hi):
+        t0 = time.perf_counter()
+        item = store.items[i]
+        series = store.series("demand_qty", i)
 
-        scores = backtest_item(series, cfg)
+        scores = backtest_item(series, cfg, bool(intermittent[i]) if intermittent is not None else False, costs)
         scores.insert(0, "item", item)
         backtest_all.append(scores)
 
-        best = choose_model(scores)
+        best = choose_model(scores, cfg)
         selection_rows.append({"item": item, "best_model": best})
 
-        fc = forecast_item(series, best, cfg)
-        start = pd.to_datetime(d["date"].max()) + pd.Timedelta(days=1)
+        fc = forecast_item(series, best, cfg, costs)
+        start = series.index.max() + pd.Timedelta(days=1)
         dates = pd.date_range(start, periods=cfg.horizon_days, freq="D")
         forecast_frames.append(pd.DataFrame({"date": dates, "item": item, "forecast_qty": np.clip(fc, 0.0, None)}))
+        if timings is not None:
+            timings.append(time.perf_counter() - t0)
 
     backtest_scores = pd.concat(backtest_all, ignore_index=True) if backtest_all else pd.DataFrame()
     model_selection = pd.DataFrame(selection_rows)
     forecast_next = pd.concat(forecast_frames, ignore_index=True) if forecast_frames else pd.DataFrame()
     return backtest_scores, model_selection, forecast_next
+
+
+def _forecast_chunk(sh: Dict[str, Any], bounds: Tuple[int, int]) -> Tuple[Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame], List[float], Dict[str, Dict[str, float]]]:
+    timings: List[float] = []
+    costs: Dict[str, Dict[str, float]] = {}
+    if sh["Y"] is not None:
+        out = _batched_range(sh["Y"], sh["items"], sh["last_date"], sh["cfg"], *bounds, timings=timings, intermittent=sh["intermittent"], costs=costs)
+    else:
+        out = _forecast_range(sh["store"], sh["cfg"], *bounds, timings=timings, intermittent=sh["intermittent"], costs=costs)
+    return out, timings, costs
+
+
+def intermittent_items(daily: pd.DataFrame | DemandGrid, cfg: ForecastConfig, store: Optional[SeriesStore] = None) -> np.ndarray:
+    """
+    Routing flag per item (in store / grid order): ADI at or above cfg.intermittent_adi. A grid
+    carries its ADI from aggregation; for a long frame it is computed from the store.
+    """
+    if isinstance(daily, DemandGrid):
+        return daily.adi >= cfg.intermittent_adi
+    if store is None:
+        store = SeriesStore.from_frame(daily, ["demand_qty"])
+    Y = pack_matrix(store, "demand_qty")
+    if Y is not None:
+        return _intermittent_rows(Y, cfg)
+    return np.array([bool(_intermittent_rows(store.values("demand_qty", i), cfg)[0]) for i in range(len(store))], dtype=bool)
+
+
+def run_forecasting(
+    daily: pd.DataFrame | DemandGrid,
+    cfg: ForecastConfig,
+    store: Optional[SeriesStore] = None,
+    executor: Optional[ExecutorConfig] = None,
+    timings: Optional[List[float]] = None,
+    costs: Optional[Dict[str, Dict[str, float]]] = None,
+) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """
+    Backtest, model selection and next-horizon forecast per item. daily is the long daily frame
+    or a DemandGrid; in batched mode a grid is used as the items x days matrix directly.
+    Intermittent items (see intermittent_items) also try Croston, SBA and TSB.
+    Fit / predict seconds and fitted rows per model are added to costs (see src.models).
+    """
+    if cfg.backtest_mode not in ("per_item", "batched"):
+        raise ValueError(f"Unknown backtest_mode: {cfg.backtest_mode!r} (expected 'per_item' or 'batched')")
+
+    Y = items = last_date = None
+    if isinstance(daily, DemandGrid) and cfg.backtest_mode == "batched":
+        Y, items = daily.matrix("demand_qty"), daily.items
+        last_date = pd.Timestamp(daily.dates[-1]) if daily.n_days else None
+    else:
+        if store is None:
+            store = daily.store() if isinstance(daily, DemandGrid) else SeriesStore.from_frame(daily, ["demand_qty"])
+        if cfg.backtest_mode == "batched":
+            Y = pack_matrix(store, "demand_qty")
+        if Y is not None:
+            items, last_date = store.items, pd.Timestamp(store.dates[Y.shape[1] - 1])
+    n_items = len(items) if Y is not None else len(store)
+    intermittent = intermittent_items(daily, cfg, store)
+
+    if executor is None:
+        if Y is not None:
+            return _batched_range(Y, items, last_date, cfg, 0, n_items, timings=timings, intermittent=intermittent, costs=costs)
+        return _forecast_range(store, cfg, 0, n_items, timings=timings, intermittent=intermittent, costs=costs)
+
+    shared_inputs = {
+        "store": store if Y is None else None,
+        "Y": Y,
+        "items": items,
+        "last_date": last_date,
+        "cfg": cfg,
+        "intermittent": intermittent,
+    }
+    results = map_chunks(_forecast_chunk, chunk_ranges(n_items, executor), executor, shared_inputs)
+    for _, t, c in results:
+        if timings is not None:
+            timings.extend(t)
+        if costs is not None:
+            merge_costs(costs, c)
+    parts = [frames for frames, _, _ in results]
+    if not parts:
+        return pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
+    return tuple(pd.concat([p[k] for p in parts], ignore_index=True) for k in range(3))
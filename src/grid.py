@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Sequence
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from src.store import SeriesStore
+
+
+def intermittency(Y: np.ndarray) -> np.ndarray:
+    """
+    ADI (average days between demand days) of each row, counted from the row's first demand
+    day, so items launched late are not penalised for the days before. Rows without demand get
+    inf. (The share of zero days over the same span is 1 - 1 / ADI, so it adds nothing.)
+    """
+    Y = np.atleast_2d(Y)
+    if Y.shape[1] == 0:
+        return np.full(len(Y), np.inf)
+    nz = Y > 0
+    count = nz.sum(axis=1)
+    active = np.where(count > 0, Y.shape[1] - nz.argmax(axis=1), 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(count > 0, active / np.maximum(count, 1), np.inf)
+
+
+@dataclass
+class DemandGrid:
+    """
+    Zero-filled daily aggregates as dense (items x days) matrices plus the two axis vectors,
+    instead of one long row per (date, item) with the item label repeated on every row.
+
+    Demand is float32 by default (integer quantities are exact up to 2**24). Revenue stays
+    float64: float32 keeps only about 7 significant digits, so 12.99 would export as
+    12.989999771118164. to_frame() materializes the long daily frame (the
+    make_daily_item_series schema) for export.
+    """
+    items: np.ndarray  # (items,) sorted labels
+    dates: np.ndarray  # (days,) datetime64, consecutive days
+    demand: np.ndarray  # (items, days)
+    revenue: np.ndarray  # (items, days) float64
+    txn_count: np.ndarray  # (items, days) int32
+    adi: Optional[np.ndarray] = field(default=None, repr=False)  # (items,) see intermittency(); computed with the grid
+
+    def __post_init__(self):
+        if self.adi is None:
+            self.adi = intermittency(self.demand)
+
+    @classmethod
+    def from_frame(cls, daily: pd.DataFrame, dtype=np.float32) -> "DemandGrid":
+        """From (date, item) totals or a long daily frame; days and items without rows are zero. dtype is demand's."""
+        if daily.empty:
+            empty = np.zeros((0, 0), dtype=dtype)
+            return cls(np.empty(0, dtype=object), np.empty(0, dtype="datetime64[ns]"), empty, np.zeros((0, 0)), empty.astype(np.int32))
+
+        codes, items = pd.factorize(daily["item"].astype(str), sort=True)
+        dates = pd.to_datetime(daily["date"])
+        all_dates = pd.date_range(dates.min(), dates.max(), freq="D")
+        day = ((dates - all_dates[0]) // pd.Timedelta(days=1)).to_numpy()
+
+        shape = (len(items), len(all_dates))
+        demand = np.zeros(shape, dtype=dtype)
+        revenue = np.zeros(shape)
+        txn_count = np.zeros(shape, dtype=np.int32)
+        demand[codes, day] = daily["demand_qty"].to_numpy(dtype=float)
+        revenue[codes, day] = daily["revenue"].to_numpy(dtype=float)
+        txn_count[codes, day] = daily["txn_count"].fillna(0).to_numpy(dtype=np.int64)
+        return cls(np.asarray(items, dtype=object), all_dates.to_numpy(), demand, revenue, txn_count)
+
+    @classmethod
+    def combine(cls, grids: Sequence["DemandGrid"]) -> "DemandGrid":
+        """Element-wise sum of grids (e.g. one per store) over the union of their items and days."""
+        grids = [g for g in grids if g.n_items and g.n_days]
+        if not grids:
+            return cls.from_frame(pd.DataFrame())
+        items = np.array(sorted(set().union(*(map(str, g.items) for g in grids))), dtype=object)
+        dates = pd.date_range(min(g.dates[0] for g in grids), max(g.dates[-1] for g in grids), freq="D").to_numpy()
+        pos = {it: i for i, it in enumerate(items)}
+
+        # accumulate in float64 / int64, then store demand in the grids' dtype
+        shape = (len(items), len(dates))
+        demand, revenue, txn_count = np.zeros(shape), np.zeros(shape), np.zeros(shape, dtype=np.int64)
+        for g in grids:
+            rows = np.array([pos[str(it)] for it in g.items])[:, None]
+            cols = int((g.dates[0] - dates[0]) // np.timedelta64(1, "D")) + np.arange(g.n_days)
+            demand[rows, cols] += g.demand
+            revenue[rows, cols] += g.revenue
+            txn_count[rows, cols] += g.txn_count
+        dtype = grids[0].demand.dtype
+        return cls(items, dates, demand.astype(dtype), revenue, txn_count.astype(np.int32))
+
+    @property
+    def n_items(self) -> int:
+        return len(self.items)
+
+    @property
+    def n_days(self) -> int:
+        return len(self.dates)
+
+    def matrix(self, col: str = "demand_qty") -> np.ndarray:
+        """float64 (items x days) copy of one value column, for numerical work."""
+        return {"demand_qty": self.demand, "revenue": self.revenue, "txn_count": self.txn_count}[col].astype(float)
+
+    def tail(self, days: int) -> "DemandGrid":
+        """The last `days` days (views, no copy)."""
+        lo = max(0, self.n_days - int(days))
+        return DemandGrid(self.items, self.dates[lo:], self.demand[:, lo:], self.revenue[:, lo:], self.txn_count[:, lo:])
+
+    def select(self, items: Sequence[str]) -> "DemandGrid":
+        """The rows of the given items (copies), in grid order."""
+        rows = np.flatnonzero(pd.Index(self.items.astype(str)).isin([str(it) for it in items]))
+        return DemandGrid(self.items[rows], self.dates, self.demand[rows], self.revenue[rows], self.txn_count[rows], self.adi[rows])
+
+    def row_digests(self, col: str = "demand_qty") -> Dict[str, int]:
+        """uint64 hash of each item's row of one value column, keyed by item."""
+        values = {"demand_qty": self.demand, "revenue": self.revenue, "txn_count": self.txn_count}[col]
+        h = pd.util.hash_pandas_object(pd.DataFrame(values), index=False).to_numpy()
+        return {str(it): int(x) for it, x in zip(self.items, h)}
+
+    def store(self, value_cols: Sequence[str] = ("demand_qty",)) -> SeriesStore:
+        """Per-item SeriesStore over the grid (rows are already partitioned and date-sorted)."""
+        n, d = self.n_items, self.n_days
+        return SeriesStore(
+            items=self.items,
+            offsets=np.arange(n + 1) * d,
+            dates=np.tile(self.dates, n),
+            columns={c: self.matrix(c).ravel() for c in value_cols},
+            positions={str(it): i for i, it in enumerate(self.items)},
+        )
+
+    def to_frame(self) -> pd.DataFrame:
+        """Long daily frame: date, item, demand_qty, revenue, txn_count, sorted by item then date."""
+        n, d = self.n_items, self.n_days
+        return pd.DataFrame({
+            "date": np.tile(self.dates, n),
+            "item": np.repeat(self.items, d),
+            "demand_qty": self.demand.ravel().astype(float),
+            "revenue": self.revenue.ravel().astype(float),
+            "txn_count": self.txn_count.ravel().astype(int),
+        })
+
+    def digest(self) -> str:
+        h = hashlib.sha256()
+        h.update("\0".join(map(str, self.items)).encode("utf-8"))
+        for a in (self.dates, self.demand, self.revenue, self.txn_count):
+            h.update(np.ascontiguousarray(a).tobytes())
+        return h.hexdigest()
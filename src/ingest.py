@@ -0,0 +1,287 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+from src.clean import clean_transactions, CleanConfig, REQUIRED_COLUMNS
+from src.aggregate import fill_daily_grid, refresh_daily_state, AggregateConfig
+from src.io import table_format
+
+
+@dataclass(frozen=True)
+class StreamConfig:
+    chunksize: int = 1_000_000  # raw rows per chunk
+    distinct: str = "exact"  # "exact" | "hll" (txn_count estimate)
+    hll_precision: int = 10  # 2**p registers per (date, item); ~1.04 / sqrt(2**p) relative error
+    compact_every: int = 8  # merge partial aggregates after this many chunks
+
+
+DATE_COLUMN = "Transaction Date"
+
+
+def iter_raw_chunks(path: str | Path, chunksize: int = 1_000_000, since: Optional[pd.Timestamp] = None) -> Iterator[pd.DataFrame]:
+    """
+    Read a raw transactions file in chunks of at most `chunksize` rows (required columns only).
+    CSV goes through pandas; Parquet row groups and Feather record batches are read one at a time.
+
+    With `since`, only rows dated on or after it (the date as clean_transactions parses it) are
+    yielded, and chunks left empty are skipped. Parquet row groups whose date statistics end
+    before `since` are not read at all.
+    """
+    p = Path(path)
+    if not p.exists():
+        raise FileNotFoundError(f"Input not found: {p}")
+    fmt = table_format(p)
+    if fmt == "csv":
+        chunks = pd.read_csv(p, usecols=lambda c: c in REQUIRED_COLUMNS, chunksize=chunksize)
+        yield from (chunks if since is None else _since(chunks, since))
+        return
+
+    import pyarrow as pa
+
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        f = pq.ParquetFile(p)
+        columns = [c for c in REQUIRED_COLUMNS if c in f.schema_arrow.names]
+        groups = range(f.num_row_groups) if since is None else _row_groups_since(f, since)
+        batches = f.iter_batches(batch_size=chunksize, columns=columns, row_groups=list(groups))
+    else:
+        reader = pa.ipc.open_file(p)
+        columns = [c for c in REQUIRED_COLUMNS if c in reader.schema.names]
+        # a Feather record batch can be larger than chunksize; slice it
+        batches = (b.select(columns).slice(i, chunksize)
+                   for b in (reader.get_batch(k) for k in range(reader.num_record_batches))
+                   for i in range(0, b.num_rows, chunksize))
+    chunks = (pa.Table.from_batches([batch]).to_pandas() for batch in batches)
+    yield from (chunks if since is None else _since(chunks, since))
+
+
+def _since(chunks: Iterator[pd.DataFrame], since: pd.Timestamp) -> Iterator[pd.DataFrame]:
+    """The rows of each chunk dated on or after since, before any other cleaning; empty chunks are dropped."""
+    for chunk in chunks:
+        chunk = chunk[pd.to_datetime(chunk[DATE_COLUMN], errors="coerce") >= since] if DATE_COLUMN in chunk.columns else chunk
+        if len(chunk):
+            yield chunk
+
+
+def _row_groups_since(f, since: pd.Timestamp) -> List[int]:
+    """Row groups of a ParquetFile that may hold rows dated on or after since (by the date column's max)."""
+    names = f.schema_arrow.names
+    if DATE_COLUMN not in names:
+        return list(range(f.num_row_groups))
+    col = names.index(DATE_COLUMN)
+    keep = []
+    for g in range(f.num_row_groups):
+        stats = f.metadata.row_group(g).column(col).statistics
+        hi = _stat_date(stats.max) if stats is not None and stats.has_min_max else None
+        if hi is None or hi >= since:
+            keep.append(g)
+    return keep
+
+
+def _stat_date(value) -> Optional[pd.Timestamp]:
+    """A date statistic as a Timestamp; None unless it is a timestamp / date or an ISO date string."""
+    if isinstance(value, bytes):
+        value = value.decode("utf-8", errors="replace")
+    if isinstance(value, str):
+        # a string max bounds the other strings only when dates are written ISO-style
+        try:
+            return pd.Timestamp(datetime.strptime(value[:10], "%Y-%m-%d")) if len(value) >= 10 else None
+        except ValueError:
+            return None
+    try:
+        return pd.Timestamp(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def iter_clean_chunks(
+    path: str | Path,
+    clean_cfg: CleanConfig = CleanConfig(),
+    chunksize: int = 1_000_000,
+    since: Optional[pd.Timestamp] = None,
+) -> Iterator[pd.DataFrame]:
+    """Read a raw transactions file (CSV / Parquet / Feather) in chunks and clean each chunk (rows from `since` on)."""
+    for chunk in iter_raw_chunks(path, chunksize, since):
+        yield clean_transactions(chunk, clean_cfg)
+
+
+def _bit_length(x: np.ndarray) -> np.ndarray:
+    """Exact bit length of uint64 values (frexp on each 32-bit half is exact)."""
+    hi = (x >> np.uint64(32)).astype(np.float64)
+    lo = (x & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    return np.where(hi > 0, 32 + np.frexp(hi)[1], np.frexp(lo)[1])
+
+
+def _hll_estimate(registers: pd.DataFrame, keys: pd.MultiIndex, p: int) -> np.ndarray:
+    """HyperLogLog cardinality per key from sparse (key..., reg, rank) rows."""
+    m = 1 << p
+    alpha = 0.7213 / (1 + 1.079 / m)
+    by_key = registers.assign(w=np.exp2(-registers["rank"].to_numpy(dtype=float))).groupby(["date", "item"], observed=True)
+    filled = by_key["w"].size().reindex(keys, fill_value=0).to_numpy()
+    inv_sum = by_key["w"].sum().reindex(keys, fill_value=0.0).to_numpy()
+    zeros = m - filled
+    raw = alpha * m * m / (inv_sum + zeros)
+    linear = m * np.log(m / np.maximum(zeros, 1))
+    return np.where((raw <= 2.5 * m) & (zeros > 0), linear, raw)
+
+
+def _codes(values: pd.Series, table: Dict) -> np.ndarray:
+    """uint64 code of each value in a running value -> code table (new values are appended)."""
+    inv, uniq = pd.factorize(values)
+    codes = np.array([table.setdefault(v, len(table)) for v in uniq], dtype=np.uint64)
+    return codes[inv]
+
+
+def _unique_pairs(key: np.ndarray, h: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Distinct (key, h) pairs, sorted."""
+    order = np.lexsort((h, key))
+    key, h = key[order], h[order]
+    keep = np.ones(len(key), dtype=bool)
+    keep[1:] = (key[1:] != key[:-1]) | (h[1:] != h[:-1])
+    return key[keep], h[keep]
+
+
+class DailyAccumulator:
+    """
+    Folds cleaned transaction chunks into running (date, item) aggregates equivalent to
+    make_daily_item_series, so memory scales with days x items rather than transactions.
+
+    txn_count is the number of distinct txn_id per (date, item), which must merge across
+    chunks. "exact" keeps a sorted set of (date, item) code and 64-bit txn_id hash pairs,
+    16 bytes per distinct (date, item, txn_id), so it still grows with the transactions;
+    "hll" keeps a sparse HyperLogLog sketch (at most 2**hll_precision registers per key) and
+    estimates it with bounded memory.
+    """
+
+    def __init__(self, cfg: StreamConfig = StreamConfig()):
+        if cfg.distinct not in ("exact", "hll"):
+            raise ValueError(f"Unknown distinct mode: {cfg.distinct!r} (expected 'exact' or 'hll')")
+        self.cfg = cfg
+        self.n_rows = 0
+        self._sums: List[pd.DataFrame] = []
+        self._distinct: List = []  # "exact": (key, hash) uint64 array pairs; "hll": register frames
+        self._dates: Dict = {}  # date / item -> code, for the exact keys
+        self._items: Dict = {}
+
+    def add(self, txn: pd.DataFrame) -> None:
+        self.n_rows += len(txn)
+        if txn.empty:
+            return
+        self._sums.append(txn.groupby(["date", "item"], observed=True).agg(
+            demand_qty=("quantity", "sum"),
+            revenue=("total_spent", "sum"),
+        ))
+
+        h = pd.util.hash_array(txn["txn_id"].to_numpy(dtype=object))
+        if self.cfg.distinct == "exact":
+            key = (_codes(txn["date"], self._dates) << np.uint64(32)) | _codes(txn["item"], self._items)
+            part = _unique_pairs(key, h)
+        else:
+            keys = txn[["date", "item"]].reset_index(drop=True)
+            p = int(self.cfg.hll_precision)
+            reg = (h >> np.uint64(64 - p)).astype(np.int32)
+            rest = h & np.uint64((1 << (64 - p)) - 1)
+            rank = ((64 - p) - _bit_length(rest) + 1).astype(np.int8)
+            part = keys.assign(reg=reg, rank=rank).groupby(["date", "item", "reg"], observed=True)["rank"].max().reset_index()
+        self._distinct.append(part)
+
+        if len(self._sums) >= self.cfg.compact_every:
+            self._compact()
+
+    def _compact(self) -> None:
+        if len(self._sums) > 1:
+            self._sums = [pd.concat(self._sums).groupby(level=["date", "item"]).sum()]
+        if len(self._distinct) > 1:
+            if self.cfg.distinct == "exact":
+                merged = _unique_pairs(np.concatenate([k for k, _ in self._distinct]), np.concatenate([h for _, h in self._distinct]))
+            else:
+                merged = pd.concat(self._distinct, ignore_index=True)
+                merged = merged.groupby(["date", "item", "reg"], observed=True)["rank"].max().reset_index()
+            self._distinct = [merged]
+
+    def merge(self, other: "DailyAccumulator") -> None:
+        """Fold another accumulator (e.g. from a parallel reader) into this one."""
+        if other.cfg.distinct != self.cfg.distinct or other.cfg.hll_precision != self.cfg.hll_precision:
+            raise ValueError("Cannot merge accumulators with different distinct-count settings")
+        self.n_rows += other.n_rows
+        self._sums.extend(other._sums)
+        if self.cfg.distinct == "exact":
+            # re-code the other accumulator's keys into this one's date / item tables
+            dates = _codes(pd.Series(list(other._dates)), self._dates) if other._dates else np.zeros(0, dtype=np.uint64)
+            items = _codes(pd.Series(list(other._items)), self._items) if other._items else np.zeros(0, dtype=np.uint64)
+            for key, h in other._distinct:
+                self._distinct.append(_unique_pairs((dates[key >> np.uint64(32)] << np.uint64(32)) | items[key & np.uint64(0xFFFFFFFF)], h))
+        else:
+            self._distinct.extend(other._distinct)
+        self._compact()
+
+    def result(self, cfg: AggregateConfig = AggregateConfig()) -> pd.DataFrame:
+        self._compact()
+        if not self._sums:
+            return fill_daily_grid(pd.DataFrame({
+                "date": pd.Series(dtype="datetime64[ns]"),
+                "item": pd.Series(dtype=object),
+                "demand_qty": pd.Series(dtype=float),
+                "revenue": pd.Series(dtype=float),
+                "txn_count": pd.Series(dtype=int),
+            }), cfg)
+
+        daily = self._sums[0]
+        distinct = self._distinct[0]
+        if self.cfg.distinct == "exact":
+            key, n = np.unique(distinct[0], return_counts=True)
+            dates, items = np.array(list(self._dates), dtype=object), np.array(list(self._items), dtype=object)
+            idx = pd.MultiIndex.from_arrays([dates[key >> np.uint64(32)], items[key & np.uint64(0xFFFFFFFF)]], names=["date", "item"])
+            counts = pd.Series(n, index=idx).reindex(daily.index, fill_value=0).to_numpy()
+        else:
+            counts = np.rint(_hll_estimate(distinct, daily.index, int(self.cfg.hll_precision))).astype(int)
+        daily = daily.assign(txn_count=counts).reset_index()
+        return fill_daily_grid(daily, cfg)
+
+
+def stream_daily_item_series(
+    path: str | Path,
+    clean_cfg: CleanConfig = CleanConfig(),
+    agg_cfg: AggregateConfig = AggregateConfig(),
+    cfg: StreamConfig = StreamConfig(),
+    accumulator: Optional[DailyAccumulator] = None,
+) -> tuple[pd.DataFrame, int]:
+    """Streaming equivalent of clean_transactions + make_daily_item_series. Returns (daily, n_txn_rows)."""
+    acc = accumulator or DailyAccumulator(cfg)
+    for txn in iter_clean_chunks(path, clean_cfg, cfg.chunksize):
+        acc.add(txn)
+    return acc.result(agg_cfg), acc.n_rows
+
+
+def stream_daily_state(
+    path: str | Path,
+    state_dir: str | Path,
+    clean_cfg: CleanConfig = CleanConfig(),
+    agg_cfg: AggregateConfig = AggregateConfig(),
+    cfg: StreamConfig = StreamConfig(),
+    fmt: str = "csv",
+) -> tuple[pd.DataFrame, List[str], int]:
+    """
+    refresh_daily_state fed by a chunked read of the rows dated on or after the store's
+    high-water mark (see iter_raw_chunks): older rows are dropped before cleaning, and Parquet
+    row groups that end before the mark are skipped. Memory follows the new rows. Returns
+    (daily, changed items, n_txn_rows aggregated).
+    """
+    n_rows = 0
+
+    def aggregate_since(since: Optional[pd.Timestamp]) -> pd.DataFrame:
+        nonlocal n_rows
+        acc = DailyAccumulator(cfg)
+        for txn in iter_clean_chunks(path, clean_cfg, cfg.chunksize, since):
+            acc.add(txn)
+        n_rows = acc.n_rows
+        return acc.result(AggregateConfig(fill_missing_days=False))
+
+    daily, changed = refresh_daily_state(state_dir, aggregate_since, agg_cfg, fmt)
+    return daily, changed, n_rows
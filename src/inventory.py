@@ -2,124 +2,710 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from statistics import NormalDist
+from typing import Any, Dict, List, Optional, Tuple
+import time
+import zlib
 import numpy as np
 import pandas as pd
 
+from src.accumulators import Moments, QuantileSketch
+from src.grid import DemandGrid
+from src.io import read_table
+from src.parallel import ExecutorConfig, chunk_ranges, map_chunks
+from src.store import SeriesStore
+
 
 @dataclass(frozen=True)
 class InventoryConfig:
     lead_time_days: int = 3
+    lead_time_spread_days: int = 0  # > 0: lead time ~ uniform integer on lead_time_days +/- spread (at least 1 day)
     review_period_days: int = 1
     service_level: float = 0.95
     simulation_runs: int = 300
     random_seed: int = 42
     demand_sigma_floor: float = 0.25
+    sim_engine: str = "vectorized"  # "vectorized" | "loop" (reference implementation)
+    sim_batch_runs: int = 1000  # runs simulated together; results stream into accumulators between batches
+    sim_memory_mb: float = 256.0  # budget of one simulated block (items are blocked to fit)
+    summary_quantiles: Tuple[float, ...] = (0.5, 0.9, 0.99)  # over runs, of unmet demand and on-hand stock
+    sketch_accuracy: float = 0.01  # relative error of those quantiles
+
+
+def load_lead_times(path: str) -> pd.DataFrame:
+    """
+    Supplier lead-time table (CSV / Parquet / Feather) as one row per (item, lead time, probability).
+
+    Columns: item plus either lead_time_days (optionally with a probability column; several rows
+    per item form a discrete distribution, equally likely when probabilities are absent) or
+    lead_time_min_days / lead_time_max_days (uniform integer range).
+    """
+    df = read_table(path, parse_dates=())
+    df.columns = [c.strip().lower() for c in df.columns]
+    if "item" not in df.columns:
+        raise ValueError("Lead-time table needs an 'item' column")
+
+    if {"lead_time_min_days", "lead_time_max_days"} <= set(df.columns):
+        lo = df["lead_time_min_days"].astype(int).clip(lower=1)
+        hi = np.maximum(df["lead_time_max_days"].astype(int), lo)
+        df = pd.DataFrame({
+            "item": df["item"].repeat(hi - lo + 1).to_numpy(),
+            "lead_time_days": np.concatenate([np.arange(a, b + 1) for a, b in zip(lo, hi)]) if len(df) else [],
+        })
+    elif "lead_time_days" not in df.columns:
+        raise ValueError("Lead-time table needs lead_time_days or lead_time_min_days + lead_time_max_days")
+
+    out = pd.DataFrame({
+        "item": df["item"].astype(str).str.strip().str.lower(),
+        "lead_time_days": df["lead_time_days"].astype(int).clip(lower=1),
+        "probability": df["probability"].astype(float).clip(lower=0.0) if "probability" in df.columns else 1.0,
+    })
+    total = out.groupby("item")["probability"].transform("sum")
+    out = out[total > 0].copy()
+    out["probability"] /= total[total > 0]
+    return out.reset_index(drop=True)
+
+
+def lead_time_pmf(items, base_days, cfg: InventoryConfig, lead_times: Optional[pd.DataFrame] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Discrete lead-time distribution per item: (values, probabilities), each (items, K).
+    Defaults to base_days +/- cfg.lead_time_spread_days; items in lead_times (see load_lead_times)
+    use their supplier distribution instead. Short rows are padded with zero-probability entries.
+    """
+    base = np.maximum(1, np.asarray(base_days, dtype=float).round().astype(int))
+    spread = max(0, int(cfg.lead_time_spread_days))
+    values = np.maximum(1, base[:, None] + np.arange(-spread, spread + 1)[None, :])
+    probs = np.full(values.shape, 1.0 / values.shape[1])
+    if lead_times is None or lead_times.empty:
+        return values, probs
+
+    table = {
+        item: (g["lead_time_days"].to_numpy(dtype=int), g["probability"].to_numpy(dtype=float))
+        for item, g in lead_times.groupby("item", sort=False)
+    }
+    width = max([values.shape[1]] + [len(v) for v, _ in table.values()])
+    values = np.concatenate([values, np.repeat(values[:, -1:], width - values.shape[1], axis=1)], axis=1)
+    probs = np.concatenate([probs, np.zeros((len(base), width - probs.shape[1]))], axis=1)
+    for k, item in enumerate(items):
+        if item in table:
+            v, p = table[item]
+            values[k, :len(v)], values[k, len(v):] = v, v[-1]
+            probs[k, :len(p)], probs[k, len(p):] = p, 0.0
+    return values, probs
+
+
+def _row_stats(store: SeriesStore, col: str, last: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Mean, std (ddof=0) and count of each item's values (only the last `last` of them, if set).
+    When every item has the same number of rows this is one reduction over an items x n matrix.
+    """
+    lengths = np.diff(store.offsets)
+    n_items = len(store)
+    if n_items and (lengths == lengths[0]).all():
+        M = store.columns[col].reshape(n_items, int(lengths[0]))
+        if last is not None:
+            M = M[:, -last:] if last > 0 else M[:, :0]
+        if M.shape[1] == 0:
+            return np.zeros(n_items), np.zeros(n_items), np.zeros(n_items, dtype=int)
+        return M.mean(axis=1), M.std(axis=1), np.full(n_items, M.shape[1])
+
+    mean, std, count = np.zeros(n_items), np.zeros(n_items), np.zeros(n_items, dtype=int)
+    for i in range(n_items):
+        v = store.values(col, i)
+        if last is not None:
+            v = v[-last:] if last > 0 else v[:0]
+        if len(v):
+            mean[i], std[i], count[i] = v.mean(), v.std(), len(v)
+    return mean, std, count
+
+
+def demand_stats(
+    daily: pd.DataFrame | DemandGrid,
+    forecast_next: pd.DataFrame,
+    cfg: InventoryConfig,
+    store: Optional[SeriesStore] = None,
+) -> pd.DataFrame:
+    """
+    Daily demand mean and std per item (item, mu_daily_demand, sigma_daily_demand): from the
+    forecast when it covers at least 7 days, else from the trailing 30 days of history.
+    sigma is floored at cfg.demand_sigma_floor.
+    """
+    if isinstance(daily, DemandGrid):
+        store = daily.tail(30).store()
+    elif store is None:
+        store = SeriesStore.from_frame(daily, ["demand_qty"])
+    items = store.items
+    mu, sigma, _ = _row_stats(store, "demand_qty", last=30)
+
+    if len(forecast_next):
+        fstore = SeriesStore.from_frame(forecast_next, ["forecast_qty"])
+        f_mu, f_sigma, f_n = _row_stats(fstore, "forecast_qty")
+        pos = np.array([fstore.positions.get(str(it), -1) for it in items], dtype=int)
+        use = pos >= 0
+        use[use] = f_n[pos[use]] >= 7
+        mu = np.where(use, f_mu[pos], mu)
+        sigma = np.where(use, f_sigma[pos], sigma)
+
+    return pd.DataFrame({
+        "item": items,
+        "mu_daily_demand": mu,
+        "sigma_daily_demand": np.maximum(sigma, cfg.demand_sigma_floor),
+    })
+
+
+def _per_item(values, items: np.ndarray, default: float) -> np.ndarray:
+    """Scalar, item-indexed Series / mapping (missing items get default) or array aligned with items."""
+    if values is None:
+        return np.full(len(items), float(default))
+    if isinstance(values, dict):
+        values = pd.Series(values, dtype=float)
+    if isinstance(values, pd.Series):
+        return values.reindex(pd.Index(items).astype(str)).fillna(default).to_numpy(dtype=float)
+    arr = np.broadcast_to(np.asarray(values, dtype=float), (len(items),))
+    return np.array(arr)
+
+
+def _z_scores(service_levels: np.ndarray) -> np.ndarray:
+    levels, inverse = np.unique(service_levels, return_inverse=True)
+    return np.array([NormalDist().inv_cdf(float(v)) for v in levels])[inverse.reshape(-1)]
+
+
+def rop_arrays(
+    mu: np.ndarray,
+    sigma: np.ndarray,
+    z: np.ndarray,
+    lead_mean: np.ndarray,
+    lead_var: np.ndarray,
+    review_period_days: int = 1,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    (safety stock, ROP, order-up-to S) as array expressions over items. Lead-time demand
+    variance is L*sigma^2 + mu^2*Var(L); with a fixed lead time that is sigma*sqrt(L).
+    """
+    fixed = lead_var <= 0
+    L = np.where(fixed, np.round(lead_mean), lead_mean)
+    R = max(1, int(review_period_days))
+    safety_stock = np.where(fixed, z * sigma * np.sqrt(L), z * np.sqrt(L * sigma ** 2 + mu ** 2 * lead_var))
+    return safety_stock, mu * L + safety_stock, mu * (L + R) + safety_stock
+
+
+def rop_policy(
+    stats: pd.DataFrame,
+    cfg: InventoryConfig,
+    service_levels=None,
+    lead_time_days=None,
+    lead_times: Optional[pd.DataFrame] = None,
+) -> pd.DataFrame:
+    """
+    Reorder point / order-up-to level for every item of demand_stats at once.
+    service_levels and lead_time_days override cfg per item: a scalar, an item-indexed Series /
+    dict, or an array aligned with stats. Lead times may also follow a distribution (spread or
+    a supplier table, see lead_time_pmf).
+    """
+    items = stats["item"].to_numpy()
+    mu = stats["mu_daily_demand"].to_numpy(dtype=float)
+    sigma = stats["sigma_daily_demand"].to_numpy(dtype=float)
+    sl = _per_item(service_levels, items, cfg.service_level)
+    z = _z_scores(sl)
+
+    base = np.maximum(1, _per_item(lead_time_days, items, cfg.lead_time_days).round().astype(int))
+    values, probs = lead_time_pmf(items, base, cfg, lead_times)
+    lead_mean = (values * probs).sum(axis=1)
+    lead_var = np.maximum(0.0, (values ** 2 * probs).sum(axis=1) - lead_mean ** 2)
+    safety_stock, rop, order_up_to = rop_arrays(mu, sigma, z, lead_mean, lead_var, cfg.review_period_days)
+    fixed = lead_var <= 0
+    L = np.where(fixed, np.round(lead_mean), lead_mean)
+
+    return pd.DataFrame({
+        "item": items,
+        "mu_daily_demand": mu,
+        "sigma_daily_demand": sigma,
+        "service_level": sl,
+        "z": z,
+        "lead_time_days": L.astype(int) if fixed.all() else L,
+        "lead_time_std_days": np.sqrt(lead_var),
+        "base_lead_time_days": base,  # before the spread / supplier table; the simulator rebuilds the same pmf from it
+        "review_period_days": max(1, int(cfg.review_period_days)),
+        "safety_stock_units": safety_stock,
+        "reorder_point_units": rop,
+        "order_up_to_units": order_up_to,
+    }).sort_values("reorder_point_units", ascending=False)
+
+
+def compute_rop_policy(
+    daily: pd.DataFrame | DemandGrid,
+    forecast_next: pd.DataFrame,
+    cfg: InventoryConfig,
+    store: Optional[SeriesStore] = None,
+    lead_times: Optional[pd.DataFrame] = None,
+    service_levels=None,
+    lead_time_days=None,
+) -> pd.DataFrame:
+    """
+    demand_stats + rop_policy. daily may be a DemandGrid, of which only the trailing 30 days
+    are read. To re-price a catalogue under other service levels / lead times, compute
+    demand_stats once and call rop_policy per scenario.
+    """
+    return rop_policy(demand_stats(daily, forecast_next, cfg, store), cfg, service_levels, lead_time_days, lead_times)
+
+
+def simulate_batch(
+    demand: np.ndarray,
+    rop: np.ndarray,
+    S: np.ndarray,
+    L: np.ndarray,
+    inv0: np.ndarray,
+    per_day: bool = False,
+) -> dict:
+    """
+    Step all replications of given (s, S) policies in lockstep: the batch kernel behind
+    simulate_policy, public for callers that draw their own demand (e.g. the (s, S) search in
+    src.optimize, which scores many candidates per item under shared draws).
+    demand: (items, runs, horizon); rop/S/inv0: (items,)
+    L: fixed lead time per item (items,), or the sampled lead time of an order placed on each
+    (item, run, day), (items, runs, horizon) (see draw_lead_times).
+    In-transit orders live in a ring buffer indexed by arrival day (mod max lead time + 1), so
+    arrivals are O(1) per day however many orders are outstanding.
+    Returns per-run totals, each shaped (items, runs); per_day adds demand, unmet demand and
+    stockouts summed over runs, each (items, horizon).
+    """
+    n_items, n_runs, horizon = demand.shape
+    L = np.maximum(1, L.astype(int))
+    size = int(L.max()) + 1 if L.size else 1
+
+    inv = np.repeat(inv0.astype(float)[:, None], n_runs, axis=1)
+    ring = np.zeros((n_items, n_runs, size))
+    rop_ = rop[:, None]
+    S_ = S[:, None]
+    slot_offset = L[:, None]
+
+    unmet = np.zeros((n_items, n_runs))
+    onhand_sum = np.zeros((n_items, n_runs))
+    stockout_days = np.zeros((n_items, n_runs))
+    orders = np.zeros((n_items, n_runs))
+    rows = np.arange(n_items)[:, None]
+    cols = np.arange(n_runs)[None, :]
+    if per_day:
+        day_demand = np.zeros((n_items, horizon))
+        day_unmet = np.zeros((n_items, horizon))
+        day_stockouts = np.zeros((n_items, horizon), dtype=np.int64)
+
+    for t in range(horizon):
+        slot = t % size
+        inv += ring[:, :, slot]
+        ring[:, :, slot] = 0.0
+
+        d = demand[:, :, t]
+        short = inv < d
+        unmet_t = np.where(short, d - inv, 0.0)
+        unmet += unmet_t
+        stockout_days += short
+        inv = np.where(short, 0.0, inv - d)
+        if per_day:
+            day_demand[:, t] = d.sum(axis=1)
+            day_unmet[:, t] = unmet_t.sum(axis=1)
+            day_stockouts[:, t] = short.sum(axis=1)
+
+        onhand_sum += inv
+
+        order_qty = np.where(inv <= rop_, np.maximum(0.0, S_ - inv), 0.0)
+        orders += order_qty > 0
+        arrival = (t + (L[:, :, t] if L.ndim == 3 else slot_offset)) % size
+        ring[rows, cols, np.broadcast_to(arrival, order_qty.shape)] += order_qty
+
+    out = {"unmet": unmet, "onhand_sum": onhand_sum, "stockout_days": stockout_days, "orders": orders}
+    if per_day:
+        out.update(day_demand=day_demand, day_unmet=day_unmet, day_stockouts=day_stockouts)
+    return out
+
+
+class SimulationStats:
+    """
+    Streaming per-item simulation results. Over runs: moments and quantile sketches of unmet
+    demand and average on-hand stock, the mean stockout-day rate. Per day: demand, unmet demand
+    and stockouts summed over runs (the fill-rate trajectory). Memory depends on items and
+    horizon only; add() folds in one batch of runs, merge() combines shards of the same items.
+    """
+
+    def __init__(self, n_items: int, horizon: int, cfg: InventoryConfig = InventoryConfig()):
+        self.horizon = int(horizon)
+        self.quantiles = tuple(cfg.summary_quantiles)
+        self.stockout = Moments(n_items)
+        self.onhand = Moments(n_items)
+        self.unmet = Moments(n_items)
+        self.onhand_sketch = QuantileSketch(n_items, cfg.sketch_accuracy)
+        self.unmet_sketch = QuantileSketch(n_items, cfg.sketch_accuracy)
+        self.day_demand = np.zeros((n_items, self.horizon))
+        self.day_unmet = np.zeros((n_items, self.horizon))
+        self.day_stockouts = np.zeros((n_items, self.horizon), dtype=np.int64)
 
+    def add(self, res: dict, rows=slice(None)) -> None:
+        """One batch of runs from simulate_batch(per_day=True), for the given item rows."""
+        h = max(1, self.horizon)
+        onhand = res["onhand_sum"] / h
+        self.stockout.add(res["stockout_days"] / h, rows)
+        self.onhand.add(onhand, rows)
+        self.onhand_sketch.add(onhand, rows)
+        self.unmet.add(res["unmet"], rows)
+        self.unmet_sketch.add(res["unmet"], rows)
+        self.day_demand[rows] += res["day_demand"]
+        self.day_unmet[rows] += res["day_unmet"]
+        self.day_stockouts[rows] += res["day_stockouts"]
 
-def compute_rop_policy(daily: pd.DataFrame, forecast_next: pd.DataFrame, cfg: InventoryConfig) -> pd.DataFrame:
-    items = sorted(daily["item"].unique().tolist())
-    z = float(NormalDist().inv_cdf(cfg.service_level))
-    rows = []
-
-    for item in items:
-        f = forecast_next[forecast_next["item"] == item]["forecast_qty"]
-        if len(f) >= 7:
-            mu = float(f.mean())
-            sigma = float(f.std(ddof=0))
-        else:
-            s = daily[daily["item"] == item]["demand_qty"]
-            mu = float(s.tail(30).mean()) if len(s) else 0.0
-            sigma = float(s.tail(30).std(ddof=0)) if len(s) else 0.0
-
-        sigma = max(sigma, cfg.demand_sigma_floor)
-
-        L = max(1, int(cfg.lead_time_days))
-        R = max(1, int(cfg.review_period_days))
-
-        safety_stock = z * sigma * np.sqrt(L)
-        rop = mu * L + safety_stock
-        order_up_to = mu * (L + R) + safety_stock
-
-        rows.append({
-            "item": item,
-            "mu_daily_demand": mu,
-            "sigma_daily_demand": sigma,
-            "service_level": cfg.service_level,
-            "z": z,
-            "lead_time_days": L,
-            "review_period_days": R,
-            "safety_stock_units": float(safety_stock),
-            "reorder_point_units": float(rop),
-            "order_up_to_units": float(order_up_to),
+    def merge(self, other: "SimulationStats", rows=slice(None)) -> None:
+        for name in ("stockout", "onhand", "unmet", "onhand_sketch", "unmet_sketch"):
+            getattr(self, name).merge(getattr(other, name), rows)
+        self.day_demand[rows] += other.day_demand
+        self.day_unmet[rows] += other.day_unmet
+        self.day_stockouts[rows] += other.day_stockouts
+
+    def summary(self, items) -> pd.DataFrame:
+        """One row per item; rates are percentages, quantiles are over runs."""
+        demand, unmet = self.day_demand.sum(axis=1), self.day_unmet.sum(axis=1)
+        out = pd.DataFrame({
+            "item": np.asarray(items),
+            "horizon_days": self.horizon,
+            "simulation_runs": self.unmet.count,
+            "avg_stockout_day_rate": self.stockout.mean * 100.0,
+            "avg_onhand_units": self.onhand.mean,
+            "avg_unmet_demand_units": self.unmet.mean,
+            "std_unmet_demand_units": self.unmet.std(),
+            "fill_rate": 100.0 * (1.0 - np.divide(unmet, demand, out=np.full(len(demand), np.nan), where=demand > 0)),
         })
+        for sketch, name in ((self.unmet_sketch, "unmet_demand_units"), (self.onhand_sketch, "onhand_units")):
+            for q, values in zip(self.quantiles, sketch.quantiles(self.quantiles).T):
+                out[f"p{q * 100:g}_{name}"] = values
+        return out
 
-    return pd.DataFrame(rows).sort_values("reorder_point_units", ascending=False)
-
-
-def simulate_policy(forecast_next: pd.DataFrame, policy: pd.DataFrame, cfg: InventoryConfig, initial_inventory_units: float = 0.0) -> pd.DataFrame:
-    rng = np.random.default_rng(cfg.random_seed)
-    items = sorted(policy["item"].unique().tolist())
-    horizon_dates = sorted(pd.to_datetime(forecast_next["date"]).unique().tolist())
-    horizon = len(horizon_dates)
-
-    summaries = []
-
-    for item in items:
-        pol = policy[policy["item"] == item].iloc[0]
-        mu = float(pol["mu_daily_demand"])
-        sigma = float(pol["sigma_daily_demand"])
-        L = int(pol["lead_time_days"])
-        rop = float(pol["reorder_point_units"])
-        S = float(pol["order_up_to_units"])
-
-        stockout_rates = []
-        avg_onhand = []
-        unmet_list = []
-
-        for _ in range(int(cfg.simulation_runs)):
-            inv = float(initial_inventory_units if initial_inventory_units > 0 else S)
-            pipeline = []  # list of (arrival_day, qty)
-
-            unmet = 0.0
-            onhand_sum = 0.0
-            stockout_days = 0
-
-            for t in range(horizon):
-                if pipeline:
-                    arriving = [q for (day, q) in pipeline if day == t]
-                    if arriving:
-                        inv += sum(arriving)
-                    pipeline = [(day, q) for (day, q) in pipeline if day != t]
-
-                demand = float(rng.normal(mu, sigma))
-                if demand < 0:
-                    demand = 0.0
-
-                if inv >= demand:
-                    inv -= demand
-                else:
-                    unmet += (demand - inv)
-                    inv = 0.0
-                    stockout_days += 1
-
-                onhand_sum += inv
-
-                if inv <= rop:
-                    order_qty = max(0.0, S - inv)
-                    if order_qty > 0:
-                        pipeline.append((t + L, order_qty))
-
-            stockout_rates.append(stockout_days / max(1, horizon))
-            avg_onhand.append(onhand_sum / max(1, horizon))
-            unmet_list.append(unmet)
-
-        summaries.append({
-            "item": item,
-            "horizon_days": horizon,
-            "simulation_runs": int(cfg.simulation_runs),
-            "avg_stockout_day_rate": float(np.mean(stockout_rates) * 100.0),
-            "avg_onhand_units": float(np.mean(avg_onhand)),
-            "avg_unmet_demand_units": float(np.mean(unmet_list)),
+    def daily(self, items, dates) -> pd.DataFrame:
+        """Per item and day: fill rate (share of demand served) and share of runs with a stockout, in %."""
+        n = len(items)
+        runs = np.maximum(self.unmet.count, 1)[:, None]
+        fill = 1.0 - np.divide(self.day_unmet, self.day_demand, out=np.full(self.day_demand.shape, np.nan), where=self.day_demand > 0)
+        return pd.DataFrame({
+            "date": np.tile(np.asarray(dates)[:self.horizon], n),
+            "item": np.repeat(np.asarray(items), self.horizon),
+            "fill_rate": (100.0 * fill).ravel(),
+            "stockout_rate": (100.0 * self.day_stockouts / runs).ravel(),
         })
 
-    return pd.DataFrame(summaries).sort_values("avg_stockout_day_rate", ascending=False)
+
+def _stream(cfg: InventoryConfig, kind: int, batch: int = 0, item: Optional[str] = None) -> np.random.Generator:
+    """
+    Random stream of one kind of draw (0 = demand, 1 = lead times) for one batch of runs of one
+    item. Simulation draws always come from the item's own stream, so they do not depend on the
+    backend, worker count or which shard or position the item lands in. Batch 0 is the
+    unbatched stream, so runs <= sim_batch_runs reproduce it.
+    """
+    key = [int(cfg.random_seed)]
+    if item is not None:
+        key.append(zlib.crc32(str(item).encode("utf-8")))
+    if kind:
+        key.append(kind)
+    if batch:
+        key += [3, batch]
+    return np.random.default_rng(key)
+
+
+def _run_batches(runs: int, cfg: InventoryConfig) -> List[Tuple[int, int]]:
+    step = max(1, int(cfg.sim_batch_runs))
+    return [(r, min(int(runs), r + step)) for r in range(0, int(runs), step)]
+
+
+def _normal_block(
+    mu: np.ndarray,
+    sigma: np.ndarray,
+    items: np.ndarray,
+    runs: int,
+    horizon: int,
+    cfg: InventoryConfig,
+    batch: int,
+) -> np.ndarray:
+    """Demand for a block of items and one batch of runs, each item from its own stream."""
+    demand = np.empty((len(mu), runs, horizon))
+    for k, item in enumerate(items):
+        demand[k] = _stream(cfg, 0, batch, item).normal(mu[k], sigma[k], size=(runs, horizon))
+    np.clip(demand, 0.0, None, out=demand)
+    return demand
+
+
+def _lead_block(
+    values: np.ndarray,
+    cdf: np.ndarray,
+    items: np.ndarray,
+    runs: int,
+    horizon: int,
+    cfg: InventoryConfig,
+    batch: int,
+) -> np.ndarray:
+    """Sampled lead times for a block of items and one batch of runs, (items, runs, horizon)."""
+    leads = np.empty((len(values), runs, horizon), dtype=np.int32)
+    for k, item in enumerate(items):
+        u = _stream(cfg, 1, batch, item).random((runs, horizon))
+        idx = np.minimum(np.searchsorted(cdf[k], u, side="right"), values.shape[1] - 1)
+        leads[k] = values[k][idx]
+    return leads
+
+
+def draw_demand(pol: pd.DataFrame, horizon: int, cfg: InventoryConfig) -> np.ndarray:
+    """
+    Simulated daily demand, (items, runs, horizon), rows in the order of pol.
+    Drawn from N(mu, sigma) per item and truncated at zero, the same draws simulate_policy
+    makes; reusing one draw across policies gives common random numbers.
+    """
+    mu = pol["mu_daily_demand"].to_numpy(dtype=float)
+    sigma = pol["sigma_daily_demand"].to_numpy(dtype=float)
+    items = pol["item"].to_numpy()
+    parts = [
+        _normal_block(mu, sigma, items, r1 - r0, horizon, cfg, b)
+        for b, (r0, r1) in enumerate(_run_batches(cfg.simulation_runs, cfg))
+    ]
+    if not parts:
+        return np.zeros((len(pol), 0, horizon))
+    return parts[0] if len(parts) == 1 else np.concatenate(parts, axis=1)
+
+
+def _lead_table(pol: pd.DataFrame, cfg: InventoryConfig, lead_times: Optional[pd.DataFrame]) -> Tuple[Optional[np.ndarray], np.ndarray, np.ndarray]:
+    """(fixed lead time per item or None, values, cdf) of every item's lead-time distribution."""
+    # the base lead time, not the mean: a spread clipped at 1 day shifts the mean away from it
+    base = pol["base_lead_time_days"] if "base_lead_time_days" in pol.columns else pol["lead_time_days"]
+    values, probs = lead_time_pmf(pol["item"].to_numpy(), base.to_numpy(dtype=float), cfg, lead_times)
+    fixed = values[np.arange(len(values)), probs.argmax(axis=1)] if (probs.max(axis=1) >= 1.0).all() else None
+    return fixed, values, np.cumsum(probs, axis=1)
+
+
+def draw_lead_times(pol: pd.DataFrame, horizon: int, cfg: InventoryConfig, lead_times: Optional[pd.DataFrame] = None) -> np.ndarray:
+    """
+    Lead times for the simulator, rows in the order of pol: (items,) when every item's lead time
+    is fixed, else the sampled lead time of an order placed on each (item, run, day),
+    (items, runs, horizon). Drawn from their own stream, so demand draws are unaffected.
+    """
+    fixed, values, cdf = _lead_table(pol, cfg, lead_times)
+    if fixed is not None:
+        return fixed
+    items = pol["item"].to_numpy()
+    parts = [
+        _lead_block(values, cdf, items, r1 - r0, horizon, cfg, b)
+        for b, (r0, r1) in enumerate(_run_batches(cfg.simulation_runs, cfg))
+    ]
+    if not parts:
+        return np.zeros((len(pol), 0, horizon), dtype=np.int32)
+    return parts[0] if len(parts) == 1 else np.concatenate(parts, axis=1)
+
+
+def _simulate_vectorized(
+    pol: pd.DataFrame,
+    horizon: int,
+    cfg: InventoryConfig,
+    initial_inventory_units: float,
+    demand: Optional[np.ndarray] = None,
+    lead_times: Optional[pd.DataFrame] = None,
+) -> SimulationStats:
+    """
+    Runs are simulated in batches of cfg.sim_batch_runs and items in blocks that fit
+    cfg.sim_memory_mb; each block streams into the accumulators. Blocks are drawn in stream
+    order, so the results do not depend on the block size.
+    """
+    S = pol["order_up_to_units"].to_numpy(dtype=float)
+    rop = pol["reorder_point_units"].to_numpy(dtype=float)
+    inv0 = np.full(len(pol), float(initial_inventory_units)) if initial_inventory_units > 0 else S
+    mu = pol["mu_daily_demand"].to_numpy(dtype=float)
+    sigma = pol["sigma_daily_demand"].to_numpy(dtype=float)
+    items = pol["item"].to_numpy()
+    runs = int(cfg.simulation_runs) if demand is None else demand.shape[1]
+    fixed, values, cdf = _lead_table(pol, cfg, lead_times)
+
+    stats = SimulationStats(len(pol), horizon, cfg)
+    for b, (r0, r1) in enumerate(_run_batches(runs, cfg)):
+        n = r1 - r0
+        # demand, lead times, ring buffer and state: about four float64 (runs, horizon) arrays per item
+        step = max(1, int(cfg.sim_memory_mb * 2 ** 20) // max(1, 4 * 8 * n * max(horizon, 1)))
+        for lo in range(0, len(pol), step):
+            hi = min(len(pol), lo + step)
+            if demand is not None:
+                D = demand[lo:hi, r0:r1]
+            else:
+                D = _normal_block(mu[lo:hi], sigma[lo:hi], items[lo:hi], n, horizon, cfg, b)
+            if fixed is not None:
+                L = fixed[lo:hi]
+            else:
+                L = _lead_block(values[lo:hi], cdf[lo:hi], items[lo:hi], n, horizon, cfg, b)
+            stats.add(simulate_batch(D, rop[lo:hi], S[lo:hi], L, inv0[lo:hi], per_day=True), slice(lo, hi))
+    return stats
+
+
+def _simulate_loop(
+    pol: pd.DataFrame,
+    horizon: int,
+    cfg: InventoryConfig,
+    initial_inventory_units: float,
+    lead_times: Optional[pd.DataFrame] = None,
+) -> Tuple[SimulationStats, np.ndarray]:
+    """
+    Reference engine: one run at a time in plain Python. Returns the stats and seconds per item.
+    Sampled lead times are drawn per item and batch of runs, like _simulate_vectorized, so
+    memory does not grow with cfg.simulation_runs.
+    """
+    items = pol["item"].to_numpy()
+    mus = pol["mu_daily_demand"].to_numpy(dtype=float)
+    sigmas = pol["sigma_daily_demand"].to_numpy(dtype=float)
+    fixed, values, cdf = _lead_table(pol, cfg, lead_times)
+    rops = pol["reorder_point_units"].to_numpy(dtype=float)
+    Ss = pol["order_up_to_units"].to_numpy(dtype=float)
+    batches = _run_batches(cfg.simulation_runs, cfg)
+
+    stats = SimulationStats(len(pol), horizon, cfg)
+    seconds = np.zeros(len(pol))
+
+    for k, item in enumerate(items):
+        t0 = time.perf_counter()
+        mu = float(mus[k])
+        sigma = float(sigmas[k])
+        max_lead = int(fixed[k] if fixed is not None else values[k].max())
+        rop = float(rops[k])
+        S = float(Ss[k])
+        rngs = [_stream(cfg, 0, b, item) for b in range(len(batches))]
+
+        for b, (r0, r1) in enumerate(batches):
+            rng = rngs[b]
+            if fixed is not None:
+                lead = int(fixed[k])
+            else:
+                lead = _lead_block(values[k:k + 1], cdf[k:k + 1], items[k:k + 1], r1 - r0, horizon, cfg, b)[0]
+            res = {
+                "unmet": np.zeros((1, r1 - r0)),
+                "onhand_sum": np.zeros((1, r1 - r0)),
+                "stockout_days": np.zeros((1, r1 - r0)),
+                "day_demand": np.zeros((1, horizon)),
+                "day_unmet": np.zeros((1, horizon)),
+                "day_stockouts": np.zeros((1, horizon), dtype=np.int64),
+            }
+            for j in range(r1 - r0):
+                inv = float(initial_inventory_units if initial_inventory_units > 0 else S)
+                arrivals = [0.0] * (horizon + max_lead + 1)  # calendar: qty arriving on each day
+
+                unmet = 0.0
+                onhand_sum = 0.0
+                stockout_days = 0
+
+                for t in range(horizon):
+                    inv += arrivals[t]
+
+                    demand = float(rng.normal(mu, sigma))
+                    if demand < 0:
+                        demand = 0.0
+                    res["day_demand"][0, t] += demand
+
+                    if inv >= demand:
+                        inv -= demand
+                    else:
+                        unmet += (demand - inv)
+                        res["day_unmet"][0, t] += demand - inv
+                        res["day_stockouts"][0, t] += 1
+                        inv = 0.0
+                        stockout_days += 1
+
+                    onhand_sum += inv
+
+                    if inv <= rop:
+                        order_qty = max(0.0, S - inv)
+                        if order_qty > 0:
+                            arrivals[t + (lead if fixed is not None else int(lead[j, t]))] += order_qty
+
+                res["unmet"][0, j] = unmet
+                res["onhand_sum"][0, j] = onhand_sum
+                res["stockout_days"][0, j] = stockout_days
+            stats.add(res, slice(k, k + 1))
+        seconds[k] = time.perf_counter() - t0
+
+    return stats, seconds
+
+
+def _simulate_frame(
+    pol: pd.DataFrame,
+    horizon: int,
+    cfg: InventoryConfig,
+    initial_inventory_units: float,
+    lead_times: Optional[pd.DataFrame] = None,
+    dates: Optional[np.ndarray] = None,
+    demand: Optional[np.ndarray] = None,
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Simulation summary plus a `_seconds` column (per item; amortized for the vectorized engine),
+    and the per-day fill-rate frame. Pre-drawn demand is always replayed by the vectorized engine.
+    """
+    if cfg.sim_engine == "vectorized" or demand is not None:
+        t0 = time.perf_counter()
+        stats = _simulate_vectorized(pol, horizon, cfg, initial_inventory_units, demand=demand, lead_times=lead_times)
+        seconds = (time.perf_counter() - t0) / max(1, len(pol))
+    elif cfg.sim_engine == "loop":
+        stats, seconds = _simulate_loop(pol, horizon, cfg, initial_inventory_units, lead_times)
+    else:
+        raise ValueError(f"Unknown sim_engine: {cfg.sim_engine!r} (expected 'vectorized' or 'loop')")
+    items = pol["item"].to_numpy()
+    return stats.summary(items).assign(_seconds=seconds), stats.daily(items, dates)
+
+
+def _simulate_chunk(sh: Dict[str, Any], bounds: Tuple[int, int]) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    lo, hi = bounds
+    demand = sh["demand"][lo:hi] if sh["demand"] is not None else None
+    return _simulate_frame(sh["pol"].iloc[lo:hi], sh["horizon"], sh["cfg"], sh["initial_inventory_units"], sh["lead_times"], sh["dates"], demand)
+
+
+def simulate_policy(
+    forecast_next: pd.DataFrame,
+    policy: pd.DataFrame,
+    cfg: InventoryConfig,
+    initial_inventory_units: float = 0.0,
+    executor: Optional[ExecutorConfig] = None,
+    timings: Optional[List[float]] = None,
+    demand: Optional[np.ndarray] = None,
+    lead_times: Optional[pd.DataFrame] = None,
+    fill_rates: Optional[List[pd.DataFrame]] = None,
+) -> pd.DataFrame:
+    """
+    Monte Carlo stockout risk per item. With an executor, items are sharded across workers;
+    every item draws from its own stream (see _stream), so results do not depend on the
+    backend or worker count.
+
+    Runs stream into per-item accumulators (see SimulationStats) in batches of
+    cfg.sim_batch_runs, so memory does not grow with cfg.simulation_runs. The summary has the
+    mean stockout-day rate, on-hand and unmet demand, the overall fill rate and the
+    cfg.summary_quantiles of unmet demand and on-hand stock; the per-day fill-rate frame
+    (date, item, fill_rate, stockout_rate) is appended to fill_rates if given.
+
+    demand optionally supplies pre-drawn (items, runs, horizon) demand, rows in sorted item
+    order (see draw_demand), e.g. to compare policies under common random numbers; its rows
+    are sharded across the executor like the items.
+    lead_times is a supplier table (see load_lead_times); other items use the policy's
+    lead_time_days, +/- cfg.lead_time_spread_days.
+    """
+    dates = np.sort(pd.to_datetime(forecast_next["date"]).unique())
+    horizon = len(dates)
+    pol = policy.drop_duplicates("item").sort_values("item").reset_index(drop=True)
+
+    if demand is not None and (demand.shape[0] != len(pol) or demand.shape[2] != horizon):
+        raise ValueError(f"demand has shape {demand.shape}; expected ({len(pol)}, runs, {horizon})")
+
+    if executor is None:
+        sim, daily = _simulate_frame(pol, horizon, cfg, initial_inventory_units, lead_times, dates, demand)
+    else:
+        shared_inputs = {
+            "pol": pol,
+            "horizon": horizon,
+            "cfg": cfg,
+            "initial_inventory_units": initial_inventory_units,
+            "lead_times": lead_times,
+            "dates": dates,
+            "demand": demand,
+        }
+        parts = map_chunks(_simulate_chunk, chunk_ranges(len(pol), executor), executor, shared_inputs)
+        sim = pd.concat([s for s, _ in parts], ignore_index=True) if parts else pd.DataFrame()
+        daily = pd.concat([d for _, d in parts], ignore_index=True) if parts else pd.DataFrame()
+
+    if fill_rates is not None:
+        fill_rates.append(daily)
+    if "_seconds" in sim.columns:
+        if timings is not None:
+            timings.extend(sim["_seconds"].tolist())
+        sim = sim.drop(columns="_seconds")
+    return sim.sort_values("avg_stockout_day_rate", ascending=False) if not sim.empty else sim
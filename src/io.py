@@ -1,9 +1,14 @@
 from __future__ import annotations
 
 from pathlib import Path
+from typing import Optional, Sequence
 import json
 import pandas as pd
 
+# Artifact formats by file extension. Parquet/Feather need pyarrow.
+FORMATS = {".csv": "csv", ".parquet": "parquet", ".pq": "parquet", ".feather": "feather", ".arrow": "feather"}
+EXTENSIONS = {"csv": ".csv", "parquet": ".parquet", "feather": ".feather"}
+
 
 def read_csv(path: str | Path) -> pd.DataFrame:
     p = Path(path)
@@ -18,6 +23,69 @@ def write_csv(df: pd.DataFrame, path: str | Path) -> None:
     df.to_csv(p, index=False)
 
 
+def table_format(path: str | Path) -> str:
+    suffix = Path(path).suffix.lower()
+    if suffix not in FORMATS:
+        raise ValueError(f"Unsupported file extension {suffix!r} (expected one of {sorted(FORMATS)})")
+    return FORMATS[suffix]
+
+
+def read_table(path: str | Path, parse_dates: Sequence[str] = ("date",)) -> pd.DataFrame:
+    """Read CSV / Parquet / Feather by extension; date columns come back as datetime64."""
+    p = Path(path)
+    if not p.exists():
+        raise FileNotFoundError(f"Input not found: {p}")
+    fmt = table_format(p)
+    if fmt == "parquet":
+        df = pd.read_parquet(p)
+    elif fmt == "feather":
+        df = pd.read_feather(p)
+    else:
+        df = pd.read_csv(p)
+    for c in parse_dates:
+        if c in df.columns and not pd.api.types.is_datetime64_any_dtype(df[c]):
+            df[c] = pd.to_datetime(df[c])
+    return df
+
+
+def write_table(df: pd.DataFrame, path: str | Path) -> None:
+    """
+    Write CSV / Parquet / Feather by extension. Columnar formats store `item` dictionary-encoded
+    (categorical) and `date` as a native timestamp column.
+    """
+    p = Path(path)
+    fmt = table_format(p)
+    if fmt == "csv":
+        write_csv(df, p)
+        return
+
+    p.parent.mkdir(parents=True, exist_ok=True)
+    out = df.reset_index(drop=True)
+    if "item" in out.columns and not isinstance(out["item"].dtype, pd.CategoricalDtype):
+        out["item"] = out["item"].astype("category")
+    if "date" in out.columns:
+        out["date"] = pd.to_datetime(out["date"])
+    for c in out.columns:
+        if out[c].dtype == object and pd.api.types.infer_dtype(out[c]).startswith("mixed"):
+            out[c] = out[c].astype(str)  # e.g. backtest `fold`: 1..K plus "all"
+    if fmt == "parquet":
+        out.to_parquet(p, index=False)
+    else:
+        out.to_feather(p)
+
+
+def artifact_path(directory: str | Path, stem: str, fmt: str = "csv") -> Path:
+    if fmt not in EXTENSIONS:
+        raise ValueError(f"Unknown output format: {fmt!r} (expected one of {sorted(EXTENSIONS)})")
+    return Path(directory) / f"{stem}{EXTENSIONS[fmt]}"
+
+
+def find_artifact(directory: str | Path, stem: str) -> Optional[Path]:
+    """Newest existing artifact `stem.*` in any supported format, or None."""
+    found = [p for p in (Path(directory) / f"{stem}{ext}" for ext in EXTENSIONS.values()) if p.exists()]
+    return max(found, key=lambda p: p.stat().st_mtime) if found else None
+
+
 def write_json(obj: dict, path: str | Path) -> None:
     p = Path(path)
     p.parent.mkdir(parents=True, exist_ok=True)
@@ -0,0 +1,282 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, replace
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Sequence, Tuple
+import time
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from src.forecast import ForecastConfig
+
+INTERMITTENT_MODELS = ("croston", "sba", "tsb")
+
+
+@dataclass(frozen=True)
+class Forecaster:
+    """
+    A family of forecasting models as batched kernels over an (items x days) history matrix.
+
+    fit(Y) -> state (one row per item); predict(state, horizon) -> {model name: (items x horizon)}.
+    update(state, Y_new) advances a fitted state by the days after Y without refitting; None
+    means the family is refitted from scratch (e.g. at every rolling origin).
+    warmup is the shortest history the family is scored on; intermittent families only run
+    for items routed to them. cost is the declared fit + predict cost of each of its models
+    per item, relative to a moving average (= 1); selection penalizes it (cost_penalty)
+    instead of measured timings, so the choice does not vary between runs.
+    """
+    names: Tuple[str, ...]
+    fit: Callable[[np.ndarray], np.ndarray]
+    predict: Callable[[np.ndarray, int], Dict[str, np.ndarray]]
+    warmup: int = 1
+    update: Optional[Callable[[np.ndarray, np.ndarray], np.ndarray]] = None
+    intermittent: bool = False
+    cost: float = 1.0
+
+    @property
+    def incremental(self) -> bool:
+        return self.update is not None
+
+
+# Families in backtest order; register() adds new ones.
+_REGISTRY: Dict[str, Callable[["ForecastConfig"], Forecaster]] = {}
+
+
+def register(family: str) -> Callable:
+    """Decorator for a factory cfg -> Forecaster; re-registering a family replaces it."""
+    def wrap(factory: Callable[["ForecastConfig"], Forecaster]) -> Callable[["ForecastConfig"], Forecaster]:
+        _REGISTRY[family] = factory
+        return factory
+    return wrap
+
+
+def forecasters(cfg: "ForecastConfig", intermittent: bool = True) -> List[Forecaster]:
+    """Every registered family for cfg (without the intermittent ones if intermittent=False)."""
+    fams = [factory(cfg) for factory in _REGISTRY.values()]
+    return [f for f in fams if intermittent or not f.intermittent]
+
+
+def find_forecaster(name: str, cfg: "ForecastConfig") -> Optional[Forecaster]:
+    """The family that produces model `name`; EWMA alphas outside cfg's grid are built on demand."""
+    for fam in forecasters(cfg):
+        if name in fam.names:
+            return fam
+    if name.startswith("ewma_alpha_"):
+        try:
+            return _ewma(replace(cfg, ewma_alpha_grid=(float(name[len("ewma_alpha_"):]),)), names=(name,))
+        except ValueError:
+            return None
+    return None
+
+
+def model_costs(cfg: "ForecastConfig", names) -> np.ndarray:
+    """Declared per-item cost of each model name (0 for names no family produces)."""
+    declared = {name: fam.cost for fam in forecasters(cfg) for name in fam.names}
+    out = []
+    for name in names:
+        if name not in declared:
+            fam = find_forecaster(str(name), cfg)
+            declared[name] = fam.cost if fam is not None else 0.0
+        out.append(declared[name])
+    return np.asarray(out, dtype=float)
+
+
+def fallback_model(cfg: "ForecastConfig") -> str:
+    """Model used when nothing could be scored: the moving average of cfg's window."""
+    return f"moving_average_{cfg.ma_window}d"
+
+
+# ---------------------------------------------------------------------------
+# cost accounting
+
+def charge(costs: Optional[Dict[str, Dict[str, float]]], fam: Forecaster, fit_s: float, predict_s: float, rows: int) -> None:
+    """Add a fit/predict timing to costs; a family's time is split evenly over its models."""
+    if costs is None:
+        return
+    share = 1.0 / max(1, len(fam.names))
+    for name in fam.names:
+        c = costs.setdefault(name, {"fit_s": 0.0, "predict_s": 0.0, "rows": 0})
+        c["fit_s"] += fit_s * share
+        c["predict_s"] += predict_s * share
+        c["rows"] += rows
+
+
+def fit_predict(fam: Forecaster, Y: np.ndarray, horizon: int, costs: Optional[Dict[str, Dict[str, float]]] = None) -> Dict[str, np.ndarray]:
+    t0 = time.perf_counter()
+    state = fam.fit(Y)
+    t1 = time.perf_counter()
+    preds = fam.predict(state, horizon)
+    charge(costs, fam, t1 - t0, time.perf_counter() - t1, len(Y))
+    return preds
+
+
+def merge_costs(into: Dict[str, Dict[str, float]], other: Dict[str, Dict[str, float]]) -> None:
+    for name, c in other.items():
+        dst = into.setdefault(name, {"fit_s": 0.0, "predict_s": 0.0, "rows": 0})
+        for k, v in c.items():
+            dst[k] += v
+
+
+def cost_per_item_ms(costs: Dict[str, Dict[str, float]]) -> Dict[str, float]:
+    """Fit + predict milliseconds per item of each model."""
+    return {name: 1e3 * (c["fit_s"] + c["predict_s"]) / max(1, c["rows"]) for name, c in costs.items()}
+
+
+def cost_summary(costs: Dict[str, Dict[str, float]]) -> Dict[str, Dict[str, float]]:
+    """JSON-ready costs per model: total fit / predict seconds, fitted rows, microseconds per row."""
+    per_item = cost_per_item_ms(costs)
+    return {
+        name: {"fit_s": round(c["fit_s"], 6), "predict_s": round(c["predict_s"], 6), "rows": int(c["rows"]), "us_per_item": round(1e3 * per_item[name], 3)}
+        for name, c in costs.items()
+    }
+
+
+# ---------------------------------------------------------------------------
+# kernels
+
+def _ewma_advance(level: np.ndarray, segment: np.ndarray, alphas) -> np.ndarray:
+    """
+    Carry EWMA levels forward over the columns of segment, for a grid of alphas at once.
+    level: (rows,) or (rows, A); segment: (rows, m); returns (rows, A).
+
+    Closed form: (1 - a)^m * level + sum_j a * (1 - a)^(m - 1 - j) * segment[:, j].
+    Powers are taken from the newest value backwards, so nothing overflows on long
+    histories; columns whose weight is below machine epsilon are skipped.
+    """
+    alphas = np.atleast_1d(np.asarray(alphas, dtype=float))
+    level = np.asarray(level, dtype=float)
+    if level.ndim == 1:
+        level = level[:, None]
+    m = segment.shape[1]
+    decay = 1.0 - alphas
+
+    keep = m
+    slowest = float(decay.max()) if len(decay) else 0.0
+    if 0.0 < slowest < 1.0:
+        keep = min(m, int(np.ceil(np.log(np.finfo(float).eps) / np.log(slowest))) + 1)
+
+    lags = np.arange(keep)[::-1]
+    weights = alphas[:, None] * np.power(decay[:, None], lags[None, :])
+    return level * np.power(decay, m) + segment[:, m - keep:] @ weights.T
+
+
+def ewma_levels(Y: np.ndarray, alphas) -> np.ndarray:
+    """Final EWMA level of every row of Y (seeded with the first value) for each alpha: (rows, A)."""
+    Y = np.atleast_2d(np.asarray(Y, dtype=float))
+    n_alphas = len(np.atleast_1d(alphas))
+    if Y.shape[1] == 0:
+        return np.zeros((Y.shape[0], n_alphas))
+    return _ewma_advance(Y[:, 0], Y[:, 1:], alphas)
+
+
+def _intermittent_advance(state: np.ndarray, Y: np.ndarray, alpha: float, beta: float) -> np.ndarray:
+    """
+    Step Croston / TSB state over the columns of Y, vectorized over rows.
+    State columns: demand size z, interval p, days since the previous demand (this one
+    included), demand probability, seen-a-demand flag, days observed.
+    """
+    z, p, since, prob, seen, days = (state[:, j].copy() for j in range(6))
+    seen = seen.astype(bool)
+    for t in range(Y.shape[1]):
+        y = Y[:, t]
+        d = y > 0
+        first = d & ~seen
+        upd = d & seen
+        z = np.where(first, y, np.where(upd, z + alpha * (y - z), z))
+        p = np.where(first, since, np.where(upd, p + alpha * (since - p), p))
+        prob = np.where(days == 0, d, prob + beta * (d - prob))
+        since = np.where(d, 1.0, since + 1.0)
+        seen |= d
+        days = days + 1
+    return np.stack([z, p, since, prob, seen, days], axis=1)
+
+
+# ---------------------------------------------------------------------------
+# built-in families
+
+@register("seasonal_naive")
+def _seasonal_naive(cfg: "ForecastConfig") -> Forecaster:
+    """Repeat the last season (shorter histories repeat their last day)."""
+    period = int(cfg.seasonal_period)
+
+    def predict(state: np.ndarray, horizon: int) -> Dict[str, np.ndarray]:
+        if state.shape[1] < period:
+            last = state[:, -1:] if state.shape[1] else np.zeros((len(state), 1))
+            return {"seasonal_naive_weekly": np.repeat(last, horizon, axis=1)}
+        reps = int(np.ceil(horizon / period))
+        return {"seasonal_naive_weekly": np.tile(state, reps)[:, :horizon]}
+
+    return Forecaster(
+        names=("seasonal_naive_weekly",),
+        fit=lambda Y: Y[:, -period:],
+        predict=predict,
+        warmup=period,
+        update=lambda state, Y: np.concatenate([state, Y], axis=1)[:, -period:],
+    )
+
+
+@register("moving_average")
+def _moving_average(cfg: "ForecastConfig") -> Forecaster:
+    window = int(cfg.ma_window)
+    name = fallback_model(cfg)
+
+    def predict(state: np.ndarray, horizon: int) -> Dict[str, np.ndarray]:
+        level = state.mean(axis=1) if state.shape[1] else np.zeros(len(state))
+        return {name: np.repeat(level[:, None], horizon, axis=1)}
+
+    return Forecaster(
+        names=(name,),
+        fit=lambda Y: Y[:, -window:],
+        predict=predict,
+        update=lambda state, Y: np.concatenate([state, Y], axis=1)[:, -window:],
+    )
+
+
+@register("ewma")
+def _ewma(cfg: "ForecastConfig", names: Optional[Sequence[str]] = None) -> Forecaster:
+    """Flat EWMA level, one model per alpha of the grid (all alphas in one pass)."""
+    alphas = tuple(cfg.ewma_alpha_grid) or (cfg.ewma_alpha,)
+    names = tuple(names) if names else tuple(f"ewma_alpha_{a}" for a in alphas)
+
+    def predict(state: np.ndarray, horizon: int) -> Dict[str, np.ndarray]:
+        return {name: np.repeat(state[:, a:a + 1], horizon, axis=1) for a, name in enumerate(names)}
+
+    return Forecaster(
+        names=names,
+        fit=lambda Y: ewma_levels(Y, alphas),
+        predict=predict,
+        update=lambda state, Y: _ewma_advance(state, Y, alphas),
+        cost=2.0,  # a matrix product over the history instead of a window
+    )
+
+
+@register("intermittent")
+def _intermittent(cfg: "ForecastConfig") -> Forecaster:
+    """
+    Croston smooths demand sizes z and intervals p on demand days and forecasts z / p; SBA
+    scales that by (1 - alpha / 2) to remove Croston's bias; TSB smooths the probability of a
+    demand day every day and forecasts probability * z. Sizes and intervals are seeded with
+    the first demand, the probability with the first day.
+    """
+    a, b = float(cfg.intermittent_alpha), float(cfg.tsb_beta)
+
+    def fit(Y: np.ndarray) -> np.ndarray:
+        start = np.zeros((len(Y), 6))
+        start[:, 1] = start[:, 2] = 1.0
+        return _intermittent_advance(start, Y, a, b)
+
+    def predict(state: np.ndarray, horizon: int) -> Dict[str, np.ndarray]:
+        z, p, prob = state[:, 0], state[:, 1], state[:, 3]
+        croston = z / p
+        levels = (croston, (1.0 - a / 2.0) * croston, prob * z)
+        return {name: np.repeat(level[:, None], horizon, axis=1) for name, level in zip(INTERMITTENT_MODELS, levels)}
+
+    return Forecaster(
+        names=INTERMITTENT_MODELS,
+        fit=fit,
+        predict=predict,
+        warmup=2 * int(cfg.seasonal_period),
+        update=lambda state, Y: _intermittent_advance(state, Y, a, b),
+        intermittent=True,
+        cost=4.0,  # steps through the history day by day
+    )
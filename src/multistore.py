@@ -0,0 +1,313 @@
+from __future__ import annotations
+
+import argparse
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.io import FORMATS, read_table, write_table, write_json, artifact_path, find_artifact
+from src.clean import clean_transactions, CleanConfig
+from src.aggregate import aggregate_transactions, make_daily_grid
+from src.parallel import ExecutorConfig, chunk_ranges, map_chunks
+from src.grid import DemandGrid
+from src.profiling import Profiler
+from src.forecast import run_forecasting, ForecastConfig
+from src.models import cost_summary
+from src.inventory import load_lead_times, InventoryConfig
+from src.bootstrap import demand_paths, BootstrapConfig
+from src.pipeline import (
+    add_executor_args,
+    add_forecast_args,
+    add_output_args,
+    add_policy_args,
+    add_simulate_args,
+    forecast_config,
+    inventory_config,
+    policy_and_simulation,
+)
+
+# Layout of a multi-store run: one directory per partition with the single-store artifacts,
+# so each can be opened on its own (e.g. by the dashboard) and merged with merge_partitions.
+STORES_DIR = "stores"
+CHAIN_DIR = "chain"
+
+
+def _partition_name(store: Any) -> str:
+    """Store label usable as a directory name."""
+    name = str(store).strip().replace("/", "_").replace("\\", "_")
+    return name or "_"
+
+
+def run_partition(
+    grid: DemandGrid,
+    out_dir: str | Path,
+    fcfg: ForecastConfig,
+    icfg: InventoryConfig,
+    executor: Optional[ExecutorConfig] = None,
+    lead_times: Optional[pd.DataFrame] = None,
+    output_format: str = "csv",
+    bootstrap: Optional[BootstrapConfig] = None,
+) -> Dict[str, Any]:
+    """
+    Forecast, reorder policy and simulation for one partition's daily grid, written to out_dir
+    with the pipeline's artifact names and a run_metadata.json. With a bootstrap config, the
+    partition's own backtest residuals give sigma and the simulated demand paths. Returns a
+    summary row.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    prof = Profiler()
+    t0 = time.perf_counter()
+
+    timings: List[float] = []
+    costs: Dict[str, Dict[str, float]] = {}
+    with prof.stage("forecast", rows_in=grid.n_items * grid.n_days) as rec:
+        backtest, selection, forecast_next = run_forecasting(grid, fcfg, executor=executor, timings=timings, costs=costs)
+        rec.rows_out = len(forecast_next)
+    prof.record_items("forecast", timings)
+    paths = None
+    if bootstrap is not None:
+        with prof.stage("bootstrap", rows_in=grid.n_items) as rec:
+            paths = demand_paths(grid, selection, forecast_next, fcfg, icfg.simulation_runs, bootstrap, icfg.demand_sigma_floor)
+            rec.rows_out = paths.paths.shape[0] * paths.paths.shape[1]
+    policy, sim, fill_rate = policy_and_simulation(grid, forecast_next, icfg, executor, prof, lead_times, paths)
+
+    with prof.stage("materialize_daily", rows_in=grid.n_items * grid.n_days):
+        daily = grid.to_frame()
+    artifacts = {
+        "daily_item_demand": daily,
+        "backtest_scores": backtest,
+        "item_model_selection": selection,
+        "forecast_next_30d": forecast_next,
+        "reorder_policy": policy,
+        "simulation_summary": sim,
+        "fill_rate_daily": fill_rate,
+    }
+    with prof.stage("write", rows_in=sum(len(df) for df in artifacts.values())):
+        for stem, df in artifacts.items():
+            write_table(df, artifact_path(out_dir, stem, output_format))
+
+    write_json({
+        "horizon_days": fcfg.horizon_days,
+        "backtest_days": fcfg.backtest_days,
+        "lead_time_days": icfg.lead_time_days,
+        "service_level": icfg.service_level,
+        "simulation_runs": icfg.simulation_runs,
+        "effective_simulation_runs": int(sim["simulation_runs"].min()) if len(sim) else 0,
+        "demand_model": "bootstrap" if bootstrap is not None else "normal",
+        "output_format": output_format,
+        "n_days": grid.n_days,
+        "n_items": grid.n_items,
+        "model_costs": cost_summary(costs),
+        "profile": prof.summary(),
+    }, out_dir / "run_metadata.json")
+
+    return {
+        "n_items": grid.n_items,
+        "n_days": grid.n_days,
+        "revenue": float(grid.revenue.sum(dtype=np.float64)),
+        "forecast_qty": float(forecast_next["forecast_qty"].sum()) if len(forecast_next) else 0.0,
+        "avg_stockout_day_rate": float(sim["avg_stockout_day_rate"].mean()) if len(sim) else float("nan"),
+        "seconds": time.perf_counter() - t0,
+    }
+
+
+def _read_store_file(path: str | Path, ccfg: CleanConfig) -> Tuple[DemandGrid, int]:
+    txn = clean_transactions(read_table(path, parse_dates=()), ccfg)
+    return make_daily_grid(txn), len(txn)
+
+
+def _partition_chunk(sh: Dict[str, Any], bounds: Tuple[int, int]) -> List[Tuple[str, Optional[DemandGrid], Dict[str, Any]]]:
+    """Run the partitions in bounds. Grids read from files here are returned for the chain roll-up."""
+    out = []
+    for store, source, n_txn in sh["partitions"][bounds[0]:bounds[1]]:
+        read_here = not isinstance(source, DemandGrid)
+        grid, n_txn = _read_store_file(source, sh["ccfg"]) if read_here else (source, n_txn)
+        row = {"store": store, "n_txn_rows": int(n_txn)}
+        if grid.n_items and grid.n_days:
+            row.update(run_partition(
+                grid, Path(sh["out_dir"]) / STORES_DIR / store, sh["fcfg"], sh["icfg"],
+                lead_times=sh["lead_times"], output_format=sh["output_format"], bootstrap=sh["bootstrap"],
+            ))
+        out.append((store, grid if read_here else None, row))
+    return out
+
+
+def load_partitions(input_path: str | Path, store_column: str, ccfg: CleanConfig) -> List[Tuple[str, Any, int]]:
+    """
+    (store, source, transaction rows) per store, sorted by store. For a directory, every
+    table file is one store (named after the file stem) and source is its path: each worker
+    then reads its own file. For a single table, rows are cleaned once, totalled per
+    (store, date, item) in one groupby and split into per-store DemandGrids.
+    """
+    p = Path(input_path)
+    if p.is_dir():
+        files = sorted(f for f in p.iterdir() if f.is_file() and f.suffix.lower() in FORMATS)
+        if not files:
+            raise FileNotFoundError(f"No CSV / Parquet / Feather files in {p}")
+        return [(_partition_name(f.stem), str(f), 0) for f in files]
+
+    raw = read_table(p, parse_dates=())
+    if store_column not in raw.columns:
+        raise ValueError(f"Store column {store_column!r} not found in {p} (columns: {list(raw.columns)})")
+    txn = clean_transactions(raw, ccfg)  # keeps the raw row index
+    stores = raw[store_column].reindex(txn.index)
+    txn = txn[stores.notna()].assign(store=stores.dropna().map(_partition_name))
+    n_txn = txn.groupby("store").size()
+    totals = aggregate_transactions(txn, ("store", "date", "item"))
+    return [
+        (store, DemandGrid.from_frame(g.drop(columns="store")), int(n_txn[store]))
+        for store, g in totals.groupby("store", sort=True)
+    ]
+
+
+def store_daily_totals(grids: Dict[str, DemandGrid]) -> pd.DataFrame:
+    """Daily totals over all items per store: date, store, demand_qty, revenue, txn_count."""
+    frames = [
+        pd.DataFrame({
+            "date": g.dates,
+            "store": store,
+            "demand_qty": g.demand.sum(axis=0, dtype=np.float64),
+            "revenue": g.revenue.sum(axis=0, dtype=np.float64),
+            "txn_count": g.txn_count.sum(axis=0, dtype=np.int64),
+        })
+        for store, g in grids.items()
+    ]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def merge_partitions(out_dir: str | Path, stem: str) -> pd.DataFrame:
+    """One artifact of every store partition stacked, with a leading store column."""
+    root = Path(out_dir) / STORES_DIR
+    parts = []
+    for d in sorted(root.iterdir()) if root.exists() else []:
+        path = find_artifact(d, stem)
+        if path is not None:
+            df = read_table(path)
+            df.insert(0, "store", d.name)
+            parts.append(df)
+    return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+
+
+def run_multistore(
+    input_path: str,
+    out_dir: str = "outputs/multistore",
+    store_column: str = "store",
+    fcfg: ForecastConfig = ForecastConfig(backtest_mode="batched"),
+    icfg: InventoryConfig = InventoryConfig(),
+    lead_times_path: Optional[str] = None,
+    executor: ExecutorConfig = ExecutorConfig(),
+    output_format: str = "csv",
+    merge: Sequence[str] = (),
+    bootstrap: Optional[BootstrapConfig] = None,
+) -> Dict[str, Any]:
+    """
+    Every store as an independent partition (in parallel across the executor's workers), plus
+    a chain level: the store grids summed per item and day, forecast and planned the same way.
+    Writes stores/<store>/ and chain/ with the single-store artifacts, store_daily_totals,
+    stores_summary and multistore_metadata.json; `merge` lists artifact stems to also write
+    stacked over all stores (stores_<stem>). With a bootstrap config, every partition (and the
+    chain) simulates block-bootstrapped paths of its own backtest residuals.
+    """
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    prof = Profiler()
+    ccfg = CleanConfig(drop_items=("unknown", "error"))
+    lead_times = load_lead_times(lead_times_path) if lead_times_path else None
+
+    with prof.stage("load") as rec:
+        partitions = load_partitions(input_path, store_column, ccfg)
+        rec.rows_out = len(partitions)
+
+    shared_inputs = {
+        "partitions": partitions,
+        "ccfg": ccfg,
+        "fcfg": fcfg,
+        "icfg": icfg,
+        "lead_times": lead_times,
+        "out_dir": str(out),
+        "output_format": output_format,
+        "bootstrap": bootstrap,
+    }
+    with prof.stage("stores", rows_in=len(partitions)) as rec:
+        results = [r for part in map_chunks(_partition_chunk, chunk_ranges(len(partitions), executor), executor, shared_inputs) for r in part]
+        rec.rows_out = len(results)
+    grids = {
+        store: grid if grid is not None else source
+        for (store, source, _), (_, grid, _) in zip(partitions, results)
+    }
+    summary = pd.DataFrame([row for _, _, row in results])
+
+    with prof.stage("chain") as rec:
+        chain = DemandGrid.combine(list(grids.values()))
+        rec.rows_in, rec.rows_out = len(grids), chain.n_items * chain.n_days
+        chain_summary = run_partition(chain, out / CHAIN_DIR, fcfg, icfg, executor if executor.backend != "serial" else None, lead_times, output_format, bootstrap) if chain.n_items else {}
+
+    with prof.stage("write"):
+        write_table(store_daily_totals(grids), artifact_path(out, "store_daily_totals", output_format))
+        write_table(summary, artifact_path(out, "stores_summary", output_format))
+        for stem in merge:
+            write_table(merge_partitions(out, stem), artifact_path(out, f"stores_{stem}", output_format))
+
+    meta = {
+        "input_path": str(input_path),
+        "store_column": store_column if not Path(input_path).is_dir() else None,
+        "n_stores": len(partitions),
+        "n_txn_rows": int(summary["n_txn_rows"].sum()) if len(summary) else 0,
+        "chain": {"n_items": chain.n_items, "n_days": chain.n_days, **chain_summary},
+        "horizon_days": fcfg.horizon_days,
+        "backtest_days": fcfg.backtest_days,
+        "backtest_mode": fcfg.backtest_mode,
+        "lead_time_days": icfg.lead_time_days,
+        "service_level": icfg.service_level,
+        "simulation_runs": icfg.simulation_runs,
+        "demand_model": "bootstrap" if bootstrap is not None else "normal",
+        "lead_times_path": lead_times_path,
+        "backend": executor.backend,
+        "workers": executor.workers,
+        "output_format": output_format,
+        "merged": list(merge),
+        "profile": prof.summary(),
+    }
+    write_json(meta, out / "multistore_metadata.json")
+    return {"out_dir": str(out), **meta}
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Multi-store pipeline: every store as a partition, plus the chain level")
+    parser.add_argument("--input", required=True, help="Sales table with a store column, or a directory of per-store files")
+    parser.add_argument("--store-column", default="store", help="Store column of a single input table")
+    parser.add_argument("--merge", default="", help="Comma-separated artifacts to also write stacked over all stores (e.g. forecast_next_30d,reorder_policy)")
+    add_output_args(parser)
+    add_forecast_args(parser)
+    add_policy_args(parser)
+    add_simulate_args(parser)
+    add_executor_args(parser)
+    parser.set_defaults(out="outputs/multistore", backtest_mode="batched")
+    args = parser.parse_args(argv)
+    icfg = inventory_config(args)
+
+    res = run_multistore(
+        args.input,
+        out_dir=args.out,
+        store_column=args.store_column,
+        fcfg=forecast_config(args),
+        icfg=icfg,
+        lead_times_path=args.lead_times_csv,
+        executor=ExecutorConfig(backend=args.backend, workers=args.workers),
+        output_format=args.format,
+        merge=tuple(s.strip() for s in args.merge.split(",") if s.strip()),
+        bootstrap=BootstrapConfig(block_days=args.bootstrap_block, memory_mb=args.bootstrap_memory_mb, random_seed=icfg.random_seed) if args.demand_model == "bootstrap" else None,
+    )
+
+    print(f"\nDone! {res['n_stores']} stores + chain level", flush=True)
+    print(f"Outputs folder: {res['out_dir']}", flush=True)
+    print(f"Transactions used: {res['n_txn_rows']}", flush=True)
+    print(f"Chain items: {res['chain']['n_items']}\n", flush=True)
+
+
+if __name__ == "__main__":
+    main()
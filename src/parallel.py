@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Callable, Dict, List, Tuple
+
+
+@dataclass(frozen=True)
+class ExecutorConfig:
+    backend: str = "serial"  # "serial" | "threads" | "processes"
+    workers: int = 1
+    chunk_size: int = 0  # items per work unit; 0 = about 4 units per worker
+
+
+# Inputs shared by every work unit of a call are passed to fn with its chunk. Process workers
+# receive them once, through the pool initializer, so tasks only carry their (start, stop)
+# item range; serial and thread runs pass the caller's dict, so concurrent calls (or a call
+# nested in a work unit) never see each other's inputs.
+_WORKER_SHARED: Dict[str, Any] = {}
+
+
+def _init_worker(shared: Dict[str, Any]) -> None:
+    _WORKER_SHARED.clear()
+    _WORKER_SHARED.update(shared)
+
+
+def _run_in_worker(fn: Callable[[Dict[str, Any], Tuple[int, int]], Any], bounds: Tuple[int, int]) -> Any:
+    return fn(_WORKER_SHARED, bounds)
+
+
+def chunk_ranges(n_items: int, cfg: ExecutorConfig) -> List[Tuple[int, int]]:
+    workers = max(1, int(cfg.workers))
+    size = int(cfg.chunk_size) or max(1, -(-n_items // (workers * 4)))
+    return [(lo, min(lo + size, n_items)) for lo in range(0, n_items, size)]
+
+
+def map_chunks(
+    fn: Callable[[Dict[str, Any], Tuple[int, int]], Any],
+    chunks: List[Tuple[int, int]],
+    cfg: ExecutorConfig,
+    shared_inputs: Dict[str, Any],
+) -> List[Any]:
+    """Apply fn(shared_inputs, chunk) to every chunk and return the results in chunk order."""
+    if cfg.backend not in ("serial", "threads", "processes"):
+        raise ValueError(f"Unknown executor backend: {cfg.backend!r} (expected 'serial', 'threads' or 'processes')")
+
+    workers = max(1, int(cfg.workers))
+    if cfg.backend == "processes" and workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(shared_inputs,)) as ex:
+            return list(ex.map(partial(_run_in_worker, fn), chunks))
+    if cfg.backend == "threads" and workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as ex:
+            return list(ex.map(partial(fn, shared_inputs), chunks))
+    return [fn(shared_inputs, c) for c in chunks]
@@ -1,17 +1,122 @@
 from __future__ import annotations
 
 import argparse
+import sys
 from pathlib import Path
-from typing import Dict, Any
+from typing import TYPE_CHECKING, Callable, Dict, Any, List, Optional, Sequence, Tuple
 
-import pandas as pd
+if TYPE_CHECKING:
+    import pandas as pd
 
-from src.io import read_csv, write_csv, write_json
-from src.clean import clean_transactions, CleanConfig
-from src.aggregate import make_daily_item_series, AggregateConfig
-from src.forecast import run_forecasting, ForecastConfig
-from src.inventory import compute_rop_policy, simulate_policy, InventoryConfig
-from src.reporting import fig_item_revenue_ranking, fig_backtest_summary, fig_forecast_examples, fig_rop_vs_demand
+    from src.bootstrap import DemandPaths
+    from src.cache import StageCache
+    from src.forecast import ForecastConfig
+    from src.grid import DemandGrid
+    from src.inventory import InventoryConfig
+    from src.parallel import ExecutorConfig
+    from src.profiling import Profiler
+
+# The stages (pandas and up) are imported by the functions that run them, so `--help`, a
+# single step and src.multistore's argument parsing load only what they use; src.reporting
+# (matplotlib) is imported only when figures are drawn.
+STEPS = ("ingest", "forecast", "policy", "simulate", "report")
+
+
+def _cached(cache: Optional[StageCache], stage: str, key: str, compute: Callable[[], Any], status: Dict[str, str]) -> Any:
+    """Return the cached result of a stage or compute and store it."""
+    if cache is None:
+        return compute()
+    value = cache.get(stage, key)
+    if value is None:
+        value = compute()
+        cache.put(stage, key, value)
+        status[stage] = "miss"
+    else:
+        status[stage] = "hit"
+    return value
+
+
+def _reusable(
+    last_run: Optional[StageCache], stage: str, key: str, grid: DemandGrid, changed: Sequence[str],
+) -> Tuple[Optional[Tuple[pd.DataFrame, ...]], List[str]]:
+    """
+    Outputs of the previous incremental run of a stage (same config key and days) and the items
+    to recompute: the changed items plus any whose demand differs from what that run saw (e.g.
+    when it did not finish). (None, []) when there is no such run; a new day moves every
+    item's forecast origin, so then every item is recomputed.
+    """
+    prev = last_run.get(stage, key) if last_run is not None else None
+    if prev is None or prev["days"] != _day_span(grid):
+        return None, []
+    rows = grid.row_digests()
+    stale = set(map(str, changed)) | {it for it, h in rows.items() if prev["rows"].get(it) != h}
+    return prev["frames"], sorted(stale)
+
+
+def _day_span(grid: DemandGrid) -> Tuple[str, str]:
+    return (str(grid.dates[0]), str(grid.dates[-1])) if grid.n_days else ("", "")
+
+
+def _splice(prev: pd.DataFrame, new: Optional[pd.DataFrame], items: Sequence[str], sort_by: Optional[str] = None) -> pd.DataFrame:
+    """
+    prev with the rows of `items` replaced by `new`, in the order a full run produces: by item,
+    then (descending, same sort) by sort_by for the stages that rank their rows.
+    """
+    import pandas as pd
+
+    keep = prev[~prev["item"].astype(str).isin(items)]
+    out = pd.concat([keep] + ([new] if new is not None else []), ignore_index=True)
+    out = out.sort_values("item", kind="stable").reset_index(drop=True)
+    return out.sort_values(sort_by, ascending=False) if sort_by else out
+
+
+def start_figures(
+    daily: pd.DataFrame,
+    backtest: pd.DataFrame,
+    forecast_next: pd.DataFrame,
+    policy: pd.DataFrame,
+    fig_dir: Path,
+    workers: int = 0,
+    item_charts: int = 0,
+):
+    """Queue the report figures (see FigureRenderer for when they go to worker processes); call .wait() on the result."""
+    from src.reporting import FigureRenderer, figure_jobs
+
+    renderer = FigureRenderer(fig_dir, workers=workers)
+    renderer.submit(figure_jobs(daily, backtest, forecast_next, policy, item_charts=item_charts))
+    return renderer
+
+
+def policy_and_simulation(
+    grid: DemandGrid,
+    forecast_next: pd.DataFrame,
+    icfg: InventoryConfig,
+    executor: Optional[ExecutorConfig],
+    prof: Profiler,
+    lead_times: Optional[pd.DataFrame] = None,
+    paths: Optional[DemandPaths] = None,
+) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """
+    Policy, simulation summary and per-day fill rates. With bootstrap paths, sigma comes from
+    the backtest residuals and the simulator replays the paths.
+    """
+    from src.bootstrap import with_residual_sigma
+    from src.inventory import demand_stats, rop_policy, simulate_policy
+
+    with prof.stage("policy", rows_in=len(forecast_next)) as rec:
+        stats = demand_stats(grid, forecast_next, icfg)
+        if paths is not None:
+            stats = with_residual_sigma(stats, paths, icfg.demand_sigma_floor)
+        policy = rop_policy(stats, icfg, lead_times=lead_times)
+        rec.rows_out = len(policy)
+    timings: List[float] = []
+    fill_rates: List[pd.DataFrame] = []
+    with prof.stage("simulate", rows_in=len(policy)) as rec:
+        demand = paths.for_items(policy["item"].drop_duplicates().sort_values()) if paths is not None else None
+        sim = simulate_policy(forecast_next, policy, icfg, executor=executor, timings=timings, demand=demand, lead_times=lead_times, fill_rates=fill_rates)
+        rec.rows_out = len(sim)
+    prof.record_items("simulate", timings)
+    return policy, sim, fill_rates[0]
 
 
 def run(
@@ -21,74 +126,527 @@ def run(
     horizon_days: int = 30,
     backtest_days: int = 28,
     lead_time_days: int = 3,
+    lead_time_spread_days: int = 0,
+    lead_times_path: Optional[str] = None,
     service_level: float = 0.95,
     simulation_runs: int = 300,
+    sim_engine: str = "vectorized",
+    sim_batch_runs: int = 1000,
+    sim_memory_mb: float = 256.0,
+    demand_model: str = "normal",
+    bootstrap_block_days: int = 7,
+    bootstrap_memory_mb: float = 256.0,
+    backtest_mode: str = "per_item",
+    backtest_folds: int = 1,
+    backtest_step: int = 7,
+    ewma_alpha_grid: Tuple[float, ...] = (),
+    intermittent_adi: float = 1.32,
+    cost_penalty: float = 0.0,
+    backend: str = "serial",
+    workers: int = 1,
+    output_format: str = "csv",
+    stream: bool = False,
+    chunksize: int = 1_000_000,
+    distinct: str = "exact",
+    incremental_dir: Optional[str] = None,
+    cache_dir: Optional[str] = None,
+    cache_max_entries: int = 32,
+    profile: Tuple[str, ...] = (),
+    trace_memory: bool = False,
+    trace_path: Optional[str] = None,
+    figures: bool = True,
+    figure_workers: int = 0,
+    item_charts: int = 0,
+    return_frames: bool = False,
 ) -> Dict[str, Any]:
+    """
+    Run every stage and write the artifacts. The result holds the run metadata; with
+    return_frames=True it also carries the output tables under "frames" (keyed by artifact stem),
+    so callers need not read them back from disk. "run_key" identifies the input + configs.
+    """
+    import pandas as pd
+
+    from src.io import read_table, write_table, write_json, artifact_path
+    from src.clean import clean_transactions, CleanConfig
+    from src.aggregate import make_daily_grid, AggregateConfig
+    from src.ingest import stream_daily_item_series, stream_daily_state, StreamConfig
+    from src.cache import StageCache, file_digest, stage_key
+    from src.parallel import ExecutorConfig
+    from src.grid import DemandGrid
+    from src.profiling import Profiler
+    from src.forecast import run_forecasting, ForecastConfig
+    from src.models import cost_summary
+    from src.inventory import load_lead_times, InventoryConfig
+    from src.bootstrap import demand_paths, BootstrapConfig
+
     out_dir = Path(out_dir)
     fig_dir = Path(figures_dir)
     out_dir.mkdir(parents=True, exist_ok=True)
-    fig_dir.mkdir(parents=True, exist_ok=True)
+    if figures:
+        fig_dir.mkdir(parents=True, exist_ok=True)
+
+    # stage timings always go into run_metadata.json; cProfile dumps only for the `profile` stages
+    prof = Profiler(trace_memory=trace_memory, cprofile_dir=out_dir / "profile", cprofile_stages=profile)
+
+    ccfg = CleanConfig(drop_items=("unknown", "error"))
+    acfg = AggregateConfig(fill_missing_days=True)
+    # Stages are keyed by a hash of the input file plus the configs they depend on, so e.g. an
+    # inventory-only change reuses the cached ingest and forecasting results.
+    cache = StageCache(cache_dir, max_entries=cache_max_entries) if cache_dir else None
+    cache_status: Dict[str, str] = {}
+    changed_items = None
+    # the incremental store keeps the last run's outputs, so unchanged items can reuse their rows
+    last_run = StageCache(Path(incremental_dir) / "last_run", max_entries=2) if incremental_dir else None
+    n_reused: Dict[str, int] = {}
+
+    def read_and_clean() -> pd.DataFrame:
+        with prof.stage("read") as rec:
+            raw = read_table(input_path, parse_dates=())
+            rec.rows_out = len(raw)
+        with prof.stage("clean", rows_in=len(raw)) as rec:
+            txn = clean_transactions(raw, ccfg)
+            rec.rows_out = len(txn)
+        return txn
+
+    # The daily series stay an items x days DemandGrid until export.
+    def ingest() -> Tuple[DemandGrid, int]:
+        if stream:
+            # chunked ingest: peak memory follows days x items, not transaction rows
+            with prof.stage("stream_ingest") as rec:
+                daily, n = stream_daily_item_series(input_path, ccfg, acfg, StreamConfig(chunksize=chunksize, distinct=distinct))
+                grid = DemandGrid.from_frame(daily)
+                rec.rows_in, rec.rows_out = n, len(daily)
+            return grid, n
+        txn = read_and_clean()
+        with prof.stage("aggregate", rows_in=len(txn)) as rec:
+            grid = make_daily_grid(txn)
+            rec.rows_out = grid.n_items * grid.n_days
+        return grid, len(txn)
 
-    raw = read_csv(input_path)
-    txn = clean_transactions(raw, CleanConfig(drop_items=("unknown", "error")))
+    if incremental_dir:
+        # append-only feed: the input is read in chunks and only rows from the store's
+        # high-water mark on are aggregated (always streamed; n_txn_rows counts those rows)
+        with prof.stage("aggregate_incremental") as rec:
+            daily, changed_items, n_txn_rows = stream_daily_state(
+                input_path, incremental_dir, ccfg, acfg, StreamConfig(chunksize=chunksize, distinct=distinct))
+            grid = DemandGrid.from_frame(daily)
+            rec.rows_in, rec.rows_out = n_txn_rows, len(daily)
+        ingest_key = stage_key("incremental", grid.digest())
+    else:
+        with prof.stage("hash_input"):
+            ingest_key = stage_key(file_digest(input_path), ccfg, acfg, {"stream": stream, "distinct": distinct if stream else "exact"})
+        grid, n_txn_rows = _cached(cache, "ingest", ingest_key, ingest, cache_status)
 
-    daily = make_daily_item_series(txn, AggregateConfig(fill_missing_days=True))
+    fcfg = ForecastConfig(
+        horizon_days=horizon_days,
+        backtest_days=backtest_days,
+        backtest_mode=backtest_mode,
+        backtest_folds=backtest_folds,
+        backtest_step=backtest_step,
+        ewma_alpha_grid=tuple(ewma_alpha_grid),
+        intermittent_adi=intermittent_adi,
+        cost_penalty=cost_penalty,
+    )
+    executor = ExecutorConfig(backend=backend, workers=workers) if backend != "serial" else None
+
+    last_forecast_key = stage_key(fcfg)
 
-    # Save processed copy
-    proc_path = Path("data/processed/daily_item_demand.csv")
-    proc_path.parent.mkdir(parents=True, exist_ok=True)
-    daily.to_csv(proc_path, index=False)
+    def forecast() -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, Dict[str, Dict[str, float]]]:
+        timings: List[float] = []
+        costs: Dict[str, Dict[str, float]] = {}
+        prev, stale = _reusable(last_run, "forecast", last_forecast_key, grid, changed_items or [])
+        with prof.stage("forecast", rows_in=grid.n_items * grid.n_days) as rec:
+            if prev is None:
+                out = run_forecasting(grid, fcfg, executor=executor, timings=timings, costs=costs)
+            else:
+                new = run_forecasting(grid.select(stale), fcfg, executor=executor, timings=timings, costs=costs) if stale else (None,) * 3
+                out = tuple(_splice(p, n, stale) for p, n in zip(prev, new))
+                n_reused["forecast"] = grid.n_items - len(stale)
+            rec.rows_out = len(out[2])
+        prof.record_items("forecast", timings)
+        return (*out, costs)
 
-    fcfg = ForecastConfig(horizon_days=horizon_days, backtest_days=backtest_days)
-    backtest, selection, forecast_next = run_forecasting(daily, fcfg)
+    forecast_key = stage_key(ingest_key, fcfg)
+    backtest, selection, forecast_next, model_costs = _cached(cache, "forecast", forecast_key, forecast, cache_status)
+    if last_run is not None:
+        last_run.put("forecast", last_forecast_key, {
+            "days": _day_span(grid), "rows": grid.row_digests(), "frames": (backtest, selection, forecast_next)})
 
     icfg = InventoryConfig(
         lead_time_days=lead_time_days,
+        lead_time_spread_days=lead_time_spread_days,
         service_level=service_level,
         simulation_runs=simulation_runs,
+        sim_engine=sim_engine,
+        sim_batch_runs=sim_batch_runs,
+        sim_memory_mb=sim_memory_mb,
+    )
+    lead_times = load_lead_times(lead_times_path) if lead_times_path else None
+    if demand_model not in ("normal", "bootstrap"):
+        raise ValueError(f"Unknown demand_model: {demand_model!r} (expected 'normal' or 'bootstrap')")
+    bcfg = BootstrapConfig(block_days=bootstrap_block_days, memory_mb=bootstrap_memory_mb, random_seed=icfg.random_seed)
+    lead_times_digest = file_digest(lead_times_path) if lead_times_path else None
+    policy_key = stage_key(
+        forecast_key, icfg,
+        {"lead_times": lead_times_digest},
+        bcfg if demand_model == "bootstrap" else None,
     )
-    policy = compute_rop_policy(daily, forecast_next, icfg)
-    sim = simulate_policy(forecast_next, policy, icfg)
+    # bootstrap paths are drawn for all items together, so only the normal model reuses rows
+    last_policy_key = stage_key(fcfg, icfg, {"lead_times": lead_times_digest}) if demand_model == "normal" else None
+
+    def bootstrap() -> DemandPaths:
+        with prof.stage("bootstrap", rows_in=grid.n_items) as rec:
+            paths = demand_paths(grid, selection, forecast_next, fcfg, icfg.simulation_runs, bcfg, icfg.demand_sigma_floor)
+            rec.rows_out = paths.paths.shape[0] * paths.paths.shape[1]
+        return paths
+
+    def plan_and_simulate() -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+        # residual paths only depend on the forecasts, so they are cached apart from the policy
+        paths = None
+        if demand_model == "bootstrap":
+            paths = _cached(cache, "demand_paths", stage_key(forecast_key, bcfg, icfg.simulation_runs), bootstrap, cache_status)
+        prev, stale = _reusable(last_run if last_policy_key else None, "policy", last_policy_key, grid, changed_items or [])
+        if prev is None:
+            return policy_and_simulation(grid, forecast_next, icfg, executor, prof, lead_times, paths)
+        new = (None,) * 3
+        if stale:
+            new = policy_and_simulation(grid.select(stale), forecast_next[forecast_next["item"].astype(str).isin(stale)],
+                                        icfg, executor, prof, lead_times)
+        n_reused["policy"] = grid.n_items - len(stale)
+        return (
+            _splice(prev[0], new[0], stale, "reorder_point_units"),
+            _splice(prev[1], new[1], stale, "avg_stockout_day_rate"),
+            _splice(prev[2], new[2], stale),
+        )
+
+    policy, sim, fill_rate = _cached(cache, "policy", policy_key, plan_and_simulate, cache_status)
+    if last_run is not None and last_policy_key:
+        last_run.put("policy", last_policy_key, {"days": _day_span(grid), "rows": grid.row_digests(), "frames": (policy, sim, fill_rate)})
 
-    write_csv(daily, out_dir / "daily_item_demand.csv")
-    write_csv(backtest, out_dir / "backtest_scores.csv")
-    write_csv(selection, out_dir / "item_model_selection.csv")
-    write_csv(forecast_next, out_dir / "forecast_next_30d.csv")
-    write_csv(policy, out_dir / "reorder_policy.csv")
-    write_csv(sim, out_dir / "simulation_summary.csv")
+    with prof.stage("materialize_daily", rows_in=grid.n_items * grid.n_days):
+        daily = grid.to_frame()
+
+    artifacts = {
+        "daily_item_demand": daily,
+        "backtest_scores": backtest,
+        "item_model_selection": selection,
+        "forecast_next_30d": forecast_next,
+        "reorder_policy": policy,
+        "simulation_summary": sim,
+        "fill_rate_daily": fill_rate,
+    }
+    # figures render in worker processes while the tables are written
+    renderer = None
+    if figures:
+        with prof.stage("figures_submit"):
+            renderer = start_figures(daily, backtest, forecast_next, policy, fig_dir, figure_workers, item_charts)
+    with prof.stage("write", rows_in=sum(len(df) for df in artifacts.values())):
+        for stem, df in artifacts.items():
+            write_table(df, artifact_path(out_dir, stem, output_format))
 
     meta = {
+        "run_key": policy_key,
         "horizon_days": horizon_days,
         "backtest_days": backtest_days,
         "lead_time_days": lead_time_days,
+        "lead_time_spread_days": lead_time_spread_days,
+        "lead_times_path": lead_times_path,
         "service_level": service_level,
         "simulation_runs": simulation_runs,
-        "n_txn_rows": int(len(txn)),
-        "n_days": int(pd.to_datetime(daily["date"]).nunique()),
-        "n_items": int(daily["item"].nunique()),
+        # runs actually simulated per item: bootstrap paths are capped by --bootstrap-memory-mb
+        "effective_simulation_runs": int(sim["simulation_runs"].min()) if len(sim) else 0,
+        "sim_engine": sim_engine,
+        "sim_batch_runs": sim_batch_runs,
+        "demand_model": demand_model,
+        "backtest_mode": backtest_mode,
+        "backtest_folds": backtest_folds,
+        "backtest_step": backtest_step,
+        "ewma_alpha_grid": list(ewma_alpha_grid),
+        "intermittent_adi": intermittent_adi,
+        "n_intermittent_items": int((grid.adi >= intermittent_adi).sum()),
+        "cost_penalty": cost_penalty,
+        "model_costs": cost_summary(model_costs),
+        "backend": backend,
+        "workers": workers,
+        "output_format": output_format,
+        "figures": figures,
+        "item_charts": item_charts,
+        "stream": stream,
+        "distinct": distinct if stream or incremental_dir else "exact",
+        "n_txn_rows": int(n_txn_rows),
+        "n_days": grid.n_days,
+        "n_items": grid.n_items,
     }
+    if changed_items is not None:
+        meta["incremental_dir"] = str(incremental_dir)
+        meta["n_changed_items"] = len(changed_items)
+        meta["changed_items"] = changed_items
+        meta["n_reused_items"] = n_reused
+    if cache is not None:
+        meta["cache"] = cache_status
+
+    if renderer is not None:
+        with prof.stage("figures"):
+            meta["figure_status"] = renderer.wait()
+
+    meta["profile"] = prof.summary()
+    prof.close()
     write_json(meta, out_dir / "run_metadata.json")
+    if trace_path:
+        prof.write_trace(trace_path)
 
-    # figures
-    fig_item_revenue_ranking(daily, fig_dir / "item_revenue_ranking.png")
-    fig_backtest_summary(backtest, fig_dir / "backtest_summary.png")
-    fig_forecast_examples(daily, forecast_next, fig_dir / "forecast_examples.png", top_n=4)
-    fig_rop_vs_demand(policy, fig_dir / "rop_vs_demand.png")
+    res = {"out_dir": str(out_dir), "figures_dir": str(fig_dir), **meta}
+    if return_frames:
+        res["frames"] = artifacts
+    return res
 
-    return {"out_dir": str(out_dir), "figures_dir": str(fig_dir), **meta}
 
+def _load(out_dir: str, stem: str, step: str) -> pd.DataFrame:
+    from src.io import find_artifact, read_table
 
-def main() -> None:
-    parser = argparse.ArgumentParser(description="Café demand forecasting + reorder simulation pipeline")
-    parser.add_argument("--input", required=True, help="Path to input CSV (cafe sales)")
-    parser.add_argument("--out", default="outputs", help="Output directory")
-    parser.add_argument("--figures", default="reports/figures", help="Figures directory")
+    path = find_artifact(out_dir, stem)
+    if path is None:
+        raise SystemExit(f"{stem} not found in {out_dir}; run `python -m src.pipeline {step}` first")
+    return read_table(path)
+
+
+def _executor(args: argparse.Namespace) -> Optional[ExecutorConfig]:
+    from src.parallel import ExecutorConfig
+
+    return ExecutorConfig(backend=args.backend, workers=args.workers) if args.backend != "serial" else None
+
+
+def forecast_config(args: argparse.Namespace) -> ForecastConfig:
+    """ForecastConfig from the arguments of add_forecast_args (also used by src.multistore)."""
+    from src.forecast import ForecastConfig
+
+    return ForecastConfig(
+        horizon_days=args.horizon,
+        backtest_days=args.backtest,
+        backtest_mode=args.backtest_mode,
+        backtest_folds=args.backtest_folds,
+        backtest_step=args.backtest_step,
+        ewma_alpha_grid=tuple(float(a) for a in args.ewma_alphas.split(",") if a.strip()),
+        intermittent_adi=args.intermittent_adi,
+        cost_penalty=args.cost_penalty,
+    )
+
+
+def inventory_config(args: argparse.Namespace) -> InventoryConfig:
+    """InventoryConfig from the arguments of add_policy_args / add_simulate_args."""
+    from src.inventory import InventoryConfig
+
+    return InventoryConfig(
+        lead_time_days=args.lead_time,
+        lead_time_spread_days=args.lead_time_spread,
+        service_level=args.service_level,
+        simulation_runs=getattr(args, "sim_runs", 300),
+        sim_engine=getattr(args, "sim_engine", "vectorized"),
+        sim_batch_runs=getattr(args, "sim_batch_runs", 1000),
+        sim_memory_mb=getattr(args, "sim_memory_mb", 256.0),
+    )
+
+
+def _cmd_ingest(args: argparse.Namespace) -> None:
+    from src.io import read_table, write_table, artifact_path
+    from src.clean import clean_transactions, CleanConfig
+    from src.aggregate import make_daily_item_series, AggregateConfig
+    from src.ingest import stream_daily_item_series, stream_daily_state, StreamConfig
+
+    ccfg = CleanConfig(drop_items=("unknown", "error"))
+    acfg = AggregateConfig(fill_missing_days=True)
+    scfg = StreamConfig(chunksize=args.chunksize, distinct=args.distinct)
+    if args.incremental_store:
+        daily, _, n = stream_daily_state(args.input, args.incremental_store, ccfg, acfg, scfg)
+    elif args.stream:
+        daily, n = stream_daily_item_series(args.input, ccfg, acfg, scfg)
+    else:
+        txn = clean_transactions(read_table(args.input, parse_dates=()), ccfg)
+        n = len(txn)
+        daily = make_daily_item_series(txn, acfg)
+    Path(args.out).mkdir(parents=True, exist_ok=True)
+    write_table(daily, artifact_path(args.out, "daily_item_demand", args.format))
+    print(f"Transactions used: {n}; daily rows: {len(daily)}", flush=True)
+
+
+def _cmd_forecast(args: argparse.Namespace) -> None:
+    from src.io import write_table, artifact_path
+    from src.forecast import run_forecasting
+
+    daily = _load(args.out, "daily_item_demand", "ingest")
+    backtest, selection, forecast_next = run_forecasting(daily, forecast_config(args), executor=_executor(args))
+    for stem, df in (("backtest_scores", backtest), ("item_model_selection", selection), ("forecast_next_30d", forecast_next)):
+        write_table(df, artifact_path(args.out, stem, args.format))
+    print(f"Forecasts: {forecast_next['item'].nunique()} items x {args.horizon} days", flush=True)
+
+
+def _demand_paths(args: argparse.Namespace, daily: pd.DataFrame, forecast_next: pd.DataFrame, icfg: InventoryConfig) -> Optional[DemandPaths]:
+    if args.demand_model != "bootstrap":
+        return None
+    from src.bootstrap import demand_paths, BootstrapConfig
+
+    selection = _load(args.out, "item_model_selection", "forecast")
+    fcfg = forecast_config(args)
+    bcfg = BootstrapConfig(block_days=args.bootstrap_block, memory_mb=args.bootstrap_memory_mb, random_seed=icfg.random_seed)
+    return demand_paths(daily, selection, forecast_next, fcfg, icfg.simulation_runs, bcfg, icfg.demand_sigma_floor)
+
+
+def _cmd_policy(args: argparse.Namespace) -> None:
+    from src.io import write_table, artifact_path
+    from src.bootstrap import with_residual_sigma
+    from src.inventory import demand_stats, rop_policy, load_lead_times
+
+    daily = _load(args.out, "daily_item_demand", "ingest")
+    forecast_next = _load(args.out, "forecast_next_30d", "forecast")
+    lead_times = load_lead_times(args.lead_times_csv) if args.lead_times_csv else None
+    icfg = inventory_config(args)
+    stats = demand_stats(daily, forecast_next, icfg)
+    paths = _demand_paths(args, daily, forecast_next, icfg)
+    if paths is not None:
+        stats = with_residual_sigma(stats, paths, icfg.demand_sigma_floor)
+    policy = rop_policy(stats, icfg, lead_times=lead_times)
+    write_table(policy, artifact_path(args.out, "reorder_policy", args.format))
+    print(f"Reorder policy: {len(policy)} items", flush=True)
+
+
+def _cmd_simulate(args: argparse.Namespace) -> None:
+    from src.io import write_table, artifact_path
+    from src.inventory import simulate_policy, load_lead_times
+
+    forecast_next = _load(args.out, "forecast_next_30d", "forecast")
+    policy = _load(args.out, "reorder_policy", "policy")
+    lead_times = load_lead_times(args.lead_times_csv) if args.lead_times_csv else None
+    icfg = inventory_config(args)
+    paths = _demand_paths(args, _load(args.out, "daily_item_demand", "ingest"), forecast_next, icfg) if args.demand_model == "bootstrap" else None
+    demand = paths.for_items(policy["item"].astype(str).drop_duplicates().sort_values()) if paths is not None else None
+    fill_rates: List[pd.DataFrame] = []
+    sim = simulate_policy(forecast_next, policy, icfg, executor=_executor(args), demand=demand, lead_times=lead_times, fill_rates=fill_rates)
+    write_table(sim, artifact_path(args.out, "simulation_summary", args.format))
+    write_table(fill_rates[0], artifact_path(args.out, "fill_rate_daily", args.format))
+    print(f"Simulation summary: {len(sim)} items", flush=True)
+
+
+def _cmd_report(args: argparse.Namespace) -> None:
+    status = start_figures(
+        _load(args.out, "daily_item_demand", "ingest"),
+        _load(args.out, "backtest_scores", "forecast"),
+        _load(args.out, "forecast_next_30d", "forecast"),
+        _load(args.out, "reorder_policy", "policy"),
+        Path(args.figures),
+        args.figure_workers,
+        args.item_charts,
+    ).wait()
+    rendered = sum(v == "rendered" for v in status.values())
+    print(f"Figures folder: {args.figures} ({rendered} rendered, {len(status) - rendered} unchanged)", flush=True)
+
+
+# Argument groups shared by the pipeline subcommands and the other entry points (src.multistore).
+def add_ingest_args(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--input", required=True, help="Path to input CSV / Parquet / Feather (cafe sales)")
+    parser.add_argument("--stream", action="store_true", help="Ingest the input (CSV / Parquet / Feather) in chunks (for files larger than memory)")
+    parser.add_argument("--chunksize", type=int, default=1_000_000, help="Rows per chunk with --stream or --incremental-store")
+    parser.add_argument("--distinct", choices=["exact", "hll"], default="exact", help="txn_count with --stream or --incremental-store: exact (memory grows with distinct transactions) or HyperLogLog estimate (bounded)")
+    parser.add_argument("--incremental-store", default=None, help="Directory of the persisted daily aggregate store (append-only feeds)")
+
+
+def add_forecast_args(parser: argparse.ArgumentParser) -> None:
     parser.add_argument("--horizon", type=int, default=30, help="Forecast horizon (days)")
     parser.add_argument("--backtest", type=int, default=28, help="Backtest window (days)")
+    parser.add_argument("--backtest-mode", choices=["per_item", "batched"], default="per_item", help="Backtest items one by one or as one items x days matrix")
+    parser.add_argument("--backtest-folds", type=int, default=1, help="Rolling-origin folds (1 = single train/test split)")
+    parser.add_argument("--backtest-step", type=int, default=7, help="Days between rolling origins")
+    parser.add_argument("--ewma-alphas", default="", help="Comma-separated EWMA alpha grid tuned per item (e.g. 0.1,0.3,0.5)")
+    parser.add_argument("--intermittent-adi", type=float, default=1.32, help="Items with ADI >= this also try Croston / SBA / TSB (inf = off)")
+    parser.add_argument("--cost-penalty", type=float, default=0.0, help="Model selection adds this many MAE units per unit of declared model cost (moving average = 1)")
+
+
+def add_policy_args(parser: argparse.ArgumentParser) -> None:
     parser.add_argument("--lead-time", type=int, default=3, help="Lead time (days)")
+    parser.add_argument("--lead-time-spread", type=int, default=0, help="Stochastic lead time: uniform on lead time +/- this many days")
+    parser.add_argument("--lead-times-csv", default=None, help="Per-item supplier lead times (item, lead_time_days[, probability] or lead_time_min_days/lead_time_max_days)")
     parser.add_argument("--service-level", type=float, default=0.95, help="Service level (0-1)")
+    parser.add_argument("--demand-model", choices=["normal", "bootstrap"], default="normal", help="Demand uncertainty: normal around the forecast, or block-bootstrapped backtest residuals")
+    parser.add_argument("--bootstrap-block", type=int, default=7, help="Block length (days) of the residual bootstrap")
+    parser.add_argument("--bootstrap-memory-mb", type=float, default=256.0, help="Memory budget of the bootstrap paths (caps paths per item)")
+
+
+def add_simulate_args(parser: argparse.ArgumentParser) -> None:
     parser.add_argument("--sim-runs", type=int, default=300, help="Simulation runs per item")
-    args = parser.parse_args()
+    parser.add_argument("--sim-engine", choices=["vectorized", "loop"], default="vectorized", help="Simulation engine (loop = reference implementation)")
+    parser.add_argument("--sim-batch-runs", type=int, default=1000, help="Runs simulated per batch; results stream into per-item accumulators, so memory does not grow with --sim-runs")
+    parser.add_argument("--sim-memory-mb", type=float, default=256.0, help="Memory budget of one simulated block of items")
+
+
+def add_executor_args(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--backend", choices=["serial", "threads", "processes"], default="serial", help="Execution backend for forecasting + simulation")
+    parser.add_argument("--workers", type=int, default=1, help="Worker count for the threads/processes backends")
+
+
+def add_figure_args(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--figures", default="reports/figures", help="Figures directory")
+    parser.add_argument("--figure-workers", type=int, default=0, help="Processes rendering figures (0 = auto: in-process unless there are many, e.g. item pages; 1 = in-process)")
+    parser.add_argument("--item-charts", type=int, default=0, help="Per-item chart pages for the top N items by revenue (-1 = all)")
+
+
+def add_output_args(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--out", default="outputs", help="Output directory")
+    parser.add_argument("--format", choices=["csv", "parquet", "feather"], default="csv", help="Output table format")
+
+
+def _step_parser(step: str) -> argparse.ArgumentParser:
+    """One pipeline step; it reads its inputs from, and writes its artifacts to, --out."""
+    parser = argparse.ArgumentParser(prog=f"python -m src.pipeline {step}", description=f"Run the {step} step on its own")
+    add_output_args(parser)
+    if step == "ingest":
+        add_ingest_args(parser)
+    elif step == "forecast":
+        add_forecast_args(parser)
+        add_executor_args(parser)
+    elif step == "policy":
+        add_policy_args(parser)
+        add_forecast_args(parser)  # --demand-model bootstrap re-runs the backtest for its residuals
+    elif step == "simulate":
+        add_policy_args(parser)
+        add_forecast_args(parser)
+        add_simulate_args(parser)
+        add_executor_args(parser)
+    else:
+        add_figure_args(parser)
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if argv and argv[0] in STEPS:
+        step = argv[0]
+        args = _step_parser(step).parse_args(argv[1:])
+        {
+            "ingest": _cmd_ingest,
+            "forecast": _cmd_forecast,
+            "policy": _cmd_policy,
+            "simulate": _cmd_simulate,
+            "report": _cmd_report,
+        }[step](args)
+        return
+
+    parser = argparse.ArgumentParser(
+        description="Café demand forecasting + reorder simulation pipeline",
+        epilog=f"Steps can also run one at a time: python -m src.pipeline {{{','.join(STEPS)}}} --help",
+    )
+    add_ingest_args(parser)
+    add_output_args(parser)
+    add_figure_args(parser)
+    parser.add_argument("--no-figures", action="store_true", help="Skip figures (matplotlib is then never imported)")
+    add_forecast_args(parser)
+    add_policy_args(parser)
+    add_simulate_args(parser)
+    add_executor_args(parser)
+    parser.add_argument("--cache-dir", default=None, help="Stage cache directory (reuse unchanged ingest/forecast/policy results)")
+    parser.add_argument("--cache-max-entries", type=int, default=32, help="Cached stage results kept (LRU)")
+    parser.add_argument("--profile", nargs="?", const="all", default="", help="Dump cProfile stats to <out>/profile/ for these stages (comma-separated; default all)")
+    parser.add_argument("--trace-memory", action="store_true", help="Record tracemalloc peaks per stage")
+    parser.add_argument("--trace", default=None, help="Write a stage trace: .json (Chrome trace) or .jsonl")
+    args = parser.parse_args(argv)
 
     res = run(
         input_path=args.input,
@@ -97,13 +655,43 @@ def main() -> None:
         horizon_days=args.horizon,
         backtest_days=args.backtest,
         lead_time_days=args.lead_time,
+        lead_time_spread_days=args.lead_time_spread,
+        lead_times_path=args.lead_times_csv,
         service_level=args.service_level,
         simulation_runs=args.sim_runs,
+        sim_engine=args.sim_engine,
+        sim_batch_runs=args.sim_batch_runs,
+        sim_memory_mb=args.sim_memory_mb,
+        demand_model=args.demand_model,
+        bootstrap_block_days=args.bootstrap_block,
+        bootstrap_memory_mb=args.bootstrap_memory_mb,
+        backtest_mode=args.backtest_mode,
+        backtest_folds=args.backtest_folds,
+        backtest_step=args.backtest_step,
+        ewma_alpha_grid=forecast_config(args).ewma_alpha_grid,
+        intermittent_adi=args.intermittent_adi,
+        cost_penalty=args.cost_penalty,
+        backend=args.backend,
+        workers=args.workers,
+        output_format=args.format,
+        stream=args.stream,
+        chunksize=args.chunksize,
+        distinct=args.distinct,
+        incremental_dir=args.incremental_store,
+        cache_dir=args.cache_dir,
+        cache_max_entries=args.cache_max_entries,
+        profile=tuple(p.strip() for p in args.profile.split(",") if p.strip()),
+        trace_memory=args.trace_memory,
+        trace_path=args.trace,
+        figures=not args.no_figures,
+        figure_workers=args.figure_workers,
+        item_charts=args.item_charts,
     )
 
     print("\nDone! Forecasts + inventory policy created.", flush=True)
     print(f"Outputs folder: {res['out_dir']}", flush=True)
-    print(f"Figures folder: {res['figures_dir']}", flush=True)
+    if res["figures"]:
+        print(f"Figures folder: {res['figures_dir']}", flush=True)
     print(f"Transactions used: {res['n_txn_rows']}", flush=True)
     print(f"Days covered: {res['n_days']}", flush=True)
     print(f"Items: {res['n_items']}\n", flush=True)
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence
+import cProfile
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def _max_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+@dataclass
+class StageRecord:
+    name: str
+    start_s: float = 0.0  # seconds since the profiler was created
+    wall_s: float = 0.0
+    cpu_s: float = 0.0
+    process_max_rss_mb: Optional[float] = None  # process-wide RSS high-water mark (ru_maxrss) at the end of the stage
+    max_rss_growth_mb: Optional[float] = None  # how far the stage raised that mark (0 if it stayed below an earlier peak)
+    peak_traced_mb: Optional[float] = None  # tracemalloc peak within the stage (trace_memory=True)
+    rows_in: Optional[int] = None
+    rows_out: Optional[int] = None
+
+
+class Profiler:
+    """
+    Per-stage wall time, CPU time, memory and row counts for pipeline.run.
+
+    trace_memory turns on tracemalloc (Python-level allocations, with some overhead); close()
+    stops it again if the profiler started it.
+    cprofile_stages lists stages (or "all") whose cProfile stats are dumped to cprofile_dir.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        trace_memory: bool = False,
+        cprofile_dir: Optional[str | Path] = None,
+        cprofile_stages: Sequence[str] = (),
+    ):
+        self.enabled = enabled
+        self.trace_memory = trace_memory
+        self.cprofile_dir = Path(cprofile_dir) if cprofile_dir else None
+        self.cprofile_stages = set(cprofile_stages)
+        self.stages: List[StageRecord] = []
+        self.item_timings: Dict[str, List[float]] = {}
+        self._t0 = time.perf_counter()
+        self._started_tracing = False
+
+    @contextmanager
+    def stage(self, name: str, rows_in: Optional[int] = None) -> Iterator[StageRecord]:
+        rec = StageRecord(name=name, rows_in=rows_in)
+        if not self.enabled:
+            yield rec
+            return
+
+        prof = None
+        if self.cprofile_dir is not None and ({"all", name} & self.cprofile_stages):
+            prof = cProfile.Profile()
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracing = True
+            tracemalloc.reset_peak()
+
+        rec.start_s = time.perf_counter() - self._t0
+        rss0 = _max_rss_mb()
+        wall0, cpu0 = time.perf_counter(), time.process_time()
+        if prof is not None:
+            prof.enable()
+        try:
+            yield rec
+        finally:
+            if prof is not None:
+                prof.disable()
+                self.cprofile_dir.mkdir(parents=True, exist_ok=True)
+                prof.dump_stats(str(self.cprofile_dir / f"{name}.prof"))
+            rec.wall_s = time.perf_counter() - wall0
+            rec.cpu_s = time.process_time() - cpu0
+            rec.process_max_rss_mb = _max_rss_mb()
+            if rss0 is not None:
+                rec.max_rss_growth_mb = rec.process_max_rss_mb - rss0
+            if self.trace_memory:
+                rec.peak_traced_mb = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+            self.stages.append(rec)
+
+    def close(self) -> None:
+        """Stop tracemalloc if this profiler started it."""
+        if self._started_tracing and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self._started_tracing = False
+
+    def record_items(self, name: str, seconds: Sequence[float]) -> None:
+        if self.enabled and len(seconds):
+            self.item_timings.setdefault(name, []).extend(float(s) for s in seconds)
+
+    def summary(self) -> dict:
+        items = {}
+        for name, secs in self.item_timings.items():
+            a = np.asarray(secs)
+            items[name] = {
+                "n_items": int(len(a)),
+                "total_s": float(a.sum()),
+                "p50_ms": float(np.percentile(a, 50) * 1e3),
+                "p90_ms": float(np.percentile(a, 90) * 1e3),
+                "p99_ms": float(np.percentile(a, 99) * 1e3),
+                "max_ms": float(a.max() * 1e3),
+            }
+        return {"stages": [asdict(r) for r in self.stages], "item_timings": items}
+
+    def write_trace(self, path: str | Path) -> None:
+        """Chrome trace (.json, open in chrome://tracing or Perfetto) or JSON lines (.jsonl)."""
+        p = Path(path)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        if p.suffix.lower() == ".jsonl":
+            p.write_text("".join(json.dumps(asdict(r)) + "\n" for r in self.stages), encoding="utf-8")
+            return
+        pid = os.getpid()
+        events = [{
+            "name": r.name,
+            "ph": "X",
+            "ts": r.start_s * 1e6,
+            "dur": r.wall_s * 1e6,
+            "pid": pid,
+            "tid": 0,
+            "args": {k: v for k, v in asdict(r).items() if k not in ("name", "start_s", "wall_s")},
+        } for r in self.stages]
+        p.write_text(json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}), encoding="utf-8")
@@ -1,69 +1,262 @@
 from __future__ import annotations
 
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
-import matplotlib.pyplot as plt
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import hashlib
+import json
+import multiprocessing
+import os
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 import pandas as pd
 
+from src.forecast import overall_scores
+
+# Figures are drawn with the object-oriented API (no pyplot global state), so every
+# fig_* function is safe to call from worker processes or threads.
+DPI = 160
+ITEMS_PER_PAGE = 12
+ITEMS_DIR = "items"
+MANIFEST = ".figures.json"
+
+
+def _new_figure(figsize: Optional[Tuple[float, float]] = None) -> Tuple[Figure, Any]:
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig, fig.add_subplot()
+
+
+def _save(fig: Figure, out_path: Path) -> None:
+    fig.tight_layout()
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    fig.savefig(out_path, dpi=DPI)
+
 
 def fig_item_revenue_ranking(daily: pd.DataFrame, out_path: Path) -> None:
     rev = daily.groupby("item", observed=False)["revenue"].sum().sort_values(ascending=False)
-    plt.figure()
-    rev.plot(kind="bar")
-    plt.title("Total revenue by item")
-    plt.xlabel("Item")
-    plt.ylabel("Revenue (sum of Total Spent)")
-    plt.tight_layout()
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-    plt.savefig(out_path, dpi=160)
-    plt.close()
+    fig, ax = _new_figure()
+    ax.bar(rev.index.astype(str), rev.to_numpy())
+    ax.tick_params(axis="x", labelrotation=90)
+    ax.set_title("Total revenue by item")
+    ax.set_xlabel("Item")
+    ax.set_ylabel("Revenue (sum of Total Spent)")
+    _save(fig, out_path)
 
 
 def fig_backtest_summary(backtest: pd.DataFrame, out_path: Path) -> None:
     if backtest.empty:
         return
-    s = backtest.groupby("model", observed=False)["mae"].mean().sort_values()
-    plt.figure()
-    s.plot(kind="bar")
-    plt.title("Backtest: average MAE by model (lower is better)")
-    plt.xlabel("Model")
-    plt.ylabel("Average MAE")
-    plt.tight_layout()
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-    plt.savefig(out_path, dpi=160)
-    plt.close()
+    s = overall_scores(backtest).groupby("model", observed=False)["mae"].mean().sort_values()
+    fig, ax = _new_figure()
+    ax.bar(s.index.astype(str), s.to_numpy())
+    ax.tick_params(axis="x", labelrotation=90)
+    ax.set_title("Backtest: average MAE by model (lower is better)")
+    ax.set_xlabel("Model")
+    ax.set_ylabel("Average MAE")
+    _save(fig, out_path)
+
+
+def _by_item(df: pd.DataFrame, items: Sequence[str]) -> Dict[str, pd.DataFrame]:
+    """Rows of each requested item, date-sorted, from one pass over df."""
+    sub = df[df["item"].astype(str).isin(items)]
+    sub = sub.assign(item=sub["item"].astype(str)).sort_values(["item", "date"], kind="stable")
+    return {str(item): g for item, g in sub.groupby("item", sort=False)}
 
 
 def fig_forecast_examples(daily: pd.DataFrame, forecast_next: pd.DataFrame, out_path: Path, top_n: int = 4) -> None:
     rev = daily.groupby("item", observed=False)["revenue"].sum().sort_values(ascending=False)
-    items = rev.head(top_n).index.tolist()
+    items = [str(i) for i in rev.head(top_n).index]
+    hist_by_item = _by_item(daily, items)
+    fc_by_item = _by_item(forecast_next, items)
+    empty = pd.DataFrame({"date": [], "demand_qty": [], "forecast_qty": []})
 
-    plt.figure(figsize=(10, 6))
+    fig, ax = _new_figure(figsize=(10, 6))
     for item in items:
-        hist = daily[daily["item"] == item].sort_values("date")
-        fc = forecast_next[forecast_next["item"] == item].sort_values("date")
-        plt.plot(hist["date"], hist["demand_qty"], label=f"{item} (history)")
-        plt.plot(fc["date"], fc["forecast_qty"], linestyle="--", label=f"{item} (forecast)")
-
-    plt.title("Forecast examples (top revenue items)")
-    plt.xlabel("Date")
-    plt.ylabel("Daily demand (quantity)")
-    plt.xticks(rotation=25)
-    plt.tight_layout()
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-    plt.savefig(out_path, dpi=160)
-    plt.close()
+        hist = hist_by_item.get(item, empty)
+        fc = fc_by_item.get(item, empty)
+        ax.plot(hist["date"], hist["demand_qty"], label=f"{item} (history)")
+        ax.plot(fc["date"], fc["forecast_qty"], linestyle="--", label=f"{item} (forecast)")
+
+    ax.set_title("Forecast examples (top revenue items)")
+    ax.set_xlabel("Date")
+    ax.set_ylabel("Daily demand (quantity)")
+    ax.tick_params(axis="x", labelrotation=25)
+    _save(fig, out_path)
 
 
 def fig_rop_vs_demand(policy: pd.DataFrame, out_path: Path) -> None:
     p = policy.sort_values("mu_daily_demand", ascending=False).head(15)
-    plt.figure(figsize=(10, 5))
-    plt.scatter(p["mu_daily_demand"], p["reorder_point_units"], s=45, alpha=0.8)
-    for _, r in p.iterrows():
-        plt.text(r["mu_daily_demand"], r["reorder_point_units"], str(r["item"]), fontsize=8)
-    plt.title("Reorder point (ROP) vs mean daily demand (top items)")
-    plt.xlabel("Mean daily demand (units)")
-    plt.ylabel("Reorder point (units)")
-    plt.tight_layout()
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-    plt.savefig(out_path, dpi=160)
-    plt.close()
+    fig, ax = _new_figure(figsize=(10, 5))
+    ax.scatter(p["mu_daily_demand"], p["reorder_point_units"], s=45, alpha=0.8)
+    for x, y, item in zip(p["mu_daily_demand"], p["reorder_point_units"], p["item"].astype(str)):
+        ax.text(x, y, item, fontsize=8)
+    ax.set_title("Reorder point (ROP) vs mean daily demand (top items)")
+    ax.set_xlabel("Mean daily demand (units)")
+    ax.set_ylabel("Reorder point (units)")
+    _save(fig, out_path)
+
+
+def fig_item_page(daily: pd.DataFrame, forecast_next: pd.DataFrame, out_path: Path, history_days: int = 90) -> None:
+    """Small multiples, one panel per item in daily (in order of appearance): recent history plus the forecast."""
+    items = list(dict.fromkeys(daily["item"].astype(str)))
+    hist_by_item = _by_item(daily, items)
+    fc_by_item = _by_item(forecast_next, items)
+    cols = 3
+    rows = max(1, -(-len(items) // cols))
+
+    fig = Figure(figsize=(12, 2.6 * rows))
+    FigureCanvasAgg(fig)
+    axes = fig.subplots(rows, cols, squeeze=False)
+    for ax, item in zip(axes.ravel(), items):
+        hist = hist_by_item[item].tail(history_days)
+        ax.plot(hist["date"], hist["demand_qty"], linewidth=1)
+        if item in fc_by_item:
+            fc = fc_by_item[item]
+            ax.plot(fc["date"], fc["forecast_qty"], linestyle="--", linewidth=1)
+        ax.set_title(item, fontsize=9)
+        ax.tick_params(labelsize=7)
+        ax.tick_params(axis="x", labelrotation=25)
+    for ax in axes.ravel()[len(items):]:
+        ax.set_visible(False)
+    _save(fig, out_path)
+
+
+@dataclass
+class FigureJob:
+    filename: str
+    fn: Callable[..., None]  # module-level, so jobs can be pickled to worker processes
+    frames: Tuple[pd.DataFrame, ...]
+    kwargs: Dict[str, Any] = field(default_factory=dict)
+
+    def digest(self) -> str:
+        """Hash of everything the figure depends on."""
+        h = hashlib.sha256(f"{self.fn.__module__}.{self.fn.__qualname__}:{json.dumps(self.kwargs, sort_keys=True)}".encode("utf-8"))
+        for df in self.frames:
+            h.update(",".join(map(str, df.columns)).encode("utf-8"))
+            h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+        return h.hexdigest()
+
+
+def figure_jobs(
+    daily: pd.DataFrame,
+    backtest: pd.DataFrame,
+    forecast_next: pd.DataFrame,
+    policy: pd.DataFrame,
+    item_charts: int = 0,
+) -> List[FigureJob]:
+    """
+    The report figures, plus per-item pages (ITEMS_PER_PAGE panels each) for the top
+    item_charts items by revenue (-1 = every item). Each page only carries its own items' rows.
+    """
+    jobs = [
+        FigureJob("item_revenue_ranking.png", fig_item_revenue_ranking, (daily[["item", "revenue"]],)),
+        FigureJob("backtest_summary.png", fig_backtest_summary, (backtest,)),
+        FigureJob("forecast_examples.png", fig_forecast_examples, (daily, forecast_next), {"top_n": 4}),
+        FigureJob("rop_vs_demand.png", fig_rop_vs_demand, (policy,)),
+    ]
+    if item_charts:
+        rev = daily.groupby("item", observed=True)["revenue"].sum().sort_values(ascending=False)
+        items = [str(i) for i in (rev.index if item_charts < 0 else rev.index[:item_charts])]
+        hist_by_item = _by_item(daily[["item", "date", "demand_qty"]], items)
+        fc_by_item = _by_item(forecast_next[["item", "date", "forecast_qty"]], items)
+        for page, lo in enumerate(range(0, len(items), ITEMS_PER_PAGE), start=1):
+            chunk = items[lo:lo + ITEMS_PER_PAGE]
+            jobs.append(FigureJob(
+                f"{ITEMS_DIR}/items_{page:03d}.png",
+                fig_item_page,
+                (
+                    pd.concat([hist_by_item[i] for i in chunk if i in hist_by_item]),
+                    pd.concat([fc_by_item[i] for i in chunk if i in fc_by_item] or [forecast_next.iloc[:0]]),
+                ),
+            ))
+    return jobs
+
+
+def _render(job: FigureJob, out_path: Path) -> None:
+    job.fn(*job.frames, out_path, **job.kwargs)
+
+
+# With workers=0 (auto), a pool is started only for at least this many figures to draw:
+# spawning workers, each importing matplotlib, takes longer than drawing the report figures.
+POOL_MIN_JOBS = 8
+
+
+class FigureRenderer:
+    """
+    Renders FigureJobs into fig_dir. With a process pool (workers > 1, or workers=0 and at
+    least POOL_MIN_JOBS figures to draw, e.g. per-item pages) submit() queues the jobs and
+    returns at once; otherwise it draws them in-process. wait() blocks until they are written.
+    Jobs whose input digest matches the manifest of the previous render, and whose file still
+    exists, are skipped. Per-item pages that the latest jobs no longer produce (fewer items or
+    item_charts) are deleted, with their manifest entries, by wait().
+
+    Workers are spawned, not forked, so a renderer can be started from a threaded host (e.g.
+    the dashboard) without copying its threads' locks or matplotlib state into the children.
+    """
+
+    def __init__(self, fig_dir: str | Path, workers: int = 0):
+        self.fig_dir = Path(fig_dir)
+        self.fig_dir.mkdir(parents=True, exist_ok=True)
+        self.workers = int(workers)  # 0 = auto, per submit()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pending: Dict[str, Tuple[str, Optional[Future]]] = {}
+        self._status: Dict[str, str] = {}
+        self._submitted: set = set()
+        try:
+            self._manifest = json.loads((self.fig_dir / MANIFEST).read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            self._manifest = {}
+
+    def submit(self, jobs: Sequence[FigureJob]) -> None:
+        todo = []
+        for job in jobs:
+            digest = job.digest()
+            out_path = self.fig_dir / job.filename
+            self._submitted.add(job.filename)
+            if self._manifest.get(job.filename) == digest and out_path.exists():
+                self._status[job.filename] = "unchanged"
+            else:
+                todo.append((job, digest, out_path))
+
+        workers = self.workers
+        if workers <= 0:
+            workers = min(4, os.cpu_count() or 1) if len(todo) >= POOL_MIN_JOBS else 1
+        for job, digest, out_path in todo:
+            if workers > 1:
+                if self._pool is None:
+                    self._pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+                self._pending[job.filename] = (digest, self._pool.submit(_render, job, out_path))
+            else:
+                _render(job, out_path)
+                self._pending[job.filename] = (digest, None)
+
+    def wait(self) -> Dict[str, str]:
+        """Block until every submitted figure is written; returns filename -> rendered / unchanged."""
+        try:
+            for filename, (digest, fut) in self._pending.items():
+                if fut is not None:
+                    fut.result()
+                self._manifest[filename] = digest
+                self._status[filename] = "rendered"
+        finally:
+            self._pending = {}
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+            self._prune_item_pages()
+            (self.fig_dir / MANIFEST).write_text(json.dumps(self._manifest, indent=2, sort_keys=True), encoding="utf-8")
+        return dict(self._status)
+
+    def _prune_item_pages(self) -> None:
+        """Delete per-item pages (files and manifest entries) not among the submitted jobs."""
+        stale = {f for f in self._manifest if f.startswith(f"{ITEMS_DIR}/")}
+        items_dir = self.fig_dir / ITEMS_DIR
+        if items_dir.exists():
+            stale |= {f"{ITEMS_DIR}/{p.name}" for p in items_dir.glob("*.png")}
+        for filename in stale - self._submitted:
+            (self.fig_dir / filename).unlink(missing_ok=True)
+            self._manifest.pop(filename, None)
+        self._submitted = set()
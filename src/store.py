@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Dict, Sequence
+import numpy as np
+import pandas as pd
+
+
+@dataclass
+class SeriesStore:
+    """
+    Long (date, item) frame partitioned once into contiguous per-item arrays.
+    Rows for item i live in [offsets[i], offsets[i + 1]) and are sorted by date,
+    so per-item access is an O(1) slice instead of a boolean mask over the frame.
+    """
+    items: np.ndarray
+    offsets: np.ndarray
+    dates: np.ndarray
+    columns: Dict[str, np.ndarray]
+    positions: Dict[str, int] = field(default_factory=dict)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, value_cols: Sequence[str], item_col: str = "item", date_col: str = "date") -> "SeriesStore":
+        codes, uniques = pd.factorize(df[item_col].astype(str), sort=True)
+        dates = pd.to_datetime(df[date_col]).to_numpy()
+        order = np.lexsort((dates, codes))
+        counts = np.bincount(codes, minlength=len(uniques))
+        offsets = np.concatenate([[0], np.cumsum(counts)])
+
+        items = np.asarray(uniques, dtype=object)
+        columns = {c: df[c].to_numpy(dtype=float)[order] for c in value_cols}
+        return cls(
+            items=items,
+            offsets=offsets,
+            dates=dates[order],
+            columns=columns,
+            positions={str(it): i for i, it in enumerate(items)},
+        )
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def __contains__(self, item: str) -> bool:
+        return item in self.positions
+
+    def span(self, i: int) -> slice:
+        return slice(int(self.offsets[i]), int(self.offsets[i + 1]))
+
+    def values(self, col: str, i: int) -> np.ndarray:
+        return self.columns[col][self.span(i)]
+
+    def item_dates(self, i: int) -> np.ndarray:
+        return self.dates[self.span(i)]
+
+    def series(self, col: str, i: int) -> pd.Series:
+        sl = self.span(i)
+        return pd.Series(self.columns[col][sl], index=pd.DatetimeIndex(self.dates[sl]))
+
+    def get(self, item: str, col: str) -> np.ndarray:
+        i = self.positions.get(item)
+        if i is None:
+            return np.empty(0, dtype=float)
+        return self.values(col, i)
+
+    def frame(self, item: str) -> pd.DataFrame:
+        """One item's rows as a date-sorted frame (date + value columns); empty if the item is unknown."""
+        i = self.positions.get(item)
+        sl = self.span(i) if i is not None else slice(0, 0)
+        return pd.DataFrame({"date": self.dates[sl], **{c: v[sl] for c, v in self.columns.items()}})
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import argparse
+from dataclasses import replace
+from typing import List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from src.io import read_table, write_table
+from src.clean import clean_transactions, CleanConfig
+from src.aggregate import make_daily_item_series, AggregateConfig
+from src.store import SeriesStore
+from src.forecast import run_forecasting, ForecastConfig
+from src.inventory import demand_stats, rop_policy, simulate_policy, draw_demand, InventoryConfig
+from src.bootstrap import demand_paths, with_residual_sigma, DemandPaths
+
+
+def run_sweep(
+    daily: pd.DataFrame,
+    forecast_next: pd.DataFrame,
+    lead_times: Sequence[int],
+    service_levels: Sequence[float],
+    cfg: InventoryConfig = InventoryConfig(),
+    store: Optional[SeriesStore] = None,
+    initial_inventory_units: float = 0.0,
+    paths: Optional[DemandPaths] = None,
+) -> pd.DataFrame:
+    """
+    ROP policy + simulated stockout risk for every (lead time, service level) pair, from one
+    set of forecasts. Demand is drawn once and shared by all scenarios (common random numbers):
+    it only depends on the forecast mu/sigma, and differences between scenarios then reflect
+    the policy rather than sampling noise. With bootstrap paths (see src.bootstrap), sigma comes
+    from the backtest residuals and the paths are that shared draw.
+    Returns one tidy row per scenario x item.
+    """
+    if store is None:
+        store = SeriesStore.from_frame(daily, ["demand_qty"])
+    horizon = int(pd.to_datetime(forecast_next["date"]).nunique())
+    stats = demand_stats(daily, forecast_next, cfg, store=store)  # mu / sigma do not depend on the scenario
+    if paths is not None:
+        stats = with_residual_sigma(stats, paths, cfg.demand_sigma_floor)
+
+    demand = None
+    frames: List[pd.DataFrame] = []
+    scenario = 0
+    for L in lead_times:
+        for sl in service_levels:
+            scfg = replace(cfg, lead_time_days=int(L), service_level=float(sl), sim_engine="vectorized")
+            policy = rop_policy(stats, scfg)
+            if demand is None:
+                sorted_items = policy.sort_values("item")
+                demand = paths.for_items(sorted_items["item"]) if paths is not None else draw_demand(sorted_items, horizon, scfg)
+            sim = simulate_policy(forecast_next, policy, scfg, initial_inventory_units, demand=demand)
+
+            out = policy.merge(sim.drop(columns=["horizon_days"]), on="item", how="left")
+            out.insert(0, "scenario", scenario)
+            frames.append(out)
+            scenario += 1
+
+    if not frames:
+        return pd.DataFrame()
+    table = pd.concat(frames, ignore_index=True)
+    return table.sort_values(["scenario", "item"]).reset_index(drop=True)
+
+
+def _parse_ints(spec: str) -> List[int]:
+    """"1-14" or "1,3,7"."""
+    out: List[int] = []
+    for part in spec.split(","):
+        part = part.strip()
+        if "-" in part:
+            lo, hi = part.split("-", 1)
+            out.extend(range(int(lo), int(hi) + 1))
+        elif part:
+            out.append(int(part))
+    return out
+
+
+def _parse_floats(spec: str) -> List[float]:
+    """"0.80:0.99:0.01" (inclusive) or "0.9,0.95,0.99"."""
+    if ":" in spec:
+        lo, hi, step = (float(x) for x in spec.split(":"))
+        return [round(float(v), 6) for v in np.arange(lo, hi + step / 2, step)]
+    return [float(x) for x in spec.split(",") if x.strip()]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Lead time x service level sweep (forecast once, simulate every scenario)")
+    parser.add_argument("--input", required=True, help="Path to input CSV / Parquet / Feather (cafe sales)")
+    parser.add_argument("--out", default="outputs/sweep.csv", help="Output table (.csv / .parquet / .feather)")
+    parser.add_argument("--lead-times", default="1-14", help='Lead times, e.g. "1-14" or "1,3,7"')
+    parser.add_argument("--service-levels", default="0.80:0.99:0.01", help='Service levels, e.g. "0.80:0.99:0.01" or "0.9,0.95"')
+    parser.add_argument("--horizon", type=int, default=30, help="Forecast horizon (days)")
+    parser.add_argument("--backtest", type=int, default=28, help="Backtest window (days)")
+    parser.add_argument("--sim-runs", type=int, default=300, help="Simulation runs per item")
+    parser.add_argument("--demand-model", choices=["normal", "bootstrap"], default="normal", help="Demand uncertainty: normal around the forecast, or block-bootstrapped backtest residuals")
+    args = parser.parse_args()
+
+    txn = clean_transactions(read_table(args.input, parse_dates=()), CleanConfig(drop_items=("unknown", "error")))
+    daily = make_daily_item_series(txn, AggregateConfig(fill_missing_days=True))
+    store = SeriesStore.from_frame(daily, ["demand_qty"])
+    fcfg = ForecastConfig(horizon_days=args.horizon, backtest_days=args.backtest, backtest_mode="batched")
+    _, selection, forecast_next = run_forecasting(daily, fcfg, store=store)
+    icfg = InventoryConfig(simulation_runs=args.sim_runs)
+    paths = demand_paths(daily, selection, forecast_next, fcfg, icfg.simulation_runs) if args.demand_model == "bootstrap" else None
+
+    lead_times = _parse_ints(args.lead_times)
+    service_levels = _parse_floats(args.service_levels)
+    table = run_sweep(daily, forecast_next, lead_times, service_levels, icfg, store=store, paths=paths)
+    write_table(table, args.out)
+
+    print(f"\nDone! {len(lead_times) * len(service_levels)} scenarios x {daily['item'].nunique()} items", flush=True)
+    print(f"Sweep table: {args.out}\n", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+import numpy as np
+import pandas as pd
+
+
+@dataclass(frozen=True)
+class SyntheticConfig:
+    n_items: int = 50
+    n_days: int = 365
+    txn_per_day: float = 300.0  # mean transactions per day (before seasonality)
+    weekly_amplitude: float = 0.25  # +/- share of demand swinging over the week
+    annual_amplitude: float = 0.15  # +/- share of demand swinging over the year
+    dirty_fraction: float = 0.05  # rows with a junk item / quantity / date / total
+    start_date: str = "2023-01-01"
+    seed: int = 0
+
+
+def make_synthetic_sales(cfg: SyntheticConfig = SyntheticConfig()) -> pd.DataFrame:
+    """
+    Raw transactions in the cafe_sales.csv schema (the input of clean_transactions):
+    Transaction ID, Item, Quantity, Price Per Unit, Total Spent, Transaction Date.
+    Item popularity is Zipf-like, so the tail of the catalogue is sparse / intermittent.
+    """
+    rng = np.random.default_rng(cfg.seed)
+    days = pd.date_range(cfg.start_date, periods=cfg.n_days, freq="D")
+    t = np.arange(cfg.n_days)
+    season = (
+        1.0
+        + cfg.weekly_amplitude * np.sin(2 * np.pi * t / 7.0)
+        + cfg.annual_amplitude * np.sin(2 * np.pi * t / 365.25)
+    )
+    per_day = rng.poisson(np.clip(cfg.txn_per_day * season, 0.0, None))
+    n = int(per_day.sum())
+
+    items = np.array([f"item_{k:05d}" for k in range(cfg.n_items)], dtype=object)
+    popularity = 1.0 / np.arange(1, cfg.n_items + 1)
+    item_idx = rng.choice(cfg.n_items, size=n, p=popularity / popularity.sum())
+    prices = np.round(rng.uniform(1.0, 6.0, cfg.n_items) * 2) / 2
+
+    qty = rng.integers(1, 6, n).astype(float)
+    price = prices[item_idx]
+    df = pd.DataFrame({
+        "Transaction ID": np.char.add("TXN_", np.arange(n).astype(str)),
+        "Item": items[item_idx],
+        "Quantity": qty,
+        "Price Per Unit": price,
+        "Total Spent": qty * price,
+        "Transaction Date": np.repeat(days.strftime("%Y-%m-%d").to_numpy(), per_day),
+    })
+
+    n_dirty = int(round(cfg.dirty_fraction * n))
+    if n_dirty:
+        df = df.astype({"Quantity": object, "Total Spent": object})
+        rows = rng.choice(n, size=n_dirty, replace=False)
+        kind = rng.integers(0, 4, n_dirty)
+        junk = np.array(["ERROR", "UNKNOWN"], dtype=object)
+        df.loc[rows[kind == 0], "Item"] = rng.choice(junk, int((kind == 0).sum()))
+        df.loc[rows[kind == 1], "Quantity"] = "ERROR"
+        df.loc[rows[kind == 2], "Transaction Date"] = rng.choice(np.array(["ERROR", ""], dtype=object), int((kind == 2).sum()))
+        df.loc[rows[kind == 3], "Total Spent"] = "UNKNOWN"
+    return df
@@ -0,0 +1,36 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.bootstrap import BootstrapConfig, demand_paths
+from src.forecast import ForecastConfig, run_forecasting
+
+
+def _daily(n_items: int = 3, n_days: int = 60) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    dates = pd.date_range("2024-01-01", periods=n_days, freq="D")
+    return pd.DataFrame({
+        "date": np.tile(dates, n_items),
+        "item": np.repeat([f"i{k}" for k in range(n_items)], n_days),
+        "demand_qty": rng.poisson(3.0, n_items * n_days).astype(float),
+        "revenue": 1.0,
+        "txn_count": 1,
+    })
+
+
+def test_capped_paths_warn_and_replay_fewer_runs():
+    daily = _daily()
+    fcfg = ForecastConfig(horizon_days=10)
+    _, selection, forecast_next = run_forecasting(daily, fcfg)
+
+    with pytest.warns(RuntimeWarning, match="capped at 5 per item"):
+        paths = demand_paths(daily, selection, forecast_next, fcfg, 300, BootstrapConfig(max_paths=5))
+    assert paths.paths.shape == (3, 5, 10)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        paths = demand_paths(daily, selection, forecast_next, fcfg, 300)
+    assert paths.paths.shape == (3, 300, 10)
+
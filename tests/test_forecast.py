@@ -0,0 +1,30 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.forecast import ForecastConfig, run_forecasting
+
+
+def _daily(n_days: int) -> pd.DataFrame:
+    dates = pd.date_range("2024-01-01", periods=n_days, freq="D")
+    return pd.DataFrame({
+        "date": np.tile(dates, 2),
+        "item": np.repeat(["a", "b"], n_days),
+        "demand_qty": (np.arange(2 * n_days) % 3).astype(float),
+        "revenue": 1.0,
+        "txn_count": 1,
+    })
+
+
+@pytest.mark.parametrize("mode", ["per_item", "batched"])
+@pytest.mark.parametrize("n_days", [3, 4, 5, 6, 8])
+def test_rolling_origin_short_history_falls_back_to_single_split(mode, n_days):
+    cfg = ForecastConfig(backtest_folds=3, backtest_mode=mode)
+    backtest, selection, forecast_next = run_forecasting(_daily(n_days), cfg)
+
+    single = run_forecasting(_daily(n_days), ForecastConfig(backtest_mode=mode))[0]
+    assert backtest["fold"].astype(str).eq("all").all()
+    assert backtest["mae"].notna().any()
+    np.testing.assert_allclose(backtest["mae"].to_numpy(), single["mae"].to_numpy())
+    assert selection["item"].tolist() == ["a", "b"]
+    assert len(forecast_next) == 2 * cfg.horizon_days
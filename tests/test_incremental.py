@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.aggregate import AggregateConfig, append_daily, fill_daily_grid
+from src.pipeline import run
+
+
+def _raw(days: int, items=("cake", "coffee", "tea"), seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    n = days * 6
+    qty = rng.integers(1, 5, n)
+    return pd.DataFrame({
+        "Transaction ID": [f"TXN_{i}" for i in range(n)],
+        "Item": rng.choice(list(items), n),
+        "Quantity": qty,
+        "Price Per Unit": 2.0,
+        "Total Spent": 2.0 * qty,
+        "Transaction Date": pd.date_range("2024-01-01", periods=days, freq="D").repeat(6).strftime("%Y-%m-%d"),
+    })
+
+
+def _daily(rows) -> pd.DataFrame:
+    return pd.DataFrame(rows, columns=["date", "item", "demand_qty", "revenue", "txn_count"]).assign(date=lambda d: pd.to_datetime(d["date"]))
+
+
+def test_changed_items_follow_values_not_new_days():
+    daily = fill_daily_grid(_daily([("2024-01-01", "a", 1, 1, 1), ("2024-01-02", "b", 2, 2, 1)]))
+    # the watermark day is re-aggregated unchanged; the new day only has demand for "a"
+    new = _daily([("2024-01-02", "b", 2, 2, 1), ("2024-01-03", "a", 3, 3, 1)])
+    merged, changed = append_daily(daily, new, pd.Timestamp("2024-01-02"), AggregateConfig())
+    assert changed == ["a"]
+    assert len(merged) == 6
+
+    _, changed = append_daily(merged, _daily([("2024-01-03", "a", 3, 3, 1), ("2024-01-03", "c", 1, 1, 1)]),
+                              pd.Timestamp("2024-01-03"), AggregateConfig())
+    assert changed == ["c"]
+
+
+@pytest.mark.parametrize("backend", ["serial", "threads"])
+def test_unchanged_items_reuse_the_last_run(tmp_path, backend):
+    raw = _raw(40)
+    first, second = tmp_path / "first.csv", tmp_path / "second.csv"
+    raw.to_csv(first, index=False)
+    late = raw.tail(2).assign(**{"Transaction ID": ["TXN_LATE1", "TXN_LATE2"], "Item": "cake"})
+    pd.concat([raw, late]).to_csv(second, index=False)
+
+    kw = dict(figures=False, return_frames=True, backend=backend, workers=2, simulation_runs=50)
+    store = tmp_path / "state"
+    run(str(first), out_dir=str(tmp_path / "a"), incremental_dir=str(store), **kw)
+    inc = run(str(second), out_dir=str(tmp_path / "b"), incremental_dir=str(store), **kw)
+    ref = run(str(second), out_dir=str(tmp_path / "c"), **kw)
+
+    assert inc["changed_items"] == ["cake"]
+    assert inc["n_reused_items"] == {"forecast": 2, "policy": 2}
+    for stem, frame in ref["frames"].items():
+        pd.testing.assert_frame_equal(inc["frames"][stem].reset_index(drop=True), frame.reset_index(drop=True), check_dtype=False)
+
+
+def test_store_is_one_file_per_day_and_reads_only_new_row_groups(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    from src.aggregate import load_daily_state, make_daily_item_series
+    from src.clean import clean_transactions
+    from src.ingest import _row_groups_since, stream_daily_state
+
+    raw = _raw(30)
+    first, second = tmp_path / "first.parquet", tmp_path / "second.parquet"
+    raw.head(20 * 6).to_parquet(first, row_group_size=60)
+    raw.to_parquet(second, row_group_size=60)
+
+    store = tmp_path / "state"
+    stream_daily_state(first, store, fmt="parquet")
+    _, watermark = load_daily_state(store)
+    # 10 days per row group: only the group holding the watermark day and the new ones are read
+    assert _row_groups_since(pq.ParquetFile(second), watermark) == [1, 2]
+
+    daily, _, n_rows = stream_daily_state(second, store, fmt="parquet")
+    assert n_rows == 11 * 6
+    assert len(list((store / "days").glob("*.parquet"))) == 30
+    expected = make_daily_item_series(clean_transactions(raw)).reset_index(drop=True)
+    pd.testing.assert_frame_equal(daily.reset_index(drop=True), expected, check_dtype=False)
+    pd.testing.assert_frame_equal(load_daily_state(store)[0], expected, check_dtype=False)
+
+
+def test_delta_feed_for_the_watermark_day_is_rejected(tmp_path):
+    from src.aggregate import load_daily_state
+    from src.ingest import stream_daily_state
+
+    raw = _raw(10)
+    first, delta = tmp_path / "first.csv", tmp_path / "delta.csv"
+    raw.to_csv(first, index=False)
+    # only one late row for the last stored day, plus the next day: a delta, not the cumulative file
+    late = raw.tail(1).assign(**{"Transaction ID": "TXN_LATE"})
+    nxt = raw.tail(6).assign(**{"Transaction ID": [f"TXN_N{i}" for i in range(6)], "Transaction Date": "2024-01-11"})
+    pd.concat([late, nxt]).to_csv(delta, index=False)
+
+    store = tmp_path / "state"
+    stream_daily_state(first, store)
+    before = load_daily_state(store)
+    with pytest.raises(ValueError, match="cumulative"):
+        stream_daily_state(delta, store)
+    pd.testing.assert_frame_equal(load_daily_state(store)[0], before[0])
+    assert load_daily_state(store)[1] == before[1]
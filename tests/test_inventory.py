@@ -0,0 +1,28 @@
+from dataclasses import replace
+
+import pandas as pd
+import pytest
+
+from src.aggregate import make_daily_grid
+from src.clean import clean_transactions
+from src.forecast import ForecastConfig, run_forecasting
+from src.inventory import InventoryConfig, demand_stats, rop_policy, simulate_policy
+from src.synthetic import SyntheticConfig, make_synthetic_sales
+
+
+@pytest.mark.parametrize("spread", [0, 2])
+def test_loop_engine_matches_vectorized_across_batches(spread):
+    grid = make_daily_grid(clean_transactions(make_synthetic_sales(SyntheticConfig(n_items=4, n_days=60, txn_per_day=50))))
+    _, _, forecast_next = run_forecasting(grid, ForecastConfig(backtest_mode="batched", horizon_days=14))
+    cfg = InventoryConfig(simulation_runs=70, sim_batch_runs=30, lead_time_spread_days=spread)
+    policy = rop_policy(demand_stats(grid, forecast_next, cfg), cfg)
+
+    def sim(c):
+        fill_rates = []
+        summary = simulate_policy(forecast_next, policy, c, fill_rates=fill_rates)
+        return summary.sort_values("item").reset_index(drop=True), fill_rates[0]
+
+    vec, vec_daily = sim(cfg)
+    loop, loop_daily = sim(replace(cfg, sim_engine="loop"))
+    pd.testing.assert_frame_equal(loop, vec, check_exact=False, rtol=1e-9)
+    pd.testing.assert_frame_equal(loop_daily, vec_daily, check_exact=False, rtol=1e-9)